@@ -5,19 +5,25 @@ CG DevX CLI
 
 import click
 
-from commands.destroy import destroy
-from commands.setup import setup
-from commands.workload.workload import workload
+from common.utils.lazy_group import LazyGroup
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "setup": "commands.setup.setup",
+        "destroy": "commands.destroy.destroy",
+        "workload": "commands.workload.workload.workload",
+    },
+    lazy_help={
+        "setup": "Creates new CG DevX installation.",
+        "destroy": "Destroy existing CG DevX installation.",
+        "workload": "Manages workloads.",
+    }
+)
 def entry_point():
     pass
 
 
-entry_point.add_command(setup)
-entry_point.add_command(destroy)
-entry_point.add_command(workload)
-
 if __name__ == '__main__':
     entry_point()
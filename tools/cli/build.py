@@ -22,6 +22,9 @@ def install():
         "cgdevxcli",
         "--onefile",
         "--console",
+        # commands are imported lazily by name, so are not found by the import analysis
+        "--collect-submodules",
+        "commands",
         "--add-data",
         "cli/services/k8s/kubeconfig.yaml:services/k8s",
         "--add-data",
@@ -4,17 +4,18 @@ import time
 
 import click
 import urllib3
+from alive_progress import alive_bar
 from git import InvalidGitRepositoryError
 
 from common.const.common_path import LOCAL_TF_FOLDER_VCS, LOCAL_TF_FOLDER_HOSTING_PROVIDER, LOCAL_FOLDER
 from common.const.namespaces import ARGOCD_NAMESPACE
 from common.enums.git_providers import GitProviders
-from common.logging_config import configure_logging
+from common.logging_config import configure_logging, logger
 from common.state_store import StateStore
 from common.utils.command_utils import init_cloud_provider, prepare_cloud_provider_auth_env_vars, set_envs, unset_envs, \
-    wait, init_git_provider, check_installation_presence, prepare_git_provider_env_vars
+    init_git_provider, check_installation_presence, prepare_git_provider_env_vars
 from common.utils.k8s_utils import find_pod_by_name_fragment
-from services.k8s.delivery_service_manager import DeliveryServiceManager, delete_application_via_k8s_portforward
+from services.k8s.delivery_service_manager import DeliveryServiceManager, ArgoCDSession
 from services.k8s.k8s import KubeClient
 from services.platform_gitops import PlatformGitOpsRepo
 from services.tf_wrapper import TfWrapper
@@ -27,7 +28,10 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
     case_sensitive=False
 ), default='CRITICAL', help='Set the verbosity level (DEBUG, INFO, WARNING, ERROR, CRITICAL)')
-def destroy(verbosity: str):
+@click.option('--app-deletion-timeout', 'app_deletion_timeout',
+              help='Max time in seconds to wait for ArgoCD applications and their cloud resources deletion',
+              default=600, type=click.INT)
+def destroy(verbosity: str, app_deletion_timeout: int):
     """Destroy existing CG DevX installation."""
     # Initialize the start time to measure the duration of the platform destruction
     func_start_time = time.time()
@@ -86,37 +90,23 @@ def destroy(verbosity: str):
         # remove apps with dependencies on external resources
         kube_client = KubeClient(config_file=p.internals["KCTL_CONFIG_PATH"])
         cd_man = DeliveryServiceManager(kube_client)
-        # turn off sync
         registry_app_name = "registry"
+        apps = [registry_app_name, "ingress-nginx-components", "ingress-nginx"]
+        # git self-hosted runners
+        if p.git_provider == GitProviders.GitHub:
+            apps += ["github-runner-components", "actions-runner-controller-components"]
+        elif p.git_provider == GitProviders.GitLab:
+            apps += ["gitlab-runner-components"]
+
+        deletion_tracker = None
         try:
-            cd_man.turn_off_app_sync(registry_app_name)
-            cd_man.turn_off_app_sync("ingress-nginx-components")
-            cd_man.turn_off_app_sync("ingress-nginx")
-            # git self-hosted runners
-            if p.git_provider == GitProviders.GitHub:
-                cd_man.turn_off_app_sync("github-runner-components")
-                cd_man.turn_off_app_sync("actions-runner-controller-components")
-            elif p.git_provider == GitProviders.GitLab:
-                cd_man.turn_off_app_sync("gitlab-runner-components")
-            else:
-                raise Exception('Error: None of the available Git providers were specified')
-
-            # delete apps
-            cd_man.delete_app("ingress-nginx-components")
-            cd_man.delete_app("ingress-nginx")
-            # git self-hosted runners
-            if p.git_provider == GitProviders.GitHub:
-                cd_man.delete_app("github-runner-components")
-                cd_man.delete_app("actions-runner-controller-components")
-            elif p.git_provider == GitProviders.GitLab:
-                cd_man.delete_app("gitlab-runner-components")
-            else:
-                raise Exception('Error: None of the available Git providers were specified')
-
+            # managed resources are only known while applications exist
+            deletion_tracker = cd_man.track_apps_deletion(apps)
         except Exception as e:
-            pass
+            logger.warning(f"Could not read resources of ArgoCD applications, their deletion is not tracked: {e}")
+
+        deleted = {}
         try:
-            deletion_wait_time = 300
             k8s_pod = find_pod_by_name_fragment(
                 kube_config_path=p.internals["KCTL_CONFIG_PATH"],
                 name_fragment="argocd-server",
@@ -125,23 +115,39 @@ def destroy(verbosity: str):
             # Transitioned to asynchronous functions to address compatibility issues with the kr8s library.
             # Previously, the synchronous interaction with kr8s sometimes led to deadlocks and errors because the kr8s
             # library is inherently asynchronous.
-            asyncio.run(delete_application_via_k8s_portforward(
-                app_name=registry_app_name,
+            deleted = asyncio.run(delete_argocd_apps(
+                apps=apps,
                 user=p.internals["ARGOCD_USER"],
                 password=p.internals["ARGOCD_PASSWORD"],
                 k8s_pod=k8s_pod,
                 kube_config_path=p.internals["KCTL_CONFIG_PATH"]
             ))
-            click.echo(
-                f"Application deletion successfully initiated. "
-                f"Waiting {deletion_wait_time} seconds for complete removal."
-            )
-            # need to wait for application deletion
-            wait(deletion_wait_time)
         except Exception as e:
-            # suppress exception and continue without deleting ArgoCD app
-            pass
-
+            logger.warning(f"ArgoCD API is not reachable: {e}")
+
+        # fall back to removing application objects via K8s API for apps ArgoCD API failed to delete
+        for app in [a for a in apps if deleted.get(a) is not True]:
+            logger.warning(f"Deleting ArgoCD application {app} via K8s API")
+            try:
+                cd_man.turn_off_app_sync(app)
+                cd_man.delete_app(app)
+            except Exception as e:
+                logger.warning(f"Failed to delete ArgoCD application {app}: {e}")
+        click.echo("Application deletion successfully initiated. Waiting for complete removal.")
+
+        # wait till applications and resources holding cloud resources are gone, otherwise cluster destroy fails
+        if deletion_tracker is not None and deletion_tracker.total:
+            try:
+                with alive_bar(deletion_tracker.total, title='ArgoCD Applications Deletion') as bar:
+                    stragglers = deletion_tracker.wait(app_deletion_timeout, on_deleted=lambda _: bar())
+                if stragglers:
+                    click.echo(f"Not deleted after {app_deletion_timeout} seconds: {', '.join(stragglers)}. "
+                               f"Continuing...")
+            except Exception as e:
+                # suppress exception and continue with cluster destroy
+                logger.warning(f"Failed to wait for ArgoCD applications deletion: {e}")
+
+        kube_client.close()
         click.echo("Deleting ArgoCD configuration. Done!")
 
     # K8s Cluster section
@@ -182,3 +188,12 @@ def destroy(verbosity: str):
 
     # Display the result with minutes as integers and seconds with two decimal places
     click.echo(f"Platform destroy completed in {int(minutes)} minutes, {int(seconds)} seconds")
+
+
+async def delete_argocd_apps(apps: list[str], user: str, password: str, k8s_pod, kube_config_path: str):
+    """
+    Turns off sync and deletes ArgoCD applications with their resources over a single ArgoCD API session.
+    """
+    async with ArgoCDSession(user, password, k8s_pod, kube_config_path) as session:
+        await session.disable_sync(apps)
+        return await session.delete(apps)
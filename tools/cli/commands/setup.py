@@ -11,11 +11,11 @@ import yaml
 from alive_progress import alive_bar
 
 from common.const.common_path import LOCAL_TF_FOLDER_VCS, LOCAL_TF_FOLDER_HOSTING_PROVIDER, \
-    LOCAL_TF_FOLDER_SECRETS_MANAGER, LOCAL_TF_FOLDER_USERS, LOCAL_TF_FOLDER_CORE_SERVICES
+    LOCAL_TF_FOLDER_SECRETS_MANAGER, LOCAL_TF_FOLDER_USERS, LOCAL_TF_FOLDER_CORE_SERVICES, LOCAL_TF_PROFILE_REPORT
 from common.const.const import GITOPS_REPOSITORY_URL, GITOPS_REPOSITORY_BRANCH, KUBECTL_VERSION, PLATFORM_USER_NAME, \
     TERRAFORM_VERSION, GITHUB_TF_REQUIRED_PROVIDER_VERSION, GITLAB_TF_REQUIRED_PROVIDER_VERSION
 from common.const.namespaces import ARGOCD_NAMESPACE, ARGO_WORKFLOW_NAMESPACE, EXTERNAL_SECRETS_OPERATOR_NAMESPACE, \
-    ATLANTIS_NAMESPACE, VAULT_NAMESPACE, HARBOR_NAMESPACE, SONARQUBE_NAMESPACE
+    ATLANTIS_NAMESPACE, VAULT_NAMESPACE
 from common.const.parameter_names import CLOUD_PROFILE, OWNER_EMAIL, CLOUD_PROVIDER, CLOUD_ACCOUNT_ACCESS_KEY, \
     CLOUD_ACCOUNT_ACCESS_SECRET, CLOUD_REGION, PRIMARY_CLUSTER_NAME, DNS_REGISTRAR, DNS_REGISTRAR_ACCESS_TOKEN, \
     DNS_REGISTRAR_ACCESS_KEY, DNS_REGISTRAR_ACCESS_SECRET, DOMAIN_NAME, GIT_PROVIDER, GIT_ORGANIZATION_NAME, \
@@ -26,9 +26,10 @@ from common.enums.dns_registrars import DnsRegistrars
 from common.enums.git_providers import GitProviders
 from common.logging_config import configure_logging
 from common.state_store import StateStore
+from common.step_graph import StepGraph, current_step
 from common.tracing_decorator import trace
 from common.utils.command_utils import init_cloud_provider, init_git_provider, prepare_cloud_provider_auth_env_vars, \
-    set_envs, unset_envs, wait, wait_http_endpoint_readiness, prepare_git_provider_env_vars
+    wait, wait_http_endpoint_readiness, prepare_git_provider_env_vars
 from common.utils.generators import random_string_generator
 from common.utils.k8s_utils import find_pod_by_name_fragment
 from common.utils.optional_services_manager import OptionalServices, build_argo_exclude_string
@@ -36,11 +37,14 @@ from services.cloud.cloud_provider_manager import CloudProviderManager
 from services.dependency_manager import DependencyManager
 from services.dns.dns_provider_manager import DNSManager
 from services.k8s.config_builder import create_k8s_config, write_k8s_config
+from services.k8s.credential_provider import TokenCredentialProvider
 from services.k8s.delivery_service_manager import DeliveryServiceManager, get_argocd_token_via_k8s_portforward
 from services.k8s.k8s import KubeClient, write_ca_cert
 from services.k8s.kctl_wrapper import KctlWrapper
 from services.keys.key_manager import KeyManager
 from services.platform_template_manager import GitOpsTemplateManager
+from services.tf_orchestrator import TfModuleOrchestrator
+from services.tf_profiler import TerraformProfiler
 from services.tf_wrapper import TfWrapper
 from services.vcs.git_provider_manager import GitProviderManager
 
@@ -81,15 +85,18 @@ from services.vcs.git_provider_manager import GitProviderManager
     ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
     case_sensitive=False
 ), default='CRITICAL', help='Set the verbosity level (DEBUG, INFO, WARNING, ERROR, CRITICAL)')
+@click.option('--tf-profile', 'tf_profile', help='Record Terraform resource timings report', default=False,
+              is_flag=True)
 def setup(
         email: str, cloud_provider: CloudProviders, cloud_profile: str, cloud_key: str, cloud_secret: str,
         cloud_region: str, cluster_name: str, dns_reg: DnsRegistrars, dns_reg_token: str,
         dns_reg_key: str, dns_reg_secret: str, domain: str, git_provider: GitProviders, git_org: str, git_token: str,
         gitops_repo_name: str, gitops_template_url: str, gitops_template_branch: str, install_demo: bool,
-        optional_services: List[str], image_registry_auth, config: click.File, verbosity: str
+        optional_services: List[str], image_registry_auth, config: click.File, verbosity: str,
+        tf_profile: bool
 ):
     """Creates new CG DevX installation."""
-    click.echo("Setup CG DevX installation...")
+    echo("Setup CG DevX installation...")
     # Initialize the start time to measure the duration of the platform setup
     func_start_time = time.time()
 
@@ -147,14 +154,38 @@ def setup(
 
     git_man = init_git_provider(p)
 
-    if not p.has_checkpoint("preflight"):
-        click.echo("1/12: Executing pre-flight checks...")
+    dep_man: DependencyManager = DependencyManager()
+
+    tm = GitOpsTemplateManager(p.get_input_param(GITOPS_REPOSITORY_TEMPLATE_URL),
+                               p.get_input_param(GITOPS_REPOSITORY_TEMPLATE_BRANCH),
+                               p.get_input_param(GIT_ACCESS_TOKEN))
+
+    cloud_provider_auth_env_vars = prepare_cloud_provider_auth_env_vars(p)
+    git_provider_env_vars = prepare_git_provider_env_vars(p)
+
+    tf_profiler = TerraformProfiler(LOCAL_TF_PROFILE_REPORT) if tf_profile else None
+
+    # independent steps (pre-flight checks, dependencies, ssh keys, IaC backend, GitOps template, VCS and K8s
+    # cluster provisioning) run concurrently, every Terraform process gets its own environment variables
+    steps = StepGraph(p)
+
+    kube_clients: List[KubeClient] = []
+
+    def get_kube_client() -> KubeClient:
+        # created on first use, once the cluster is provisioned, and shared by all stages
+        if not kube_clients:
+            kube_clients.append(init_k8s_client(cloud_man, p))
+        return kube_clients[0]
+
+    @steps.step("preflight", outputs=["preflight"], checkpoint="preflight")
+    def preflight():
+        echo("1/12: Executing pre-flight checks...")
 
         cloud_provider_check(cloud_man, p)
-        click.echo("Cloud provider pre-flight check. Done!")
+        echo("Cloud provider pre-flight check. Done!")
 
         git_provider_check(git_man, p)
-        click.echo("Git provider pre-flight check. Done!")
+        echo("Git provider pre-flight check. Done!")
 
         git_user_login, git_user_name, git_user_email = git_man.get_current_user_info()
         p.internals["GIT_USER_LOGIN"] = git_user_login
@@ -178,55 +209,44 @@ def setup(
             p.parameters["<GIT_RUNNER_GROUP_NAME>"] = "Default"
 
         dns_provider_check(dns_man, p)
-        click.echo("DNS provider pre-flight check. Done!")
+        echo("DNS provider pre-flight check. Done!")
 
-        p.set_checkpoint("preflight")
-        p.save_checkpoint()
-        click.echo("1/12: Pre-flight checks. Done!")
+        echo("1/12: Pre-flight checks. Done!")
 
-    # end preflight check section
-    else:
-        click.echo("1/12: Skipped pre-flight checks.")
-    dep_man: DependencyManager = DependencyManager()
-
-    if not p.has_checkpoint("dependencies"):
-        click.echo("2/12: Dependencies check...")
+    @steps.step("dependencies", outputs=["tools"], checkpoint="dependencies")
+    def dependencies():
+        echo("2/12: Dependencies check...")
 
+        missing = []
         # terraform
         if dep_man.check_tf():
-            click.echo("tf is installed. Continuing...")
+            echo("tf is installed. Continuing...")
         else:
-            click.echo("Downloading and installing tf...")
-            dep_man.install_tf()
-            click.echo("tf is installed.")
+            missing.append("tf")
 
         # kubectl
         if dep_man.check_kubectl():
-            click.echo("kubectl is installed. Continuing...")
+            echo("kubectl is installed. Continuing...")
         else:
-            click.echo("Downloading and installing kubectl...")
-            dep_man.install_kubectl()
-            click.echo("kubectl is installed.")
+            missing.append("kubectl")
 
-        click.echo("2/12: Dependencies check. Done!")
-        p.set_checkpoint("dependencies")
-        p.save_checkpoint()
-    else:
-        click.echo("2/12: Skipped dependencies check.")
+        if missing:
+            echo(f"Downloading and installing {', '.join(missing)}...")
+            dep_man.install(missing)
+            echo(f"{', '.join(missing)} installed.")
 
-    # promote input params
-    prepare_parameters(p, git_man)
-    p.save_checkpoint()
-
-    tm = GitOpsTemplateManager(p.get_input_param(GITOPS_REPOSITORY_TEMPLATE_URL),
-                               p.get_input_param(GITOPS_REPOSITORY_TEMPLATE_BRANCH),
-                               p.get_input_param(GIT_ACCESS_TOKEN))
+        echo("2/12: Dependencies check. Done!")
 
-    if not p.has_checkpoint("one-time-setup"):
-        click.echo("3/12: Setting initial parameters...")
+    @steps.step("parameters", inputs=["preflight"], outputs=["parameters"], always=True)
+    def parameters():
+        # promote input params
+        prepare_parameters(p, git_man)
+        p.save_checkpoint()
 
+    @steps.step("ssh-keys", inputs=["parameters"], outputs=["ssh-keys"], checkpoint="ssh-keys")
+    def ssh_keys():
         # create ssh keys
-        click.echo("Generating ssh keys...")
+        echo("Generating ssh keys...")
         default_public_key, public_key_path, default_private_key, private_key_path = KeyManager.create_ed_keys()
         p.internals["DEFAULT_SSH_PUBLIC_KEY"] = p.parameters["<VCS_BOT_SSH_PUBLIC_KEY>"] = default_public_key
         p.internals["DEFAULT_SSH_PUBLIC_KEY_PATH"] = public_key_path
@@ -241,10 +261,12 @@ def setup(
         p.internals["CLUSTER_SSH_PRIVATE_KEY"] = k8s_private_key
         p.internals["CLUSTER_SSH_PRIVATE_KEY_PATH"] = k8s_private_key_path
 
-        click.echo("Generating ssh keys. Done!")
+        echo("Generating ssh keys. Done!")
 
+    @steps.step("iac-backend", inputs=["parameters"], outputs=["iac-backend"], checkpoint="iac-backend")
+    def iac_backend():
         # create terraform storage backend
-        click.echo("Creating tf backend storage...")
+        echo("Creating tf backend storage...")
 
         tf_backend_storage, key = cloud_man.create_iac_state_storage(p.get_input_param(GITOPS_REPOSITORY_NAME))
         p.internals["TF_BACKEND_STORAGE_ACCESS_KEY"] = key
@@ -287,49 +309,52 @@ def setup(
             location=dns_zone_name, is_private=is_dns_zone_private
         )
 
-        click.echo("Creating tf backend storage. Done!")
+        echo("Creating tf backend storage. Done!")
 
-        p.set_checkpoint("one-time-setup")
-        p.save_checkpoint()
-        click.echo("3/12: Setting initial parameters. Done!")
-
-    # end preflight check section
-    else:
-        click.echo("3/12: Skipped setting initial parameters.")
+    @steps.step("one-time-setup", inputs=["ssh-keys", "iac-backend"], outputs=["initial-parameters"],
+                checkpoint="one-time-setup")
+    def one_time_setup():
+        echo("3/12: Setting initial parameters. Done!")
 
-    if not p.has_checkpoint("repo-prep"):
-        click.echo("4/12: Preparing your GitOps code...")
+    @steps.step("gitops-template", inputs=["parameters"], outputs=["gitops-template"])
+    def gitops_template():
+        echo("4/12: Preparing your GitOps code...")
 
         tm.check_repository_existence()
         tm.clone()
         tm.build_repo_from_template(p.git_provider)
+
+    @steps.step("repo-prep", inputs=["parameters", "initial-parameters", "gitops-template"], outputs=["gitops-code"],
+                checkpoint="repo-prep")
+    def repo_prep():
         tm.parametrise_tf(p)
 
-        p.set_checkpoint("repo-prep")
-        p.save_checkpoint()
+        echo("4/12: Preparing your GitOps code. Done!")
 
-        click.echo("4/12: Preparing your GitOps code. Done!")
-    else:
-        click.echo("4/12: Skipped GitOps code prep.")
-
-    # VCS provisioning
-    cloud_provider_auth_env_vars = prepare_cloud_provider_auth_env_vars(p)
-    git_provider_env_vars = prepare_git_provider_env_vars(p)
+    @steps.step("tf-init", inputs=["gitops-code", "tools"], outputs=["tf-modules"], checkpoint="tf-init")
+    def tf_init():
+        # providers are downloaded once to the shared plugin cache
+        TfModuleOrchestrator({
+            "vcs": LOCAL_TF_FOLDER_VCS,
+            "hosting_provider": LOCAL_TF_FOLDER_HOSTING_PROVIDER,
+            "secrets": LOCAL_TF_FOLDER_SECRETS_MANAGER,
+            "users": LOCAL_TF_FOLDER_USERS,
+            "core_services": LOCAL_TF_FOLDER_CORE_SERVICES,
+        }).init_all(cloud_provider_auth_env_vars)
 
     # VCS section
-    if not p.has_checkpoint("vcs-tf"):
-        click.echo("5/12: Provisioning VCS...")
+    @steps.step("vcs-tf", inputs=["tf-modules"], outputs=["vcs"], checkpoint="vcs-tf")
+    def vcs_tf():
+        echo("5/12: Provisioning VCS...")
         # vcs env vars
         vcs_tf_env_vars = {
             **cloud_provider_auth_env_vars,
             **git_provider_env_vars
         }
 
-        # set envs as required by tf
-        set_envs(vcs_tf_env_vars)
-
-        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_VCS)
-        tf_wrapper.init()
+        # progress bar is shown for K8s cluster provisioning running at the same time
+        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_VCS, profiler=tf_profiler, env=vcs_tf_env_vars, show_progress=False)
+        tf_wrapper.ensure_init()
         tf_wrapper.apply({"atlantis_repo_webhook_secret": p.parameters["<IAC_PR_AUTOMATION_WEBHOOK_SECRET>"],
                           "cd_webhook_secret": p.parameters["<CD_PUSH_EVENT_WEBHOOK_SECRET>"],
                           "vcs_bot_ssh_public_key": p.parameters["<VCS_BOT_SSH_PUBLIC_KEY>"]})
@@ -340,30 +365,21 @@ def setup(
         p.parameters["<GIT_REPOSITORY_URL>"] = vcs_out["gitops_repo_html_url"]
         p.internals["VCS_RUNNER_TOKEN"] = vcs_out["vcs_runner_token"]
 
-        # unset envs as no longer needed
-        unset_envs(vcs_tf_env_vars)
-
-        p.set_checkpoint("vcs-tf")
-        p.save_checkpoint()
-
-        click.echo("5/12: Provisioning VCS. Done!")
-    else:
-        click.echo("5/12: Skipped VCS provisioning.")
+        echo("5/12: Provisioning VCS. Done!")
 
     # K8s Cluster section
-    if not p.has_checkpoint("k8s-tf"):
-        click.echo("6/12: Provisioning K8s cluster...")
+    @steps.step("k8s-tf", inputs=["tf-modules"], outputs=["k8s-cluster"], checkpoint="k8s-tf")
+    def k8s_tf():
+        echo("6/12: Provisioning K8s cluster...")
 
         # run hosting provider tf to create K8s cluster
         hp_tf_env_vars = {
             **{},  # add vars here
             **cloud_provider_auth_env_vars
         }
-        # set envs as required by tf
-        set_envs(hp_tf_env_vars)
 
-        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_HOSTING_PROVIDER)
-        tf_wrapper.init()
+        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_HOSTING_PROVIDER, profiler=tf_profiler, env=hp_tf_env_vars)
+        tf_wrapper.ensure_init()
         tf_wrapper.apply({"cluster_ssh_public_key": p.parameters.get("<CC_CLUSTER_SSH_PUBLIC_KEY>", "")})
         hp_out = tf_wrapper.output()
 
@@ -411,9 +427,6 @@ def setup(
             key_ring=p.parameters["<SECRET_MANAGER_UNSEAL_KEY_RING>"]
         )
 
-        # unset envs as no longer needed
-        unset_envs(hp_tf_env_vars)
-
         if p.cloud_provider == CloudProviders.AWS:
             # user could get kubeconfig by running command
             # `aws eks update-kubeconfig --region region-code --name my-cluster --kubeconfig my-config-path`
@@ -450,15 +463,11 @@ def setup(
 
         p.internals["KCTL_CONFIG_PATH"] = kctl_config_path
 
-        p.set_checkpoint("k8s-tf")
-        p.save_checkpoint()
+        echo("6/12: Provisioning K8s cluster. Done!")
 
-        click.echo("6/12: Provisioning K8s cluster. Done!")
-    else:
-        click.echo("6/12: Skipped K8s provisioning.")
-
-    if not p.has_checkpoint("gitops-vcs"):
-        click.echo("7/12: Pushing GitOps code...")
+    @steps.step("gitops-vcs", inputs=["vcs", "k8s-cluster"], outputs=["gitops-repo"], checkpoint="gitops-vcs")
+    def gitops_vcs():
+        echo("7/12: Pushing GitOps code...")
 
         tm.parametrise(p)
 
@@ -467,19 +476,15 @@ def setup(
                   p.internals["GIT_USER_NAME"],
                   p.internals["GIT_USER_EMAIL"])
 
-        p.set_checkpoint("gitops-vcs")
-        p.save_checkpoint()
-
-        click.echo("7/12: Pushing GitOps code. Done!")
-    else:
-        click.echo("7/12: Skipped GitOps repo initialization.")
+        echo("7/12: Pushing GitOps code. Done!")
 
     # install ArgoCD
-    if not p.has_checkpoint("k8s-delivery"):
-        click.echo("8/12: Installing ArgoCD...")
-        with alive_bar(20, title='ArgoCD Installation Progress') as bar:
+    @steps.step("k8s-delivery", inputs=["gitops-repo"], outputs=["delivery"], checkpoint="k8s-delivery")
+    def k8s_delivery():
+        echo("8/12: Installing ArgoCD...")
+        with alive_bar(17, title='ArgoCD Installation Progress') as bar:
 
-            kube_client = init_k8s_client(cloud_man, p)
+            kube_client = get_kube_client()
             cd_man = DeliveryServiceManager(kube_client)
             bar()
 
@@ -494,14 +499,8 @@ def setup(
             kube_client.wait_for_deployment(dns_deployment)
             bar()  # Add a few here
 
-            kube_client.create_namespace(ARGOCD_NAMESPACE)
-            bar()
-            kube_client.create_service_account(ARGOCD_NAMESPACE, argocd_bootstrap_name)
-            bar()
-            kube_client.create_cluster_role(ARGOCD_NAMESPACE, argocd_bootstrap_name)
-            bar()
-
-            kube_client.create_cluster_role_binding(ARGOCD_NAMESPACE, argocd_bootstrap_name, argocd_bootstrap_name)
+            # namespace and bootstrap RBAC objects are applied in a single parallel batch
+            kube_client.ensure(cd_man.get_argocd_bootstrap_objects(argocd_bootstrap_name))
             bar()
 
             job = cd_man.create_argocd_bootstrap_job(argocd_bootstrap_name)
@@ -513,18 +512,16 @@ def setup(
                 kube_client.remove_cluster_role(argocd_bootstrap_name)
                 kube_client.remove_cluster_role_binding(argocd_bootstrap_name)
             except Exception as e:
-                click.echo("Could not clean up ArgoCD bootstrap temporary resources, manual clean-up is required")
+                echo("Could not clean up ArgoCD bootstrap temporary resources, manual clean-up is required")
             bar()
 
             # wait for ArgoCD to be ready
 
             argocd_ss = kube_client.get_stateful_set_objects(ARGOCD_NAMESPACE, "argocd-application-controller")
-            kube_client.wait_for_stateful_set(argocd_ss)
             bar()
 
             # 	argocd-server
             argocd_server = kube_client.get_deployment(ARGOCD_NAMESPACE, "argocd-server")
-            kube_client.wait_for_deployment(argocd_server)
             bar()  # add a few here
             # wait for additional ArgoCD Pods to transition to Running
             # this is related to a condition where apps attempt to deploy before
@@ -534,19 +531,19 @@ def setup(
 
             # 	argocd-repo-server
             argocd_repo_server = kube_client.get_deployment(ARGOCD_NAMESPACE, "argocd-repo-server")
-            kube_client.wait_for_deployment(argocd_repo_server)
             bar()
 
             # HA components
 
             # argocd-redis-ha-haproxy Deployment
             argocd_redis_ha_haproxy = kube_client.get_deployment(ARGOCD_NAMESPACE, "argocd-redis-ha-haproxy")
-            kube_client.wait_for_deployment(argocd_redis_ha_haproxy)
-            bar()
 
             # argocd-redis-ha StatefulSet
-            cert_manager = kube_client.get_stateful_set_objects(ARGOCD_NAMESPACE, "argocd-redis-ha-server")
-            kube_client.wait_for_stateful_set(cert_manager)
+            argocd_redis_ha_ss = kube_client.get_stateful_set_objects(ARGOCD_NAMESPACE, "argocd-redis-ha-server")
+            bar()
+
+            wait_for_resources(kube_client, [argocd_ss, argocd_server, argocd_repo_server, argocd_redis_ha_haproxy,
+                                             argocd_redis_ha_ss])
             bar()
 
             # create additional namespaces
@@ -634,34 +631,25 @@ def setup(
                                            p.parameters["<CD_SERVICE_EXCLUDE_LIST>"])
             bar()
 
-            p.set_checkpoint("k8s-delivery")
-            p.save_checkpoint()
-
-        click.echo("8/12: Installing ArgoCD. Done!")
-    else:
-        click.echo("8/12: Skipped ArgoCD installation.")
+        echo("8/12: Installing ArgoCD. Done!")
 
     # initialize and unseal vault
-    if not p.has_checkpoint("secrets-management"):
-        click.echo("9/12: Initializing Secrets Manager...")
-        with alive_bar(7, title='Initializing Secrets Manager') as bar:
+    @steps.step("secrets-management", inputs=["delivery"], outputs=["secrets-manager"],
+                checkpoint="secrets-management")
+    def secrets_management():
+        echo("9/12: Initializing Secrets Manager...")
+        with alive_bar(6, title='Initializing Secrets Manager') as bar:
 
-            # default AWS EKS auth token life-time is 14m
-            # to be safe should refresh token before proceeding
-            kube_client = init_k8s_client(cloud_man, p)
+            kube_client = get_kube_client()
             bar()
 
             # wait for cert manager as it's created just before vault
             cert_manager = kube_client.get_deployment("cert-manager", "cert-manager")
-            kube_client.wait_for_deployment(cert_manager)
-            bar()
-
             external_dns = kube_client.get_deployment("external-dns", "external-dns")
-            kube_client.wait_for_deployment(external_dns)
             bar()
 
-            external_dns = kube_client.get_deployment("ingress-nginx", "ingress-nginx-controller")
-            kube_client.wait_for_deployment(external_dns)
+            ingress_nginx = kube_client.get_deployment("ingress-nginx", "ingress-nginx-controller")
+            wait_for_resources(kube_client, [cert_manager, external_dns, ingress_nginx])
             bar()
 
             # wait for vault readiness
@@ -719,28 +707,23 @@ def setup(
             bar()
 
         p.internals["VAULT_ROOT_TOKEN"] = vault_root_token[0]
-        p.set_checkpoint("secrets-management")
-        p.save_checkpoint()
 
-        click.echo("9/12: Secrets Manager initialization. Done!")
-    else:
-        click.echo("9/12: Skipped Secrets Manager initialization.")
+        echo("9/12: Secrets Manager initialization. Done!")
 
-    if not p.has_checkpoint("secrets-management-tf"):
-        click.echo("10/12: Setting Secrets...")
+    @steps.step("secrets-management-tf", inputs=["secrets-manager"], outputs=["secrets"],
+                checkpoint="secrets-management-tf")
+    def secrets_management_tf():
+        echo("10/12: Setting Secrets...")
 
         with alive_bar(5, title='Secret Manager Pre-Deployment Readiness') as bar:
-            # default AWS EKS auth token life-time is 14m
-            # to be safe should refresh token before proceeding
-            kube_client = init_k8s_client(cloud_man, p)
+            kube_client = get_kube_client()
             bar()
 
             ingress = kube_client.get_ingress(VAULT_NAMESPACE, "vault")
-            kube_client.wait_for_ingress(ingress)
             bar()
 
             tls_cert = kube_client.get_certificate(VAULT_NAMESPACE, "vault-tls")
-            kube_client.wait_for_certificate(tls_cert)
+            wait_for_resources(kube_client, [ingress, tls_cert])
             bar()
 
             wait_http_endpoint_readiness(f'https://{p.parameters["<SECRET_MANAGER_INGRESS_URL>"]}')
@@ -753,12 +736,10 @@ def setup(
                     "VAULT_ADDR": f'https://{p.parameters["<SECRET_MANAGER_INGRESS_URL>"]}',
                 },
                 **cloud_provider_auth_env_vars}
-            # set envs as required by tf
-            set_envs(sec_man_tf_env_vars)
             bar()
 
-        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_SECRETS_MANAGER)
-        tf_wrapper.init()
+        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_SECRETS_MANAGER, profiler=tf_profiler, env=sec_man_tf_env_vars)
+        tf_wrapper.ensure_init()
 
         sec_man_tf_params = {
             "vcs_bot_ssh_public_key": p.internals["DEFAULT_SSH_PUBLIC_KEY"],
@@ -799,20 +780,13 @@ def setup(
         robo_user_name = "robot@main-robot"
         p.internals["REGISTRY_ROBO_USER"] = robo_user_name
 
-        # unset envs as no longer needed
-        unset_envs(sec_man_tf_env_vars)
-
         kube_client.create_configmap(VAULT_NAMESPACE, "vault-init", {})
 
-        p.set_checkpoint("secrets-management-tf")
-        p.save_checkpoint()
-        click.echo("10/12: Secrets set. Done!")
+        echo("10/12: Secrets set. Done!")
 
-    else:
-        click.echo("10/12: Skipped setting Secrets.")
-
-    if not p.has_checkpoint("users-tf"):
-        click.echo("11/12: Provisioning Users...")
+    @steps.step("users-tf", inputs=["secrets"], outputs=["users"], checkpoint="users-tf")
+    def users_tf():
+        echo("11/12: Provisioning Users...")
 
         # run security manager tf to create secrets and roles
         user_man_tf_env_vars = {
@@ -822,59 +796,30 @@ def setup(
             },
             **cloud_provider_auth_env_vars,
             **git_provider_env_vars}
-        # set envs as required by tf
-        set_envs(user_man_tf_env_vars)
 
-        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_USERS)
-        tf_wrapper.init()
+        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_USERS, profiler=tf_profiler, env=user_man_tf_env_vars)
+        tf_wrapper.ensure_init()
         tf_wrapper.apply()
         user_man_out = tf_wrapper.output()
 
-        # unset envs as no longer needed
-        unset_envs(user_man_tf_env_vars)
-
-        p.set_checkpoint("users-tf")
-        p.save_checkpoint()
-        click.echo("11/12: Users provisioning. Done!")
-    else:
-        click.echo("11/12: Skipped provisioning Users.")
-
-    if not p.has_checkpoint("core-services-tf"):
-        click.echo("12/12: Configuring core services...")
-
-        with alive_bar(9, title='Core Services Pre-Deployment Readiness') as bar:
-            # default AWS EKS auth token life-time is 14m
-            # to be safe should refresh token before proceeding
-            kube_client = init_k8s_client(cloud_man, p)
-            bar()
-
-            # wait for harbor readiness
-            harbor_dep = kube_client.get_deployment(HARBOR_NAMESPACE, "harbor-core")
-            kube_client.wait_for_deployment(harbor_dep)
-            bar()
-
-            harbor_ingress = kube_client.get_ingress(HARBOR_NAMESPACE, "harbor-ingress")
-            kube_client.wait_for_ingress(harbor_ingress)
-            bar()
-
-            harbor_tls_cert = kube_client.get_certificate(HARBOR_NAMESPACE, "harbor-tls")
-            kube_client.wait_for_certificate(harbor_tls_cert)
-            bar()
-
-            # wait for sonarqube readiness
-            sonar_ss = kube_client.get_stateful_set_objects(SONARQUBE_NAMESPACE, "sonarqube-sonarqube")
-            kube_client.wait_for_stateful_set(sonar_ss)
-            bar()
+        echo("11/12: Users provisioning. Done!")
 
-            sonar_pod = kube_client.get_pod(SONARQUBE_NAMESPACE, "sonarqube-sonarqube-0")
-            kube_client.wait_for_pod(sonar_pod)
+    @steps.step("core-services-tf", inputs=["users"], outputs=["core-services"], checkpoint="core-services-tf")
+    def core_services_tf():
+        echo("12/12: Configuring core services...")
 
-            sonar_ingress = kube_client.get_ingress(SONARQUBE_NAMESPACE, "sonarqube-sonarqube")
-            kube_client.wait_for_ingress(sonar_ingress)
+        with alive_bar(4, title='Core Services Pre-Deployment Readiness') as bar:
+            cd_man = DeliveryServiceManager(get_kube_client())
             bar()
 
-            sonar_tls_cert = kube_client.get_certificate(SONARQUBE_NAMESPACE, "sonarqube-tls")
-            kube_client.wait_for_certificate(sonar_tls_cert)
+            # ArgoCD health of harbor and sonarqube applications covers their deployments, statefulsets,
+            # ingresses and certificates, all applications are waited for simultaneously
+            stragglers = cd_man.wait_for_apps(
+                healthy=["harbor-components", "sonarqube-components"],
+                on_progress=lambda app, health, sync: echo(f"{app}: {health}, {sync}")
+            )
+            if stragglers:
+                echo(f"Applications are not healthy: {', '.join(stragglers)}. Continuing...")
             bar()
 
             # wait for registry API endpoint readiness
@@ -892,12 +837,10 @@ def setup(
                     "VAULT_ADDR": f'https://{p.parameters["<SECRET_MANAGER_INGRESS_URL>"]}',
                 },
                 **cloud_provider_auth_env_vars}
-            # set envs as required by tf
-            set_envs(core_services_tf_env_vars)
             bar()
 
-        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_CORE_SERVICES)
-        tf_wrapper.init()
+        tf_wrapper = TfWrapper(LOCAL_TF_FOLDER_CORE_SERVICES, profiler=tf_profiler, env=core_services_tf_env_vars)
+        tf_wrapper.ensure_init()
         tf_wrapper.apply({
             "registry_oidc_client_id": p.internals["REGISTRY_OIDC_CLIENT_ID"],
             "registry_oidc_client_secret": p.internals["REGISTRY_OIDC_CLIENT_SECRET"],
@@ -916,22 +859,34 @@ def setup(
         p.parameters[
             "<REGISTRY_QUAY_PROXY>"] = f'{p.parameters["<REGISTRY_REGISTRY_URL>"]}/{core_services_out["quay_proxy_name"]}'
 
-        # unset envs as no longer needed
-        unset_envs(core_services_tf_env_vars)
-
-        p.set_checkpoint("core-services-tf")
-        p.save_checkpoint()
-        click.echo("12/12: Configuring core services. Done!")
-
-    else:
-        click.echo("12/12: Skipped core services configuration.")
+        echo("12/12: Configuring core services. Done!")
 
-    if not p.has_checkpoint("tf-store-hardening"):
+    @steps.step("tf-store-hardening", inputs=["core-services"], checkpoint="tf-store-hardening")
+    def tf_store_hardening():
         # restrict access to IaC remote state store
         cloud_man.protect_iac_state_storage(p.internals["TF_BACKEND_STORAGE_NAME"],
                                             p.parameters["<IAC_PR_AUTOMATION_IAM_ROLE_RN>"])
-        p.set_checkpoint("tf-store-hardening")
-        p.save_checkpoint()
+
+    skipped_messages = {
+        "preflight": "1/12: Skipped pre-flight checks.",
+        "dependencies": "2/12: Skipped dependencies check.",
+        "one-time-setup": "3/12: Skipped setting initial parameters.",
+        "repo-prep": "4/12: Skipped GitOps code prep.",
+        "vcs-tf": "5/12: Skipped VCS provisioning.",
+        "k8s-tf": "6/12: Skipped K8s provisioning.",
+        "gitops-vcs": "7/12: Skipped GitOps repo initialization.",
+        "k8s-delivery": "8/12: Skipped ArgoCD installation.",
+        "secrets-management": "9/12: Skipped Secrets Manager initialization.",
+        "secrets-management-tf": "10/12: Skipped setting Secrets.",
+        "users-tf": "11/12: Skipped provisioning Users.",
+        "core-services-tf": "12/12: Skipped core services configuration.",
+    }
+
+    def on_skip(name: str):
+        if name in skipped_messages:
+            echo(skipped_messages[name])
+
+    steps.run(on_skip=on_skip)
 
     show_credentials(p)
 
@@ -942,17 +897,28 @@ def setup(
     minutes, seconds = divmod(total_seconds, 60)
 
     # Display the result with minutes as integers and seconds with two decimal places
-    click.echo(f"Platform setup completed in {int(minutes)} minutes, {int(seconds)} seconds")
+    echo(f"Platform setup completed in {int(minutes)} minutes, {int(seconds)} seconds")
 
     return True
 
 
+def echo(message: str):
+    """
+    Prints a message, prefixed with the step name when printed by a setup step, as steps run concurrently.
+    """
+    name = current_step()
+    click.echo(message if name is None else f"[{name}] {message}")
+
+
 @trace()
 def init_k8s_client(cloud_man, p):
     if p.cloud_provider == CloudProviders.AWS:
-        k8s_token = cloud_man.get_k8s_token(p.parameters["<PRIMARY_CLUSTER_NAME>"])
+        # EKS tokens live 14m, the provider refreshes them in background, so a single client serves all stages
+        credential_provider = TokenCredentialProvider(
+            lambda: cloud_man.get_k8s_credential(p.parameters["<PRIMARY_CLUSTER_NAME>"]))
+        credential_provider.start()
         kube_client = KubeClient(ca_cert_path=p.internals["CC_CLUSTER_CA_CERT_PATH"],
-                                 api_key=k8s_token,
+                                 credential_provider=credential_provider,
                                  endpoint=p.internals["CC_CLUSTER_ENDPOINT"])
     elif p.cloud_provider == CloudProviders.GCP:
         kube_client = KubeClient(
@@ -963,6 +929,12 @@ def init_k8s_client(cloud_man, p):
     return kube_client
 
 
+def wait_for_resources(kube_client: KubeClient, resources: list, timeout: int = 300):
+    stragglers = kube_client.wait_for_all(resources, timeout)
+    if stragglers:
+        echo(f"Resources are not ready after {timeout} seconds: {', '.join(stragglers)}. Continuing...")
+
+
 @trace()
 def show_credentials(p):
     user_name = PLATFORM_USER_NAME
@@ -1119,23 +1091,23 @@ def setup_param_validator(params: StateStore) -> bool:
             (params.get_input_param(CLOUD_PROFILE) is not None
              or params.get_input_param(CLOUD_ACCOUNT_ACCESS_KEY) is None
              or params.get_input_param(CLOUD_ACCOUNT_ACCESS_SECRET) is None)):
-        click.echo("Cloud account keys validation error: should specify only one of profile or key + secret")
+        echo("Cloud account keys validation error: should specify only one of profile or key + secret")
         return False
 
     if params.get_input_param(OPTIONAL_SERVICES):
         incorrect_services = [v for v in params.get_input_param(OPTIONAL_SERVICES) if not OptionalServices.has_value(v)]
         if incorrect_services:
-            click.echo(
+            echo(
                 f"Features list parsing error: unsupported features found - {str.join(', ', incorrect_services)}")
             return False
 
     if params.get_input_param(IMAGE_REGISTRY_AUTH):
         for k, v in params.get_input_param(IMAGE_REGISTRY_AUTH).items():
             if "login" not in v and "token" not in v:
-                click.echo(f"Image registry auth {k} has incorrect structure")
+                echo(f"Image registry auth {k} has incorrect structure")
                 return False
             if not v["login"] and not v["token"]:
-                click.echo(f"Image registry {k} should have login and token specified")
+                echo(f"Image registry {k} should have login and token specified")
                 return False
 
     return True
@@ -1,15 +1,20 @@
 import click
 
-from .bootstrap import bootstrap
-from .create import create
-from .delete import delete
+from common.utils.lazy_group import LazyGroup
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "bootstrap": "commands.workload.bootstrap.bootstrap",
+        "create": "commands.workload.create.create",
+        "delete": "commands.workload.delete.delete",
+    },
+    lazy_help={
+        "bootstrap": "Bootstrap a new workload environment.",
+        "create": "Create workload boilerplate for GitOps.",
+        "delete": "Deletes all the workload boilerplate.",
+    }
+)
 def workload():
     pass
-
-
-workload.add_command(bootstrap)
-workload.add_command(create)
-workload.add_command(delete)
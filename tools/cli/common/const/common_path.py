@@ -12,7 +12,16 @@ LOCAL_TF_FOLDER_VCS = LOCAL_TF_FOLDER / "vcs"
 LOCAL_TF_FOLDER_CORE_SERVICES = LOCAL_TF_FOLDER / "core_services"
 LOCAL_TOOLS_FOLDER = LOCAL_FOLDER / "tools"
 LOCAL_TF_TOOL = LOCAL_TOOLS_FOLDER / "terraform"
+LOCAL_TF_PLUGIN_CACHE_FOLDER = LOCAL_TOOLS_FOLDER / "tf_plugin_cache"
 LOCAL_KCTL_TOOL = LOCAL_TOOLS_FOLDER / "kubectl"
+LOCAL_TOOL_VERSION_CACHE = LOCAL_TOOLS_FOLDER / "versions.json"
+# shared by all installations and kept on destroy
+TOOL_CACHE_FOLDER = Path(os.environ.get("CGDEVX_TOOL_CACHE_DIR") or
+                         Path(os.environ.get("XDG_CACHE_HOME") or Path().home() / ".cache") / "cgdevx" / "tools")
 LOCAL_STATE_FILE = LOCAL_FOLDER / "state.yaml"
+LOCAL_STATE_JOURNAL_FILE = LOCAL_FOLDER / "state.journal"
+LOCAL_STATE_CACHE_FILE = LOCAL_FOLDER / "state.cache"
+LOCAL_PARAMETRISATION_MANIFEST = LOCAL_FOLDER / "parametrisation_manifest.json"
+LOCAL_TF_PROFILE_REPORT = LOCAL_FOLDER / "tf_profile.json"
 LOCAL_CC_CLUSTER_WORKLOAD_FOLDER = LOCAL_GITOPS_FOLDER / "gitops-pipelines/delivery/clusters/cc-cluster/workloads"
 LOCAL_WORKLOAD_TEMP_FOLDER = LOCAL_FOLDER / ".wl_tmp"
@@ -1,24 +1,131 @@
+import asyncio
+import functools
+import inspect
 import random
 import time
+from typing import Callable, Optional
+
 from common.logging_config import logger
 
+# HTTP statuses worth retrying, any other status is considered a permanent failure
+TRANSIENT_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# programming errors, retrying them could not help
+PERMANENT_ERRORS = (TypeError, ValueError, KeyError, AttributeError, NotImplementedError)
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    # kubernetes ApiException has status, requests and httpx errors have response with status code
+    status = getattr(e, "status", None)
+    if isinstance(status, int) and status > 0:
+        return status
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(e: Exception) -> bool:
+    """
+    Default exception classifier.
+
+    :param e: Exception raised by the call
+    :return: True if the call should be retried
+    """
+    status = _status_code(e)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    return not isinstance(e, PERMANENT_ERRORS)
+
+
+def is_transient_or_missing(e: Exception) -> bool:
+    """
+    Classifier for reads of resources that are expected to be created shortly, e.g. by ArgoCD.
+
+    :param e: Exception raised by the call
+    :return: True if the call should be retried
+    """
+    return _status_code(e) == 404 or is_transient(e)
 
-def exponential_backoff(max_retries: int = 5, base_delay: float = 15):
-    def decorator(func):
+
+class RetryPolicy:
+    """
+    Retries transient failures with full-jitter exponential backoff.
+
+    Permanent failures are re-raised immediately. Retries stop when either the max number of retries or
+    the deadline is reached, the last failure is re-raised then.
+    Works as a decorator for both regular and async functions.
+    """
+
+    def __init__(self, max_retries: Optional[int] = 5, base_delay: float = 1, max_delay: float = 30,
+                 deadline: Optional[float] = None, classifier: Callable[[Exception], bool] = is_transient):
+        """
+        :param max_retries: Max number of retries, unlimited if None, deadline should be set then
+        :param base_delay: Delay cap of the first retry in seconds, doubled with every retry
+        :param max_delay: Max delay between retries in seconds
+        :param deadline: Overall time budget of the call including retries in seconds
+        :param classifier: Returns True for exceptions that should be retried
+        """
+        if max_retries is None and deadline is None:
+            raise ValueError("Either max_retries or deadline should be set")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.classifier = classifier
+
+    def _next_delay(self, func, attempt: int, started: float, e: Exception) -> float:
+        """
+        :return: Delay before the next attempt, the exception is re-raised if the call should not be retried
+        """
+        if not self.classifier(e):
+            logger.info(f"{func.__qualname__} failed permanently: {e}")
+            raise e
+        if self.max_retries is not None and attempt >= self.max_retries:
+            logger.info(f"{func.__qualname__} failed, max retries reached: {e}")
+            raise e
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+            logger.info(f"{func.__qualname__} failed, deadline reached: {e}")
+            raise e
+
+        logger.info(f"{func.__qualname__} attempt {attempt + 1} failed: {e}. Retrying in {delay:.2f} seconds...")
+        return delay
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                attempt = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        delay = self._next_delay(func, attempt, started, e)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+
+            return async_wrapper
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
+            started = time.monotonic()
+            attempt = 0
+            while True:
                 try:
-                    result_func = func(*args, **kwargs)
-                    return result_func
+                    return func(*args, **kwargs)
                 except Exception as e:
-                    logger.info(f"Attempt {retries + 1} failed: {e}")
-                    retries += 1
-                    delay = (base_delay * 2 ** retries + random.uniform(0, 1))
-                    logger.info(f"Retrying in {delay:.2f} seconds...")
-                    time.sleep(delay)
-            raise Exception("Max retries reached, operation failed.")
+                    delay = self._next_delay(func, attempt, started, e)
+                attempt += 1
+                time.sleep(delay)
 
         return wrapper
 
-    return decorator
+
+def exponential_backoff(max_retries: Optional[int] = 5, base_delay: float = 1, max_delay: float = 30,
+                        deadline: Optional[float] = None, classifier: Callable[[Exception], bool] = is_transient):
+    """
+    Decorator retrying transient failures, see RetryPolicy.
+    """
+    return RetryPolicy(max_retries, base_delay, max_delay, deadline, classifier)
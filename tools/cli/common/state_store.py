@@ -1,20 +1,68 @@
 """Global parameter store."""
+import copy
+import enum
+import json
 import os
+import pickle
+import threading
+from typing import Optional
 
 import yaml
 
-from common.const.common_path import LOCAL_STATE_FILE
+from common.const.common_path import LOCAL_STATE_FILE, LOCAL_STATE_JOURNAL_FILE, LOCAL_STATE_CACHE_FILE
 from common.const.const import STATE_INPUT_PARAMS, STATE_CHECKPOINTS, STATE_INTERNAL_PARAMS, \
     STATE_PARAMS, STATE_FRAGMENTS
 from common.const.parameter_names import CLOUD_PROVIDER, GIT_PROVIDER, DNS_REGISTRAR
 from common.enums.cloud_providers import CloudProviders
 from common.enums.dns_registrars import DnsRegistrars
 from common.enums.git_providers import GitProviders
+from common.logging_config import logger
 from common.tracing_decorator import trace
 
+try:
+    # libyaml based implementation is an order of magnitude faster
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
+_DICT_SECTIONS = (STATE_FRAGMENTS, STATE_PARAMS, STATE_INTERNAL_PARAMS, STATE_INPUT_PARAMS)
+
+
+class _StateDumper(_SafeDumper):
+    pass
+
+
+# enum parameters (e.g. providers) are stored as plain values
+_StateDumper.add_multi_representer(enum.Enum, lambda dumper, data: dumper.represent_data(data.value))
+
+
+def _fsync_dir(path):
+    # directory entries could only be synced on POSIX systems
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
 
 class StateStore:
+    """
+    Global parameter store.
+
+    State is persisted as a snapshot (state.yaml) and an append-only journal of changes made since the snapshot.
+    A save appends only the changed entries, the journal is compacted into a new snapshot once it grows.
+    Both files are written with fsync, the snapshot is replaced atomically, so a crash loses at most the save
+    in progress.
+    """
+    JOURNAL_COMPACTION_RECORDS = 200
+    # keeps parsed snapshot in a binary cache validated by snapshot modification time and size
+    USE_SNAPSHOT_CACHE = True
+
     _store: dict = {}
+    _persisted: dict = {}
+    _journal_records: int = 0
+    _save_lock = threading.Lock()
 
     def __init__(self, input_params: None | dict = None):
         if input_params is None:
@@ -25,18 +73,22 @@ class StateStore:
         self._store[STATE_INTERNAL_PARAMS] = {}
         self._store[STATE_INPUT_PARAMS] = {}
 
-        if os.path.exists(LOCAL_STATE_FILE):
-            with open(LOCAL_STATE_FILE, "r+") as infile:
-                config = yaml.safe_load(infile)
-                try:
-                    self._store[STATE_CHECKPOINTS] = config[STATE_CHECKPOINTS]
-                    self._store[STATE_FRAGMENTS] = config[STATE_FRAGMENTS]
-                    self._store[STATE_PARAMS] = config[STATE_PARAMS]
-                    self._store[STATE_INTERNAL_PARAMS] = config[STATE_INTERNAL_PARAMS]
-                    self._store[STATE_INPUT_PARAMS] = config[STATE_INPUT_PARAMS]
-                except KeyError as error:
-                    # ToDo: Handle missing parameters
-                    pass
+        config = self._load_snapshot()
+        if config is not None:
+            try:
+                self._store[STATE_CHECKPOINTS] = config[STATE_CHECKPOINTS]
+                self._store[STATE_FRAGMENTS] = config[STATE_FRAGMENTS]
+                self._store[STATE_PARAMS] = config[STATE_PARAMS]
+                self._store[STATE_INTERNAL_PARAMS] = config[STATE_INTERNAL_PARAMS]
+                self._store[STATE_INPUT_PARAMS] = config[STATE_INPUT_PARAMS]
+            except KeyError as error:
+                # ToDo: Handle missing parameters
+                pass
+            StateStore._journal_records = self._replay_journal()
+        else:
+            StateStore._journal_records = 0
+            self._discard_journal()
+        StateStore._persisted = self._copy_store()
         self._store[STATE_INPUT_PARAMS].update(input_params)
 
     @property
@@ -99,11 +151,139 @@ class StateStore:
     def has_checkpoint(cls, name: str):
         return name in cls._store[STATE_CHECKPOINTS]
 
+    @classmethod
+    def _load_snapshot(cls) -> Optional[dict]:
+        if not os.path.exists(LOCAL_STATE_FILE):
+            return None
+        st = os.stat(LOCAL_STATE_FILE)
+        if cls.USE_SNAPSHOT_CACHE and os.path.exists(LOCAL_STATE_CACHE_FILE):
+            try:
+                with open(LOCAL_STATE_CACHE_FILE, "rb") as cache:
+                    cached = pickle.load(cache)
+                if cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+                    return cached["config"]
+            except Exception as e:
+                logger.debug(f"Ignoring state cache: {e}")
+
+        with open(LOCAL_STATE_FILE, "r") as infile:
+            config = yaml.load(infile, Loader=_SafeLoader)
+        cls._write_snapshot_cache(config, st)
+        return config
+
+    @classmethod
+    def _write_snapshot_cache(cls, config: dict, st: os.stat_result):
+        if not cls.USE_SNAPSHOT_CACHE:
+            return
+        try:
+            tmp_path = f"{LOCAL_STATE_CACHE_FILE}.tmp"
+            with open(tmp_path, "wb") as cache:
+                pickle.dump({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "config": config}, cache,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, LOCAL_STATE_CACHE_FILE)
+        except (OSError, pickle.PicklingError) as e:
+            logger.debug(f"Could not write state cache: {e}")
+
+    @classmethod
+    def _copy_store(cls) -> dict:
+        # shallow copy of sections is atomic, so steps running concurrently could keep updating the store
+        return {k: copy.deepcopy(v.copy()) for k, v in cls._store.items()}
+
+    @classmethod
+    def _apply_record(cls, record: dict):
+        section, op = record["section"], record["op"]
+        if op == "set":
+            cls._store[section][record["key"]] = record["value"]
+        elif op == "delete":
+            cls._store[section].pop(record["key"], None)
+        elif op == "append":
+            # replay is idempotent, journal could be replayed on top of the snapshot it was compacted into
+            if record["value"] not in cls._store[section]:
+                cls._store[section].append(record["value"])
+        elif op == "replace":
+            cls._store[section] = record["value"]
+
+    @classmethod
+    def _discard_journal(cls):
+        # journal holds changes on top of a snapshot, it is meaningless once the snapshot is gone
+        if os.path.exists(LOCAL_STATE_JOURNAL_FILE):
+            logger.warning("Removing state journal left without state snapshot")
+            os.remove(LOCAL_STATE_JOURNAL_FILE)
+
+    @classmethod
+    def _replay_journal(cls) -> int:
+        if not os.path.exists(LOCAL_STATE_JOURNAL_FILE):
+            return 0
+        count = 0
+        valid_size = 0
+        torn = False
+        with open(LOCAL_STATE_JOURNAL_FILE, "rb") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    torn = True
+                    break
+                cls._apply_record(record)
+                valid_size += len(line)
+                count += 1
+        if torn:
+            # record torn by a crash during the last save, cut it off so new records could follow
+            logger.warning("Ignoring incomplete state journal record")
+            os.truncate(LOCAL_STATE_JOURNAL_FILE, valid_size)
+        return count
+
+    @classmethod
+    def _diff(cls, current: dict) -> list[dict]:
+        records = []
+        for section in _DICT_SECTIONS:
+            old, new = cls._persisted.get(section, {}), current[section]
+            for key, value in new.items():
+                if key not in old or old[key] != value:
+                    records.append({"section": section, "op": "set", "key": key, "value": value})
+            for key in old.keys() - new.keys():
+                records.append({"section": section, "op": "delete", "key": key})
+
+        old, new = cls._persisted.get(STATE_CHECKPOINTS, []), current[STATE_CHECKPOINTS]
+        if new[:len(old)] == old:
+            records.extend({"section": STATE_CHECKPOINTS, "op": "append", "value": c} for c in new[len(old):])
+        else:
+            records.append({"section": STATE_CHECKPOINTS, "op": "replace", "value": new})
+        return records
+
+    @classmethod
+    def _write_snapshot(cls, snapshot: dict):
+        tmp_path = f"{LOCAL_STATE_FILE}.tmp"
+        with open(tmp_path, "w") as outfile:
+            yaml.dump(snapshot, outfile, Dumper=_StateDumper, default_flow_style=False)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, LOCAL_STATE_FILE)
+        cls._write_snapshot_cache(snapshot, os.stat(LOCAL_STATE_FILE))
+        # journal is removed only after the new snapshot is durable
+        if os.path.exists(LOCAL_STATE_JOURNAL_FILE):
+            os.remove(LOCAL_STATE_JOURNAL_FILE)
+        _fsync_dir(os.path.dirname(LOCAL_STATE_FILE))
+        cls._journal_records = 0
+
     @classmethod
     def save_checkpoint(cls):
         os.makedirs(os.path.dirname(LOCAL_STATE_FILE), exist_ok=True)
-        with open(LOCAL_STATE_FILE, "w+") as outfile:
-            yaml.dump(cls._store, outfile, default_flow_style=False)
+        with cls._save_lock:
+            current = cls._copy_store()
+            if not os.path.exists(LOCAL_STATE_FILE):
+                cls._write_snapshot(current)
+            else:
+                records = cls._diff(current)
+                if not records:
+                    return
+                with open(LOCAL_STATE_JOURNAL_FILE, "a") as journal:
+                    journal.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                cls._journal_records += len(records)
+                if cls._journal_records >= cls.JOURNAL_COMPACTION_RECORDS:
+                    cls._write_snapshot(current)
+            cls._persisted = current
 
 
 def param_validator(paras: StateStore) -> bool:
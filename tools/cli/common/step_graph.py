@@ -0,0 +1,180 @@
+"""Dependency graph of resumable command steps."""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Optional
+
+from common.logging_config import logger
+from common.state_store import StateStore
+from common.tracing_decorator import span
+
+_current = threading.local()
+
+
+def current_step() -> Optional[str]:
+    """
+    :return: Name of the step executed by the calling thread, None outside of steps.
+    """
+    return getattr(_current, "name", None)
+
+
+class Step:
+    """Unit of work with declared inputs and outputs."""
+
+    def __init__(self, name: str, func: Callable[[], None], inputs: Iterable[str] = (),
+                 outputs: Iterable[str] = (), checkpoint: Optional[str] = None, always: bool = False):
+        """
+        :param name: Unique step name
+        :param func: Callable doing the actual work
+        :param inputs: Names of the artifacts the step consumes
+        :param outputs: Names of the artifacts the step produces
+        :param checkpoint: State store checkpoint marking the step as completed
+        :param always: Flag to run the step on every run, e.g. to refresh values other steps rely on
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.checkpoint = checkpoint
+        self.always = always
+
+
+class StepGraph:
+    """
+    Executes steps concurrently as soon as all the artifacts they consume are produced.
+
+    Steps are skipped when their checkpoint is already stored, or when every step depending on them is already
+    completed, which keeps resume semantics of the linear checkpoint chain. Steps marked as always are never skipped.
+    Steps running concurrently interleave their output, use current_step() to attribute it.
+    """
+
+    def __init__(self, state: StateStore, max_workers: int = 4):
+        self._state = state
+        self._max_workers = max_workers
+        self._steps: dict[str, Step] = {}
+        self._producers: dict[str, str] = {}
+
+    def add(self, step: Step) -> Step:
+        if step.name in self._steps:
+            raise ValueError(f"Step {step.name} is already defined")
+        for output in step.outputs:
+            if output in self._producers:
+                raise ValueError(f"Artifact {output} is produced by both {self._producers[output]} and {step.name}")
+            self._producers[output] = step.name
+        self._steps[step.name] = step
+        return step
+
+    def step(self, name: str, inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+             checkpoint: Optional[str] = None, always: bool = False):
+        """
+        Decorator registering a function as a graph step.
+        """
+
+        def decorator(func):
+            self.add(Step(name, func, inputs, outputs, checkpoint, always))
+            return func
+
+        return decorator
+
+    def _dependencies(self) -> dict[str, set[str]]:
+        deps = {}
+        for name, step in self._steps.items():
+            deps[name] = set()
+            for artifact in step.inputs:
+                if artifact not in self._producers:
+                    raise ValueError(f"Artifact {artifact} required by {name} is not produced by any step")
+                deps[name].add(self._producers[artifact])
+        return deps
+
+    def _topological_order(self, deps: dict[str, set[str]]) -> list[str]:
+        order = []
+        remaining = {name: set(d) for name, d in deps.items()}
+        while remaining:
+            ready = [name for name, d in remaining.items() if not d]
+            if not ready:
+                raise ValueError(f"Cyclic dependency between steps: {', '.join(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for d in remaining.values():
+                d.difference_update(ready)
+        return order
+
+    def _completed_steps(self, deps: dict[str, set[str]], order: list[str]) -> set[str]:
+        dependants = {name: set() for name in deps}
+        for name, d in deps.items():
+            for dep in d:
+                dependants[dep].add(name)
+
+        # always run steps are executed anyway, but count as completed for inference when their dependants are
+        completed = set()
+        inferred = set()
+        for name in reversed(order):
+            step = self._steps[name]
+            if step.checkpoint is not None and self._state.has_checkpoint(step.checkpoint):
+                inferred.add(name)
+            elif dependants[name] and dependants[name] <= inferred:
+                inferred.add(name)
+            if name in inferred and not step.always:
+                completed.add(name)
+        return completed
+
+    def _run_step(self, step: Step):
+        _current.name = step.name
+        try:
+            with span(f"step {step.name}", inputs=",".join(step.inputs), outputs=",".join(step.outputs)):
+                step.func()
+        finally:
+            _current.name = None
+
+    def _save(self, step: Step):
+        if step.checkpoint is None:
+            return
+        self._state.set_checkpoint(step.checkpoint)
+        self._state.save_checkpoint()
+
+    def run(self, on_skip: Optional[Callable[[str], None]] = None):
+        """
+        Runs all pending steps.
+
+        On failure no new steps are scheduled, running steps are allowed to finish and the first error is re-raised.
+
+        :param on_skip: Optional callback receiving names of the steps skipped as already completed
+        """
+        deps = self._dependencies()
+        order = self._topological_order(deps)
+        done = self._completed_steps(deps, order)
+
+        for name in order:
+            if name in done and on_skip is not None:
+                on_skip(name)
+
+        pending = [name for name in order if name not in done]
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="step") as pool:
+            while pending or running:
+                if error is None:
+                    for name in [n for n in pending if deps[n] <= done]:
+                        pending.remove(name)
+                        logger.info(f"Starting step {name}")
+                        running[pool.submit(self._run_step, self._steps[name])] = name
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        logger.error(f"Step {name} failed: {exc}")
+                        if error is None:
+                            error = exc
+                        continue
+                    self._save(self._steps[name])
+                    done.add(name)
+                    logger.info(f"Step {name} completed")
+
+        if error is not None:
+            raise error
@@ -1,35 +1,293 @@
+import atexit
+import contextlib
+import enum
 import functools
+import json
 import logging
+import math
+import os
+import pathlib
+import random
+import reprlib
+import threading
+import time
+from typing import Optional
 
 from common.logging_config import logger
 
+# longest argument or result representation written to the log
+MAX_REPR_LENGTH = 256
+
+
+class _TraceRepr(reprlib.Repr):
+    """
+    Truncated representation of arguments and results.
+
+    Containers and builtin values are formatted lazily up to the limits, but reprlib calls the full repr() of other
+    objects before truncating it, which is expensive for e.g. Kubernetes models. Such objects are represented by
+    their type name only, except for paths and enums that are cheap to format.
+    """
+
+    def repr_instance(self, x, level):
+        if type(x).__module__ == "builtins" or isinstance(x, (pathlib.PurePath, enum.Enum)):
+            return super().repr_instance(x, level)
+        return f"<{type(x).__qualname__}>"
+
+
+_repr = _TraceRepr()
+_repr.maxstring = _repr.maxother = _repr.maxlong = MAX_REPR_LENGTH
+
+
+def _parse_sample_rate(value) -> float:
+    """
+    :param value: Sample rate setting.
+    :return: Sample rate clamped to [0, 1], 1 if the setting is not a number.
+    """
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        rate = math.nan
+    if math.isnan(rate):
+        logger.warning(f"Invalid trace sample rate {value!r}, logging all calls")
+        return 1.0
+    return min(1.0, max(0.0, rate))
+
+
+_sample_rate: float = _parse_sample_rate(os.environ.get("CGDEVX_TRACE_SAMPLE_RATE", 1.0))
+_histogram_file: Optional[str] = None
+_histograms: dict = {}
+_histograms_lock = threading.Lock()
+_span_recorder: Optional["_SpanRecorder"] = None
+
+
+class _DurationHistogram:
+    """Call durations of a single function, bucketed by powers of two milliseconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        bucket = 2 ** max(0, math.ceil(math.log2(duration * 1000))) if duration > 0 else 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6),
+            "min_s": round(self.min, 6),
+            "max_s": round(self.max, 6),
+            "buckets_ms": {f"<={k}": v for k, v in sorted(self.buckets.items())},
+        }
+
+
+class _SpanRecorder:
+    """
+    Collects finished spans and writes them as Chrome trace events or OTLP JSON.
+
+    Span nesting is tracked per thread.
+    """
+
+    def __init__(self, path: str, output_format: str = "chrome"):
+        if output_format not in ("chrome", "otlp"):
+            raise ValueError(f"Unsupported span format {output_format}")
+        self.path = path
+        self.format = output_format
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self._spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, name: str, attributes: dict):
+        stack = self._local.__dict__.setdefault("stack", [])
+        span = {
+            "name": name,
+            "span_id": f"{random.getrandbits(64):016x}",
+            "parent_id": stack[-1] if stack else None,
+            "thread": threading.current_thread().name,
+            "tid": threading.get_ident(),
+            "attributes": attributes,
+            "error": None,
+            "start": time.time_ns(),
+        }
+        stack.append(span["span_id"])
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["end"] = time.time_ns()
+            stack.pop()
+            with self._lock:
+                self._spans.append(span)
+
+    def _chrome_events(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for span in self._spans:
+            args = dict(span["attributes"], thread=span["thread"])
+            if span["error"] is not None:
+                args["error"] = span["error"]
+            events.append({
+                "name": span["name"],
+                "cat": "error" if span["error"] is not None else "call",
+                "ph": "X",
+                "ts": span["start"] / 1000,
+                "dur": (span["end"] - span["start"]) / 1000,
+                "pid": pid,
+                "tid": span["tid"],
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _otlp(self) -> dict:
+        spans = []
+        for span in self._spans:
+            attributes = dict(span["attributes"], **{"thread.name": span["thread"]})
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start"]),
+                "endTimeUnixNano": str(span["end"]),
+                "attributes": [{"key": k, "value": {"stringValue": str(v)}} for k, v in attributes.items()],
+                "status": {"code": 1},
+            }
+            if span["parent_id"] is not None:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            if span["error"] is not None:
+                otlp_span["status"] = {"code": 2, "message": span["error"]}
+            spans.append(otlp_span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "cgdevxcli"}}]},
+            "scopeSpans": [{"scope": {"name": "cgdevxcli"}, "spans": spans}],
+        }]}
+
+    def dump(self):
+        with self._lock:
+            data = self._chrome_events() if self.format == "chrome" else self._otlp()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump(data, file)
+
+
+def configure_tracing(sample_rate: float = 1.0, histogram_file: Optional[str] = None,
+                      span_file: Optional[str] = None, span_format: str = "chrome") -> None:
+    """
+    Configures traced calls.
+
+    :param sample_rate: Share of calls with arguments and results logged, from 0 to 1.
+    :param histogram_file: File call duration histograms are written to on exit, histograms are not collected if None.
+    :param span_file: File spans of traced calls are written to on exit, spans are not collected if None.
+    :param span_format: Span file format, "chrome" trace events (Perfetto, chrome://tracing) or "otlp" JSON.
+    """
+    global _sample_rate, _histogram_file, _span_recorder
+    _sample_rate = _parse_sample_rate(sample_rate)
+    if histogram_file is not None and _histogram_file is None:
+        atexit.register(dump_histograms)
+    _histogram_file = histogram_file
+    if span_file is not None:
+        if _span_recorder is None:
+            atexit.register(lambda: _span_recorder is not None and _span_recorder.dump())
+        _span_recorder = _SpanRecorder(span_file, span_format)
+    else:
+        _span_recorder = None
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Records a span around the block when span export is enabled.
+
+    :param name: Span name.
+    :param attributes: Span attributes.
+    """
+    if _span_recorder is None:
+        yield None
+    else:
+        with _span_recorder.span(name, attributes) as s:
+            yield s
+
+
+def dump_histograms(path: Optional[str] = None) -> dict:
+    """
+    Writes call duration histograms, slowest functions in total first.
+
+    :param path: Output JSON file, defaults to the configured histogram file.
+    :return: Histograms by function name.
+    """
+    with _histograms_lock:
+        data = {name: h.to_dict() for name, h in sorted(_histograms.items(), key=lambda i: -i[1].total)}
+    path = path or _histogram_file
+    if path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+    return data
+
+
+def _record_duration(name: str, duration: float):
+    with _histograms_lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _DurationHistogram()
+        histogram.add(duration)
+
 
 def trace():
     def decorator(func):
+        name = func.__qualname__
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            level = logger.getEffectiveLevel()
-            try:
-                args_repr = [repr(a) for a in args]
-                kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
-                signature = ", ".join(args_repr + kwargs_repr)
-
-                logger.debug(f"function {func.__qualname__}.{func.__name__} called with args {signature}")
-                if level is not logging.DEBUG:
-                    logger.info(f"function {func.__qualname__}.{func.__name__} called")
-            except Exception:
-                pass
+            # nothing is formatted unless it is going to be logged
+            debug = logger.isEnabledFor(logging.DEBUG) and (_sample_rate >= 1 or random.random() < _sample_rate)
+            info = not debug and logger.isEnabledFor(logging.INFO)
+            if debug:
+                try:
+                    signature = ", ".join([_repr.repr(a) for a in args] +
+                                          [f"{k}={_repr.repr(v)}" for k, v in kwargs.items()])
+                    logger.debug(f"function {name} called with args {signature}")
+                except Exception:
+                    pass
+            elif info:
+                logger.info(f"function {name} called")
 
+            start = time.perf_counter() if _histogram_file is not None else None
+            recorder = _span_recorder
+            span_context = recorder.span(name, {"code.namespace": func.__module__, "code.function": name}) \
+                if recorder is not None else contextlib.nullcontext()
             try:
-                result = func(*args, **kwargs)
-                logger.debug(f"function {func.__qualname__}.{func.__name__} returned {str(result)}")
-                if level is not logging.DEBUG:
-                    logger.info(f"function {func.__qualname__}.{func.__name__} exited")
+                with span_context:
+                    result = func(*args, **kwargs)
+                if debug:
+                    logger.debug(f"function {name} returned {_repr.repr(result)}")
+                elif info:
+                    logger.info(f"function {name} exited")
                 return result
             except Exception as e:
                 logger.exception(f"Exception raised in {func.__name__}. exception: {str(e)}")
                 raise e
+            finally:
+                if start is not None:
+                    _record_duration(name, time.perf_counter() - start)
 
         return wrapper
 
     return decorator
+
+
+if os.environ.get("CGDEVX_TRACE_HISTOGRAM") or os.environ.get("CGDEVX_TRACE_SPANS"):
+    configure_tracing(_sample_rate, os.environ.get("CGDEVX_TRACE_HISTOGRAM"), os.environ.get("CGDEVX_TRACE_SPANS"),
+                      os.environ.get("CGDEVX_TRACE_SPANS_FORMAT", "chrome"))
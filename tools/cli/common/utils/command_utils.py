@@ -3,7 +3,7 @@ import time
 import webbrowser
 from logging import Logger
 from re import sub
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 import click
 import requests
@@ -19,26 +19,24 @@ from common.enums.dns_registrars import DnsRegistrars
 from common.enums.git_providers import GitProviders
 from common.retry_decorator import exponential_backoff
 from common.state_store import StateStore
-from services.cloud.aws.aws_manager import AWSManager
-from services.cloud.azure.azure_manager import AzureManager
 from services.cloud.cloud_provider_manager import CloudProviderManager
-from services.cloud.gcp.gcp_manager import GcpManager
-from services.dns.azure_dns.azure_dns import AzureDNSManager
-from services.dns.dns_provider_manager import DNSManager
-from services.dns.gcp_dns.gcp_dns import GcpDnsManager
-from services.dns.route53.route53 import Route53Manager
-from services.platform_gitops import PlatformGitOpsRepo
 from services.vcs.git_provider_manager import GitProviderManager
-from services.vcs.github.github_manager import GitHubProviderManager
-from services.vcs.gitlab.gitlab_manager import GitLabProviderManager
 
+# provider SDKs are heavy to import, so provider managers are imported only when the provider is used
+if TYPE_CHECKING:
+    from services.dns.dns_provider_manager import DNSManager
+    from services.platform_gitops import PlatformGitOpsRepo
 
-def init_cloud_provider(state: StateStore) -> tuple[CloudProviderManager, DNSManager]:
+
+def init_cloud_provider(state: StateStore) -> tuple[CloudProviderManager, "DNSManager"]:
     cloud_manager: CloudProviderManager = None
     domain_manager: DNSManager = None
 
     # init proper cloud provider
     if state.cloud_provider == CloudProviders.AWS:
+        from services.cloud.aws.aws_manager import AWSManager
+        from services.dns.route53.route53 import Route53Manager
+
         # need to check CLI dependencies before initializing cloud providers as they depend on cli tools
         if not AWSManager.detect_cli_presence():
             raise click.ClickException("Cloud CLI is missing")
@@ -64,6 +62,9 @@ def init_cloud_provider(state: StateStore) -> tuple[CloudProviderManager, DNSMan
                     secret=state.get_input_param(DNS_REGISTRAR_ACCESS_SECRET))
 
     elif state.cloud_provider == CloudProviders.Azure:
+        from services.cloud.azure.azure_manager import AzureManager
+        from services.dns.azure_dns.azure_dns import AzureDNSManager
+
         # need to check CLI dependencies before initializing cloud providers as they depend on cli tools
         if not AzureManager.detect_cli_presence():
             raise click.ClickException("Cloud CLI is missing")
@@ -75,6 +76,9 @@ def init_cloud_provider(state: StateStore) -> tuple[CloudProviderManager, DNSMan
         domain_manager: DNSManager = AzureDNSManager(state.get_input_param(CLOUD_PROFILE))
         state.parameters["<AZ_SUBSCRIPTION_ID>"] = subscription_id
     elif state.cloud_provider == CloudProviders.GCP:
+        from services.cloud.gcp.gcp_manager import GcpManager
+        from services.dns.gcp_dns.gcp_dns import GcpDnsManager
+
         if not GcpManager.detect_cli_presence():
             raise click.ClickException("Cloud CLI is missing")
 
@@ -102,9 +106,13 @@ def init_cloud_provider(state: StateStore) -> tuple[CloudProviderManager, DNSMan
 def init_git_provider(state: StateStore) -> GitProviderManager:
     # init proper git provider
     if state.git_provider == GitProviders.GitHub:
+        from services.vcs.github.github_manager import GitHubProviderManager
+
         git_man: GitProviderManager = GitHubProviderManager(state.get_input_param(GIT_ACCESS_TOKEN),
                                                             state.get_input_param(GIT_ORGANIZATION_NAME))
     elif state.git_provider == GitProviders.GitLab:
+        from services.vcs.gitlab.gitlab_manager import GitLabProviderManager
+
         git_man: GitProviderManager = GitLabProviderManager(
             state.get_input_param(GIT_ACCESS_TOKEN),
             state.get_input_param(GIT_ORGANIZATION_NAME)
@@ -158,7 +166,7 @@ def wait(seconds: float = 15):
     time.sleep(seconds)
 
 
-@exponential_backoff()
+@exponential_backoff(max_retries=None, deadline=900)
 def wait_http_endpoint_readiness(endpoint: str):
     try:
         response = requests.get(endpoint,
@@ -192,7 +200,7 @@ def check_installation_presence():
 
 def initialize_gitops_repository(
         state_store: StateStore, logger: Logger
-) -> tuple[GitProviderManager, PlatformGitOpsRepo]:
+) -> tuple[GitProviderManager, "PlatformGitOpsRepo"]:
     """
     Initialize and return the GitOps repository manager.
 
@@ -211,6 +219,8 @@ def initialize_gitops_repository(
     The function updates the GitOps repository to ensure it is synchronized with its remote version and logs
      the initialization process.
     """
+    from services.platform_gitops import PlatformGitOpsRepo
+
     git_man = init_git_provider(state_store)
     gor = PlatformGitOpsRepo(
         git_man=git_man,
@@ -224,7 +234,7 @@ def initialize_gitops_repository(
     return git_man, gor
 
 
-def create_and_setup_branch(gor: PlatformGitOpsRepo, branch_name: str, logger: Logger) -> None:
+def create_and_setup_branch(gor: "PlatformGitOpsRepo", branch_name: str, logger: Logger) -> None:
     """
     Create and set up a new branch for the workload in the GitOps repository.
 
@@ -250,7 +260,7 @@ def create_and_setup_branch(gor: PlatformGitOpsRepo, branch_name: str, logger: L
 
 
 def create_and_open_pull_request(
-        gor: PlatformGitOpsRepo,
+        gor: "PlatformGitOpsRepo",
         state_store: StateStore,
         title: str,
         body: str,
@@ -0,0 +1,48 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """
+    Click group importing subcommand modules only when the subcommand is invoked.
+
+    Commands pull in cloud and git provider SDKs, so loading them eagerly makes every CLI call,
+    including --help, pay for all of them.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str] = None, lazy_help: dict[str, str] = None, **kwargs):
+        """
+        :param lazy_subcommands: Command name to "module.attribute" import path map
+        :param lazy_help: Command name to short help map, shown in the group help without importing commands
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+        self.lazy_help = lazy_help or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(super().list_commands(ctx) + list(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str):
+        if cmd_name in self.lazy_subcommands:
+            return self._lazy_load(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter):
+        # reading help of lazy commands from the commands themselves would import them all
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_subcommands:
+                rows.append((name, self.lazy_help.get(name, "")))
+            else:
+                rows.append((name, super().get_command(ctx, name).get_short_help_str(formatter.width)))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+    def _lazy_load(self, cmd_name: str) -> click.Command:
+        module_name, attr = self.lazy_subcommands[cmd_name].rsplit(".", 1)
+        cmd = getattr(importlib.import_module(module_name), attr)
+        if not isinstance(cmd, click.Command):
+            raise ValueError(f"Lazy loading of {self.lazy_subcommands[cmd_name]} failed, it is not a click command")
+        return cmd
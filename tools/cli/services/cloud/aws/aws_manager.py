@@ -1,5 +1,6 @@
 import textwrap
-from typing import Tuple
+from datetime import datetime, timezone
+from typing import Optional, Tuple
 
 from common.tracing_decorator import trace
 from common.utils.generators import random_string_generator
@@ -145,6 +146,12 @@ class AWSManager(CloudProviderManager):
         token = self._aws_sdk.get_token(cluster_name=cluster_name)
         return token['status']['token']
 
+    @trace()
+    def get_k8s_credential(self, cluster_name: str) -> Tuple[str, Optional[datetime]]:
+        token = self._aws_sdk.get_token(cluster_name=cluster_name)
+        expires_at = datetime.strptime(token['status']['expirationTimestamp'], '%Y-%m-%dT%H:%M:%SZ')
+        return token['status']['token'], expires_at.replace(tzinfo=timezone.utc)
+
     @trace()
     def evaluate_permissions(self) -> bool:
         """
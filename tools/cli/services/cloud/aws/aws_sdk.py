@@ -8,15 +8,20 @@ from botocore.exceptions import ClientError
 
 from common.logging_config import logger
 from services.cloud.aws.aws_session_manager import AwsSessionManager
+from services.cloud.permission_evaluator import evaluate_in_batches
 from services.dns.dns_provider_manager import get_domain_txt_records_dot
 
 
 class AwsSdk:
     RETRY_COUNT = 100
     RETRY_SLEEP = 10  # in seconds
+    # actions simulated in a single call, results of every call are additionally paginated
+    SIMULATION_BATCH_SIZE = 50
 
     def __init__(self, region, profile, key, secret):
         self._account_id = None
+        # STS clients are reused for all EKS tokens, only the presigned token is generated per call
+        self._token_generators: Dict[Optional[str], TokenGenerator] = {}
         self._session_manager = AwsSessionManager()
         self._session_manager.create_session(region, profile, key, secret)
 
@@ -78,15 +83,21 @@ class AwsSdk:
             } for context_key, context_values in context.items()]
 
         iam_client = self._session_manager.session.client('iam')
-        results = iam_client.simulate_principal_policy(
-            PolicySourceArn=self.current_user_arn(),
-            ActionNames=actions,
-            ResourceArns=resources,
-            ContextEntries=_context
-        )['EvaluationResults']
+        policy_source_arn = self.current_user_arn()
 
-        return sorted([result['EvalActionName'] for result in results
-                       if result['EvalDecision'] != "allowed"])
+        def simulate(batch: List[str]) -> List[dict]:
+            paginator = iam_client.get_paginator('simulate_principal_policy')
+            return [result
+                    for page in paginator.paginate(PolicySourceArn=policy_source_arn,
+                                                   ActionNames=batch,
+                                                   ResourceArns=resources,
+                                                   ContextEntries=_context)
+                    for result in page['EvaluationResults']]
+
+        results = evaluate_in_batches(actions, self.SIMULATION_BATCH_SIZE, simulate)
+
+        return sorted({result['EvalActionName'] for result in results
+                       if result['EvalDecision'] != "allowed"})
 
     def create_bucket(self, bucket_name, region=None) -> str:
         """Create an S3 bucket in a specified region
@@ -241,16 +252,20 @@ class AwsSdk:
         return False
 
     def get_token(self, cluster_name: str, role_arn: str = None) -> dict:
-        # hack to get botcore session and properly initialise client factory
-        client_factory = STSClientFactory(self._session_manager.session._session)
-        sts_client = client_factory.get_sts_client(role_arn=role_arn)
-        token = TokenGenerator(sts_client).get_token(cluster_name)
+        if role_arn not in self._token_generators:
+            # hack to get botcore session and properly initialise client factory
+            client_factory = STSClientFactory(self._session_manager.session._session)
+            sts_client = client_factory.get_sts_client(role_arn=role_arn)
+            self._token_generators[role_arn] = TokenGenerator(sts_client)
+        # expiration is taken before signing, so it is never later than the actual one
+        expiration_time = self._get_expiration_time()
+        token = self._token_generators[role_arn].get_token(cluster_name)
         return {
             "kind": "ExecCredential",
             "apiVersion": "client.authentication.k8s.io/v1alpha1",
             "spec": {},
             "status": {
-                "expirationTimestamp": self._get_expiration_time(),
+                "expirationTimestamp": expiration_time,
                 "token": token
             }
         }
@@ -1,10 +1,13 @@
+import threading
 import time
 import uuid
-from typing import List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Optional
 
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError, AzureError, ResourceExistsError
 from azure.identity import AzureCliCredential
 from azure.mgmt.authorization import AuthorizationManagementClient
+from azure.mgmt.authorization.models import RoleDefinition
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.dns import DnsManagementClient
 from azure.mgmt.privatedns import PrivateDnsManagementClient
@@ -15,6 +18,7 @@ from azure.mgmt.subscription import SubscriptionClient
 from azure.storage.blob import BlobServiceClient
 
 from common.logging_config import logger
+from services.cloud.permission_evaluator import MAX_CONCURRENT_EVALUATIONS
 from services.dns.dns_provider_manager import get_domain_txt_records_dot
 
 
@@ -34,6 +38,9 @@ class AzureSdk:
         self.compute_client = ComputeManagementClient(self.credential, self.subscription_id)
         self.subscription_client = SubscriptionClient(self.credential)
         self.location = self._validate_location(location)
+        # role definitions are immutable for the lifetime of the CLI run, memoised by ID
+        self._role_definitions: Dict[str, RoleDefinition] = {}
+        self._role_definitions_lock = threading.Lock()
 
     def get_name_servers(self, domain_name: str) -> Tuple[List[str], bool, str]:
         """
@@ -242,12 +249,38 @@ class AzureSdk:
             Any exceptions raised by the Azure SDK's `role_assignments` or `role_definitions` methods will
             propagate up to the caller. This may include API errors, connection issues, or misconfiguration.
         """
-        roles = []
         role_assignments = self.authorization_client.role_assignments.list_for_subscription(filter="atScope()")
-        for assignment in role_assignments:
-            role_definition = self.authorization_client.role_definitions.get_by_id(assignment.role_definition_id)
-            roles.append(role_definition.role_name)
-        return roles
+        return [role_definition.role_name
+                for role_definition in self._get_role_definitions(a.role_definition_id for a in role_assignments)]
+
+    def _get_role_definitions(self, role_definition_ids: Iterable[str]) -> List[RoleDefinition]:
+        """
+        Retrieve role definitions by IDs, fetching the ones not seen yet concurrently.
+
+        Args:
+        - role_definition_ids (Iterable[str]): Role definition IDs, may contain duplicates.
+
+        Returns:
+        - [RoleDefinition]: Role definitions in the order of IDs.
+        """
+        role_definition_ids = list(role_definition_ids)
+        with self._role_definitions_lock:
+            missing = {i for i in role_definition_ids if i not in self._role_definitions}
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EVALUATIONS, thread_name_prefix="iam") as pool:
+                fetched = dict(zip(missing, pool.map(self.authorization_client.role_definitions.get_by_id, missing)))
+            with self._role_definitions_lock:
+                self._role_definitions.update(fetched)
+
+        return [self._role_definitions[i] for i in role_definition_ids]
+
+    @staticmethod
+    def _role_definition_permissions(role_definition: RoleDefinition) -> [str]:
+        permissions_list = []
+        for permission in role_definition.permissions:
+            permissions_list.extend(permission.actions + permission.not_actions)
+        return permissions_list
 
     def get_role_permissions(self, role_name: str) -> [str]:
         """
@@ -259,15 +292,19 @@ class AzureSdk:
         Returns:
         - [str]: List of permissions associated with the role.
         """
-        permissions_list = []
+        with self._role_definitions_lock:
+            for role_definition in self._role_definitions.values():
+                if role_definition.role_name == role_name:
+                    return self._role_definition_permissions(role_definition)
+
         role_definitions = self.authorization_client.role_definitions.list(
             scope=f'/subscriptions/{self.subscription_id}')
         for role_definition in role_definitions:
             if role_definition.role_name == role_name:
-                for permission in role_definition.permissions:
-                    permissions_list.extend(permission.actions + permission.not_actions)
-                break
-        return permissions_list
+                with self._role_definitions_lock:
+                    self._role_definitions[role_definition.id] = role_definition
+                return self._role_definition_permissions(role_definition)
+        return []
 
     def get_subscription_permissions(self) -> [str]:
         """
@@ -277,9 +314,11 @@ class AzureSdk:
         - [str]: List of permissions at the subscription level.
         """
         subscription_permissions = []
-        subscription_roles = self.list_subscription_roles()
-        for role in subscription_roles:
-            subscription_permissions.extend(self.get_role_permissions(role))
+        role_assignments = self.authorization_client.role_assignments.list_for_subscription()
+        # each role is evaluated once, however many principals it is assigned to
+        role_definition_ids = list(dict.fromkeys(a.role_definition_id for a in role_assignments))
+        for role_definition in self._get_role_definitions(role_definition_ids):
+            subscription_permissions.extend(self._role_definition_permissions(role_definition))
         return subscription_permissions
 
     @staticmethod
@@ -309,12 +348,9 @@ class AzureSdk:
         Returns:
         - [str]: List of roles at the subscription level.
         """
-        roles = []
         role_assignments = self.authorization_client.role_assignments.list_for_subscription()
-        for assignment in role_assignments:
-            role_definition = self.authorization_client.role_definitions.get_by_id(assignment.role_definition_id)
-            roles.append(role_definition.role_name)
-        return roles
+        return [role_definition.role_name
+                for role_definition in self._get_role_definitions(a.role_definition_id for a in role_assignments)]
 
     def blocked(self, required_permissions: [str]) -> [str]:
         """
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from datetime import datetime
+from typing import Optional, Tuple
 
 
 class CloudProviderManager(ABC):
@@ -124,6 +125,13 @@ class CloudProviderManager(ABC):
         """
         pass
 
+    def get_k8s_credential(self, cluster_name: str) -> Tuple[str, Optional[datetime]]:
+        """
+        Creates K8s cluster API key together with its expiration time
+        :return: API key and its expiration time, None if unknown
+        """
+        return self.get_k8s_token(cluster_name), None
+
     @abstractmethod
     def create_ingress_annotations(self) -> str:
         """
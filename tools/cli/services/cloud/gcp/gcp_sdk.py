@@ -1,3 +1,4 @@
+import threading
 import time
 from typing import List, Optional, Literal, Tuple
 
@@ -14,6 +15,7 @@ from googleapiclient.errors import HttpError
 
 from common.enums.gcp_resource_types import GcpResourceType
 from common.logging_config import logger
+from services.cloud.permission_evaluator import evaluate_in_batches
 from services.dns.dns_provider_manager import get_domain_txt_records_dot
 
 
@@ -31,12 +33,14 @@ class GcpSdk:
         DOMAIN_PROPAGATION_RECORD_VALUE (str): The expected value to check for DNS domain record propagation.
         DEFAULT_RECORD_TTL (int): The default time-to-live in seconds for new DNS records.
         DOMAIN_PROPAGATION_RECORD_NAME (str): The name of the DNS record used to check domain propagation.
+        IAM_PERMISSIONS_BATCH_SIZE (int): The max number of permissions tested in a single testIamPermissions call.
     """
     RETRY_COUNT = 100
     RETRY_SLEEP = 10  # in seconds
     DOMAIN_PROPAGATION_RECORD_VALUE = "domain record propagated"
     DEFAULT_RECORD_TTL = 10
     DOMAIN_PROPAGATION_RECORD_NAME = 'cgdevx-liveness'
+    IAM_PERMISSIONS_BATCH_SIZE = 100
 
     def __init__(self, project_id: str, location: Optional[str] = None):
         """
@@ -51,6 +55,7 @@ class GcpSdk:
         self.storage_client = storage.Client(project=project_id, credentials=self.__credentials)
         self.dns_client = dns.Client(project=project_id, credentials=self.__credentials)
         self.cluster_manager = ClusterManagerClient(credentials=self.__credentials)
+        self._resource_managers = threading.local()
 
     @property
     def access_token(self) -> str:
@@ -448,20 +453,33 @@ class GcpSdk:
         if not resource:
             resource = f"{self.project_id}"
 
-        service = discovery.build(
-            serviceName='cloudresourcemanager',
-            version='v1',
-            credentials=self.__credentials
-        )
-        request_body = {'permissions': permissions}
-        try:
-            request = service.projects().testIamPermissions(resource=resource, body=request_body)
+        def test(batch: List[str]) -> List[str]:
+            service = self._get_resource_manager()
+            request = service.projects().testIamPermissions(resource=resource, body={'permissions': batch})
             response = request.execute()
+            return response.get('permissions', [])
+
+        try:
+            return evaluate_in_batches(permissions, self.IAM_PERMISSIONS_BATCH_SIZE, test)
         except HttpError as error:
             logger.error(f"Failed to test permissions for {resource}: {error}")
             return []
 
-        return response.get('permissions', [])
+    def _get_resource_manager(self):
+        """
+        Builds the Cloud Resource Manager discovery client once per thread, as its HTTP transport is not
+        thread-safe. The discovery document is bundled with the client library, so no request is sent.
+
+        :return: The Cloud Resource Manager service.
+        """
+        if not hasattr(self._resource_managers, "service"):
+            self._resource_managers.service = discovery.build(
+                serviceName='cloudresourcemanager',
+                version='v1',
+                credentials=self.__credentials,
+                static_discovery=True
+            )
+        return self._resource_managers.service
 
     def test_bucket_iam_permissions(self, bucket_name: str, permissions: List[str]) -> List[str]:
         """
@@ -478,8 +496,7 @@ class GcpSdk:
         """
         bucket = self.storage_client.bucket(bucket_name)
         try:
-            response = bucket.test_iam_permissions(permissions)
-            return response
+            return evaluate_in_batches(permissions, self.IAM_PERMISSIONS_BATCH_SIZE, bucket.test_iam_permissions)
         except HttpError as error:
             logger.error(f"Error testing IAM permissions for bucket {bucket_name}: {error}")
             return []
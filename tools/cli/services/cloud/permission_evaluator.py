@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MAX_CONCURRENT_EVALUATIONS = 8
+
+
+def chunks(items: List[T], size: int) -> List[List[T]]:
+    """
+    Splits items into chunks of at most size items.
+
+    :param items: Items to split.
+    :param size: Max chunk size.
+    :return: List of chunks.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def evaluate_in_batches(items: List[T], batch_size: int, evaluate: Callable[[List[T]], List[R]],
+                        max_workers: int = MAX_CONCURRENT_EVALUATIONS) -> List[R]:
+    """
+    Evaluates items in batches fitting the API limits, running the batches concurrently.
+
+    :param items: Items to evaluate, e.g. IAM actions or permissions.
+    :param batch_size: Max number of items accepted by a single API call.
+    :param evaluate: Evaluates a single batch, called from worker threads.
+    :param max_workers: Max number of batches evaluated in parallel.
+    :return: Results of all batches, in the order of batches.
+    """
+    batches = chunks(items, batch_size)
+    if len(batches) <= 1:
+        return list(evaluate(batches[0])) if batches else []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches)), thread_name_prefix="iam") as pool:
+        results = list(pool.map(evaluate, batches))
+    return [r for result in results for r in result]
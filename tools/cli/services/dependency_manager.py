@@ -4,14 +4,27 @@ import platform
 import re
 import shutil
 import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlsplit
 from zipfile import ZipFile
 
 import requests
 
-from common.const.common_path import LOCAL_TOOLS_FOLDER, LOCAL_TF_TOOL, LOCAL_KCTL_TOOL
+from common.const.common_path import LOCAL_TOOLS_FOLDER, LOCAL_TF_TOOL, LOCAL_KCTL_TOOL, TOOL_CACHE_FOLDER, \
+    LOCAL_TOOL_VERSION_CACHE
 from common.const.const import KUBECTL_VERSION, TERRAFORM_VERSION
+from common.logging_config import logger
 from common.tracing_decorator import trace
-from services.tf_wrapper import TfWrapper
+from services.tool_cache import ToolCache
+from services.tool_version_probe import ToolVersionProbe
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# connect and read timeouts, read timeout applies to every chunk
+DOWNLOAD_TIMEOUT = (10, 60)
+TOOL_CACHE_MAX_SIZE = int(os.environ.get("CGDEVX_TOOL_CACHE_MAX_SIZE", 1024 ** 3))
+
+_version_probe = ToolVersionProbe(LOCAL_TOOL_VERSION_CACHE)
 
 
 class DependencyManager:
@@ -33,6 +46,24 @@ class DependencyManager:
     # Regular expression matches a line containing a hexadecimal hash, spaces, and a filename
     r = re.compile(r'(^[0-9A-Fa-f]+)\s+(\S.*)$')
 
+    def __init__(self, mirror_url: Optional[str] = None, tool_cache: Optional[ToolCache] = None):
+        """
+        :param mirror_url: Base URL of a mirror keeping the upstream release paths, e.g. a local file server
+        for air-gapped runs. Defaults to CGDEVX_TOOLS_MIRROR environment variable.
+        :param tool_cache: Binary cache shared by installations, defaults to the user cache folder.
+        """
+        self._mirror_url = (mirror_url or os.environ.get("CGDEVX_TOOLS_MIRROR") or "").rstrip("/")
+        self._tool_cache = tool_cache or ToolCache(TOOL_CACHE_FOLDER, TOOL_CACHE_MAX_SIZE)
+
+    def _url(self, url: str) -> str:
+        """
+        Points release URL to the mirror, if set
+        """
+        if not self._mirror_url:
+            return url
+        parts = urlsplit(url)
+        return f"{self._mirror_url}{parts.path}"
+
     @staticmethod
     def _get_filename_from_content_description(cd):
         """
@@ -46,13 +77,38 @@ class DependencyManager:
         return file_name[0]
 
     @staticmethod
-    def _download_file(url: str, path: str = ""):
+    def _download_file(url: str, path: str = "", checksum: Optional[str] = None):
         """
-        Download file from url
+        Stream file from url, computing SHA-256 while writing.
+        Partially downloaded file is kept next to the target and resumed with HTTP Range request.
         """
-        r = requests.get(url, allow_redirects=True)
-        with open(path, 'wb') as df:
-            df.write(r.content)
+        part_path = f"{path}.part"
+        sha256_hash = hashlib.sha256()
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with requests.get(url, headers=headers, stream=True, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT) as r:
+            # requested range starts at the end of the file, the previous download is complete
+            complete = offset and r.status_code == 416
+            if not complete:
+                r.raise_for_status()
+            if complete or r.status_code == 206:
+                logger.info(f"Resuming download of {url} from {offset} bytes")
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        sha256_hash.update(block)
+            if not complete:
+                with open(part_path, "ab" if r.status_code == 206 else "wb") as df:
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        sha256_hash.update(chunk)
+                        df.write(chunk)
+
+        if checksum is not None and sha256_hash.hexdigest() != checksum.strip().lower():
+            # BAD CHECKSUM, do not resume corrupted file
+            os.remove(part_path)
+            raise Exception("Bad checksum")
+
+        os.replace(part_path, path)
         return path
 
     @staticmethod
@@ -63,48 +119,40 @@ class DependencyManager:
         with ZipFile(file, 'r') as z_file:
             z_file.extractall(path=path)
 
-    @staticmethod
-    def _validate_checksum(file: str, checksum: str):
-        """
-        Validate file checksum
-        """
-        sha256_hash = hashlib.sha256()
-        with open(file, "rb") as f:
-            # Read and update hash string value in blocks of 4K
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-
-            file_checksum = sha256_hash.hexdigest()
-
-            if file_checksum == checksum:
-                # OK
-                return True
-            else:
-                # BAD CHECKSUM
-                return False
-
     @staticmethod
     @trace()
     def check_tf():
-        if os.path.exists(LOCAL_TF_TOOL):
-            tf = TfWrapper()
-            if tf.version() == TERRAFORM_VERSION:
-                return True
-
-        return False
+        return _version_probe.version("terraform", LOCAL_TF_TOOL) == TERRAFORM_VERSION
 
     @staticmethod
     @trace()
     def check_kubectl():
-        # TODO: extract and check kubectl version
-        if os.path.exists(LOCAL_KCTL_TOOL):
-            return True
-        else:
-            return False
+        return _version_probe.version("kubectl", LOCAL_KCTL_TOOL) == KUBECTL_VERSION
+
+    @trace()
+    def install(self, tools: list[str]):
+        """
+        Install tools concurrently
+        :param tools: Tool names, "tf" or "kubectl"
+        """
+        installers = {"tf": self.install_tf, "kubectl": self.install_kubectl}
+        with ThreadPoolExecutor(max_workers=len(tools) or 1, thread_name_prefix="download") as pool:
+            futures = [pool.submit(installers[tool]) for tool in tools]
+            # surface the first failure only after all downloads are finished
+            errors = [f.exception() for f in futures]
+
+        for error in errors:
+            if error is not None:
+                raise error
 
     @trace()
     def install_tf(self):
-        tmp_folder = self._prepare_temp_folder()
+        cached = self._tool_cache.get("terraform", TERRAFORM_VERSION)
+        if cached is not None:
+            self._tool_cache.materialise(cached, LOCAL_TF_TOOL)
+            return str(LOCAL_TF_TOOL)
+
+        tmp_folder = self._prepare_temp_folder("terraform")
 
         file_name = None
         if platform.system() == "Darwin":
@@ -117,18 +165,21 @@ class DependencyManager:
         if platform.system() == "Linux":
             file_name = self.tf_linux_url
 
-        download_url = self.tf_base_path + file_name
+        download_url = self._url(self.tf_base_path + file_name)
 
-        tf_file_path = self._download_file(download_url, tmp_folder / file_name)
-        sha_file_path = self._download_file(self.tf_base_path + self.tf_sha, tmp_folder / self.tf_sha)
+        sha_file_path = self._download_file(self._url(self.tf_base_path + self.tf_sha), tmp_folder / self.tf_sha)
         checksum = self._extract_sha(sha_file_path, file_name)
+        if checksum is None:
+            raise Exception(f"Checksum of {file_name} not found")
 
-        if not self._validate_checksum(tf_file_path, checksum):
-            raise Exception("Bad checksum")
+        tf_file_path = self._download_file(download_url, tmp_folder / file_name, checksum)
 
-        self._unzip_file(file=tf_file_path, path=LOCAL_TOOLS_FOLDER)
+        self._unzip_file(file=tf_file_path, path=tmp_folder / "unpacked")
+        tf_binary = tmp_folder / "unpacked" / ("terraform.exe" if platform.system() == "Windows" else "terraform")
+        self._change_permissions(tf_binary)
 
-        self._change_permissions(LOCAL_TF_TOOL)
+        cached = self._tool_cache.put("terraform", TERRAFORM_VERSION, checksum.lower(), tf_binary)
+        self._tool_cache.materialise(cached, LOCAL_TF_TOOL)
 
         shutil.rmtree(tmp_folder)
 
@@ -148,7 +199,12 @@ class DependencyManager:
 
     @trace()
     def install_kubectl(self):
-        tmp_folder = self._prepare_temp_folder()
+        cached = self._tool_cache.get("kubectl", KUBECTL_VERSION)
+        if cached is not None:
+            self._tool_cache.materialise(cached, LOCAL_KCTL_TOOL)
+            return str(LOCAL_KCTL_TOOL)
+
+        tmp_folder = self._prepare_temp_folder("kubectl")
         download_url = None
         file_name = "kubectl"
         if platform.system() == "Darwin":
@@ -162,19 +218,18 @@ class DependencyManager:
         if platform.system() == "Linux":
             download_url = self.kctl_linux_url
 
-        kctl_file_path = self._download_file(download_url, tmp_folder / file_name)
+        download_url = self._url(download_url)
 
         sha_file_path = self._download_file(download_url + self.kctl_sha_prefix,
                                             tmp_folder / f'{file_name}{self.kctl_sha_prefix}')
         with open(sha_file_path) as sf:
-            checksum = sf.readline()
-
-        if not self._validate_checksum(kctl_file_path, checksum):
-            raise Exception("Bad checksum")
+            checksum = sf.readline().strip().lower()
 
-        shutil.move(kctl_file_path, LOCAL_KCTL_TOOL)
+        kctl_file_path = self._download_file(download_url, tmp_folder / file_name, checksum)
+        self._change_permissions(kctl_file_path)
 
-        self._change_permissions(LOCAL_KCTL_TOOL)
+        cached = self._tool_cache.put("kubectl", KUBECTL_VERSION, checksum, kctl_file_path)
+        self._tool_cache.materialise(cached, LOCAL_KCTL_TOOL)
 
         shutil.rmtree(tmp_folder)
 
@@ -187,9 +242,8 @@ class DependencyManager:
                  st.st_mode | stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
 
     @staticmethod
-    def _prepare_temp_folder():
-        tmp_folder = LOCAL_TOOLS_FOLDER / ".tmp"
-        if os.path.exists(tmp_folder):
-            shutil.rmtree(tmp_folder)
-        os.makedirs(tmp_folder)
+    def _prepare_temp_folder(tool: str):
+        # partial downloads are kept until the tool is installed, so interrupted downloads are resumed
+        tmp_folder = LOCAL_TOOLS_FOLDER / ".tmp" / tool
+        os.makedirs(tmp_folder, exist_ok=True)
         return tmp_folder
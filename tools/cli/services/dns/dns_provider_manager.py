@@ -50,7 +50,8 @@ def get_domain_ns_records(domain_name: str, name_servers=None):
     return [ns.to_text() for ns in answers]
 
 
-@exponential_backoff()
+# NXDOMAIN is retried until the record propagates, which could take up to 15 minutes
+@exponential_backoff(max_retries=None, deadline=930)
 def get_domain_txt_records_dot(domain_name: str, name_servers=None):
     if name_servers is None:
         name_servers = ["9.9.9.9", "8.8.8.8", "1.1.1.1"]
@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from common.logging_config import logger
+
+# token and its expiration time, None if the credential source does not report it
+TokenFetcher = Callable[[], Tuple[str, Optional[datetime]]]
+
+
+class TokenCredentialProvider:
+    """
+    Caches a K8s API bearer token and refreshes it before it expires.
+
+    A background thread fetches a new token refresh_margin before expiration, so long running waits never
+    use an expired token. Tokens without reported expiration are kept for default_lifetime.
+    """
+
+    def __init__(self, fetch: TokenFetcher, refresh_margin: timedelta = timedelta(minutes=2),
+                 default_lifetime: timedelta = timedelta(minutes=10)):
+        """
+        :param fetch: Returns a new token and its expiration time
+        :param refresh_margin: Time before expiration the token is refreshed at
+        :param default_lifetime: Lifetime of tokens without reported expiration
+        """
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._default_lifetime = default_lifetime
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def _refresh(self) -> str:
+        token, expires_at = self._fetch()
+        now = datetime.now(timezone.utc)
+        if expires_at is None:
+            expires_at = now + self._default_lifetime
+        elif expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self._token, self._expires_at = token, expires_at
+        logger.debug(f"K8s API token refreshed, expires at {expires_at.isoformat()}")
+        return token
+
+    def _refresh_at(self) -> datetime:
+        return self._expires_at - self._refresh_margin
+
+    def token(self) -> str:
+        """
+        :return: Valid token, refreshed if it is about to expire
+        """
+        with self._lock:
+            if self._token is None or datetime.now(timezone.utc) >= self._refresh_at():
+                return self._refresh()
+            return self._token
+
+    def invalidate(self):
+        """
+        Drops the cached token, e.g. after the API server rejected it
+        """
+        with self._lock:
+            self._token = None
+
+    def start(self):
+        """
+        Starts proactive background refresh
+        """
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="k8s-token-refresh", daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+        refresher, self._refresher = self._refresher, None
+        if refresher is not None:
+            refresher.join()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.token()
+                wait = (self._refresh_at() - datetime.now(timezone.utc)).total_seconds()
+            except Exception as e:
+                # the next request refreshes the token on demand, retry in background shortly
+                logger.warning(f"K8s API token refresh failed: {e}")
+                wait = 30
+            self._stop.wait(max(wait, 1))
@@ -1,5 +1,7 @@
+import asyncio
 import json
-from typing import Optional
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Dict, List, Optional
 
 import httpx
 from kubernetes import client
@@ -7,7 +9,9 @@ from kubernetes import client as k8s_client
 
 from common.const.const import ARGOCD_REGISTRY_APP_PATH, GITOPS_REPOSITORY_URL
 from common.const.namespaces import ARGOCD_NAMESPACE
-from common.retry_decorator import exponential_backoff
+from common.logging_config import logger
+from common.retry_decorator import TRANSIENT_STATUS_CODES, exponential_backoff
+from common.tracing_decorator import trace
 from common.utils.k8s_utils import get_kr8s_pod_instance_by_name
 from services.k8s.k8s import KubeClient
 
@@ -76,80 +80,210 @@ async def get_argocd_token(user: str, password: str, endpoint: str = "localhost:
             raise e
 
 
-async def delete_application_via_k8s_portforward(
-        app_name: str,
-        user: str,
-        password: str,
-        k8s_pod: k8s_client.V1Pod,
-        kube_config_path: str,
-        remote_port: int = 8080,
-        local_port: int = 8080
-) -> Optional[bool]:
+class ArgoCDSession:
     """
-    Asynchronously retrieves an ArgoCD token and deletes an application from the ArgoCD server by
-    port forwarding a Kubernetes pod's port to a local port. This method first obtains an authentication
-    token by forwarding the ArgoCD API service's port to a local port and then uses this token to
-    send a deletion request to the ArgoCD API.
-
-    :param app_name: The name of the application to be deleted.
-    :type app_name: str
-    :param user: The username used for ArgoCD token retrieval.
-    :type user: str
-    :param password: The password used for ArgoCD token retrieval.
-    :type password: str
-    :param k8s_pod: The Kubernetes pod hosting the ArgoCD service that supports port forwarding.
-    :type k8s_pod: k8s_client.V1Pod
-    :param kube_config_path: Path to the kubeconfig file for Kubernetes cluster authentication.
-    :type kube_config_path: str
-    :param remote_port: The port on the Kubernetes pod to be forwarded.
-    :type remote_port: int
-    :param local_port: The local port to which the remote port's forwarding will be mapped.
-    :type local_port: int
-    :return: True if the application deletion is successful; otherwise, None.
-    :rtype: Optional[bool]
+    Async ArgoCD API session over a single port-forward to the ArgoCD server pod.
+
+    Keeps one HTTP client and the authentication token for all requests, the token is renewed once when rejected.
+    Bulk operations run concurrently, limited by max_concurrency. Use as an async context manager.
     """
-    kr8s_pod = await get_kr8s_pod_instance_by_name(
-        pod_name=k8s_pod.metadata.name,
-        namespace=ARGOCD_NAMESPACE,
-        kubeconfig=kube_config_path
-    )
 
-    async with kr8s_pod.portforward(remote_port=remote_port, local_port=local_port):
-        # Retrieve the ArgoCD token
-        token = await get_argocd_token(user, password, f'localhost:{local_port}')
-        if not token:
+    def __init__(self, user: str, password: str, k8s_pod: k8s_client.V1Pod, kube_config_path: str,
+                 remote_port: int = 8080, local_port: int = 8080, max_concurrency: int = 8):
+        """
+        :param user: The username for ArgoCD authentication.
+        :param password: The password for ArgoCD authentication.
+        :param k8s_pod: The Kubernetes pod hosting the ArgoCD server.
+        :param kube_config_path: Path to the kubeconfig file for Kubernetes cluster authentication.
+        :param remote_port: The port on the Kubernetes pod to be forwarded.
+        :param local_port: The local port to which the remote port's forwarding will be mapped.
+        :param max_concurrency: The max number of simultaneous API requests.
+        """
+        self._user = user
+        self._password = password
+        self._k8s_pod = k8s_pod
+        self._kube_config_path = kube_config_path
+        self._remote_port = remote_port
+        self._local_port = local_port
+        self._max_concurrency = max_concurrency
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._login_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "ArgoCDSession":
+        async with AsyncExitStack() as stack:
+            kr8s_pod = await get_kr8s_pod_instance_by_name(
+                pod_name=self._k8s_pod.metadata.name,
+                namespace=ARGOCD_NAMESPACE,
+                kubeconfig=self._kube_config_path
+            )
+            await stack.enter_async_context(
+                kr8s_pod.portforward(remote_port=self._remote_port, local_port=self._local_port))
+            self._client = await stack.enter_async_context(httpx.AsyncClient(
+                base_url=f"https://localhost:{self._local_port}",
+                verify=False,
+                limits=httpx.Limits(max_connections=self._max_concurrency),
+                headers={"Content-Type": "application/json"}
+            ))
+            await self._login()
+            # keep port-forward and client open after successful login
+            self._exit_stack = stack.pop_all()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+        self._client = None
+
+    async def _login(self, rejected_token: Optional[str] = None):
+        async with self._login_lock:
+            # another request has already renewed the rejected token
+            if self._token is not None and self._token != rejected_token:
+                return
+            response = await self._client.post(
+                "/api/v1/session",
+                content=json.dumps({"username": self._user, "password": self._password})
+            )
+            response.raise_for_status()
+            self._token = response.json()["token"]
+
+    # ArgoCD API server could be restarting while apps are deleted
+    @exponential_backoff(max_retries=None, deadline=300)
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        async with self._semaphore:
+            token = self._token
+            response = await self._client.request(method, path, headers={"Authorization": f"Bearer {token}"},
+                                                  **kwargs)
+            if response.status_code == 401:
+                await self._login(rejected_token=token)
+                response = await self._client.request(method, path,
+                                                      headers={"Authorization": f"Bearer {self._token}"}, **kwargs)
+        # let the retry policy handle transient server failures
+        if response.status_code in TRANSIENT_STATUS_CODES:
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    async def _bulk(operation: Callable[[str], Awaitable], apps: List[str]) -> Dict[str, object]:
+        results = await asyncio.gather(*(operation(app) for app in apps), return_exceptions=True)
+        for app, result in zip(apps, results):
+            if isinstance(result, Exception):
+                logger.warning(f"ArgoCD operation on application {app} failed: {result}")
+        return {app: None if isinstance(result, Exception) else result for app, result in zip(apps, results)}
+
+    async def _disable_sync(self, app: str) -> bool:
+        response = await self._request("PATCH", f"/api/v1/applications/{app}", content=json.dumps({
+            "name": app,
+            "patch": json.dumps({"spec": {"syncPolicy": None}}),
+            "patchType": "merge"
+        }))
+        return response.is_success
+
+    async def _delete(self, app: str) -> bool:
+        response = await self._request("DELETE", f"/api/v1/applications/{app}", params={"cascade": "true"})
+        # application is already gone
+        return response.is_success or response.status_code == 404
+
+    async def _get_status(self, app: str) -> Optional[dict]:
+        response = await self._request("GET", f"/api/v1/applications/{app}")
+        if response.status_code == 404:
             return None
+        response.raise_for_status()
+        status = response.json().get("status", {})
+        return {
+            "health": status.get("health", {}).get("status"),
+            "sync": status.get("sync", {}).get("status"),
+        }
+
+    async def disable_sync(self, apps: List[str]) -> Dict[str, Optional[bool]]:
+        """
+        Turns off automated sync of applications concurrently.
+
+        :param apps: Application names.
+        :return: Application name to success map, None when the request failed.
+        """
+        return await self._bulk(self._disable_sync, apps)
+
+    async def delete(self, apps: List[str]) -> Dict[str, Optional[bool]]:
+        """
+        Deletes applications with their resources (cascade) concurrently.
 
-        # Use the token to request the deletion of the application
-        return await delete_application(app_name, token, f'localhost:{local_port}')
+        :param apps: Application names.
+        :return: Application name to success map, None when the request failed.
+        """
+        return await self._bulk(self._delete, apps)
+
+    async def get_status(self, apps: List[str]) -> Dict[str, Optional[dict]]:
+        """
+        Reads health and sync status of applications concurrently.
+
+        :param apps: Application names.
+        :return: Application name to {"health": ..., "sync": ...} map, None for missing applications.
+        """
+        return await self._bulk(self._get_status, apps)
 
 
-@exponential_backoff(base_delay=5)
-async def delete_application(app_name: str, token: str, endpoint: str = "localhost:8080") -> Optional[bool]:
+class ApplicationDeletionTracker:
     """
-    Asynchronously deletes an application from the ArgoCD server via a specified endpoint using a given authentication token.
+    Tracks deletion of ArgoCD applications together with their managed resources holding cloud resources,
+    LoadBalancer Services and PersistentVolumeClaims.
 
-    :param app_name: The name of the application to delete.
-    :type app_name: str
-    :param token: The ArgoCD authentication token.
-    :type token: str
-    :param endpoint: The endpoint URL where the ArgoCD API is accessed, defaulting to "localhost:8080".
-    :type endpoint: str
-    :return: True if the application was successfully deleted; otherwise, None.
-    :rtype: Optional[bool]
+    Child applications of app-of-apps are followed at any depth, as the resources holding cloud resources
+    usually belong to them. Managed resources are read from application status on creation, so the tracker
+    should be created before the applications are deleted.
     """
-    async with httpx.AsyncClient(verify=False) as httpx_client:
-        try:
-            response = await httpx_client.delete(
-                f"https://{endpoint}/api/v1/applications/{app_name}?cascade=true",
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {token}"
-                }
-            )
-            return response.is_success
-        except httpx.HTTPStatusError as e:
-            raise e
+
+    def __init__(self, k8s_client: KubeClient, app_names: List[str], namespace: str = ARGOCD_NAMESPACE):
+        self._k8s_client = k8s_client
+        self.refs = []
+
+        load_balancers = None
+        visited, queue = set(), list(app_names)
+        while queue:
+            name = queue.pop(0)
+            if name in visited:
+                continue
+            visited.add(name)
+            app = k8s_client.find_custom_object(namespace, name, "argoproj.io", "v1alpha1", "applications")
+            if app is None:
+                continue
+            self.refs.append({"group": "argoproj.io", "version": "v1alpha1", "kind": "Application",
+                              "namespace": namespace, "name": name})
+            for res in app.get("status", {}).get("resources", []):
+                if res.get("group") == "argoproj.io" and res.get("kind") == "Application":
+                    if res.get("namespace", namespace) == namespace:
+                        queue.append(res["name"])
+                    continue
+                if res.get("group") or not res.get("namespace"):
+                    continue
+                if res["kind"] == "Service":
+                    if load_balancers is None:
+                        load_balancers = k8s_client.list_load_balancer_services()
+                    if f'{res["namespace"]}/{res["name"]}' not in load_balancers:
+                        continue
+                elif res["kind"] != "PersistentVolumeClaim":
+                    continue
+                self.refs.append({"group": "", "version": res["version"], "kind": res["kind"],
+                                  "namespace": res["namespace"], "name": res["name"]})
+
+    @property
+    def total(self) -> int:
+        return len(self.refs)
+
+    def wait(self, timeout: int = 600, on_deleted: Optional[Callable[[str], None]] = None) -> List[str]:
+        """
+        Waits till applications and their tracked resources are deleted.
+
+        :param timeout: Overall wait timeout in seconds
+        :param on_deleted: Called with "kind namespace/name" of every deleted object
+        :return: Objects that still exist after timeout, empty list when all are deleted
+        """
+        if not self.refs:
+            return []
+        return self._k8s_client.wait_for_deletion(self.refs, timeout, on_deleted)
 
 
 class DeliveryServiceManager:
@@ -246,6 +380,20 @@ class DeliveryServiceManager:
 
         return self._create_argocd_object(argo_app_cr, "applications")
 
+    def get_argocd_bootstrap_objects(self, sa_name: str) -> List[dict]:
+        """
+        Returns ArgoCD namespace and temporary bootstrap RBAC objects, to be applied with KubeClient.ensure
+        """
+        return [
+            {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": self._namespace}},
+            {"apiVersion": "v1", "kind": "ServiceAccount", "metadata": {"name": sa_name, "namespace": self._namespace}},
+            {"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRole", "metadata": {"name": sa_name},
+             "rules": [{"verbs": ["*"], "apiGroups": ["*"], "resources": ["*"]}]},
+            {"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRoleBinding", "metadata": {"name": sa_name},
+             "roleRef": {"name": sa_name, "apiGroup": "rbac.authorization.k8s.io", "kind": "ClusterRole"},
+             "subjects": [{"kind": "ServiceAccount", "name": sa_name, "namespace": self._namespace}]},
+        ]
+
     def create_argocd_bootstrap_job(self, sa_name: str):
         """
         Creates ArgoCD bootstrap job
@@ -280,3 +428,73 @@ class DeliveryServiceManager:
 
     def delete_app(self, name: str):
         return self._k8s_client.remove_custom_object(self._namespace, name, self._group, self._version, "applications")
+
+    @trace()
+    def wait_for_apps(self, healthy: List[str] = None, synced: List[str] = None, timeout: int = 900,
+                      on_progress: Optional[Callable[[str, Optional[str], Optional[str]], None]] = None) -> List[str]:
+        """
+        Waits till applications and all applications they manage (app-of-apps) are Healthy and/or Synced.
+
+        Application statuses are observed over a single watch stream, all applications are waited for at once.
+
+        :param healthy: Names of applications that should be Healthy, together with their child applications
+        :param synced: Names of applications that should be Synced, together with their child applications
+        :param timeout: Overall wait timeout in seconds
+        :param on_progress: Called with application name, health and sync status on every status change
+        of a required application
+        :return: Required applications with their statuses that are not reached after timeout, empty list on success
+        """
+        healthy, synced = healthy or [], synced or []
+        apps: Dict[str, dict] = {}
+        reported: Dict[str, tuple] = {}
+
+        def status(name: str) -> tuple:
+            app_status = apps.get(name, {}).get("status", {})
+            return app_status.get("health", {}).get("status"), app_status.get("sync", {}).get("status")
+
+        def expand(roots: List[str]) -> set:
+            # required applications are the roots and all applications they manage, at any depth
+            required, queue = set(), list(roots)
+            while queue:
+                name = queue.pop()
+                if name in required:
+                    continue
+                required.add(name)
+                for res in apps.get(name, {}).get("status", {}).get("resources", []):
+                    if res.get("kind") == "Application" and res.get("namespace", self._namespace) == self._namespace:
+                        queue.append(res["name"])
+            return required
+
+        def pending() -> List[str]:
+            not_healthy = {n for n in expand(healthy) if status(n)[0] != "Healthy"}
+            not_synced = {n for n in expand(synced) if status(n)[1] != "Synced"}
+            return [f"{n} ({'/'.join(str(s) for s in status(n))})" for n in sorted(not_healthy | not_synced)]
+
+        for event_type, app in self._k8s_client.watch_custom_objects(self._namespace, self._group, self._version,
+                                                                     "applications", timeout):
+            name = app["metadata"]["name"]
+            if event_type == "DELETED":
+                apps.pop(name, None)
+            else:
+                apps[name] = app
+
+            if on_progress is not None and name in expand(healthy) | expand(synced) \
+                    and reported.get(name) != status(name):
+                reported[name] = status(name)
+                on_progress(name, *status(name))
+
+            if not pending():
+                return []
+
+        stragglers = pending()
+        logger.warning(f"Applications not ready after {timeout} seconds: {', '.join(stragglers)}")
+        return stragglers
+
+    def track_apps_deletion(self, names: List[str]) -> ApplicationDeletionTracker:
+        """
+        Starts tracking deletion of applications, should be called before the applications are deleted.
+
+        :param names: Application names, missing applications are skipped
+        :return: Deletion tracker
+        """
+        return ApplicationDeletionTracker(self._k8s_client, names, self._namespace)
@@ -1,12 +1,47 @@
 import base64
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
 
 from kubernetes import client, watch, config
 from kubernetes.client import ApiException
+from urllib3.connection import HTTPConnection
 
 from common.const.common_path import LOCAL_FOLDER
 from common.logging_config import logger
-from common.retry_decorator import exponential_backoff
+from common.retry_decorator import RetryPolicy, is_transient_or_missing
 from common.tracing_decorator import trace
+from services.k8s.credential_provider import TokenCredentialProvider
+
+# resources are read while ArgoCD is still creating them, so missing ones are retried as well
+retry_until_created = RetryPolicy(max_retries=None, deadline=900, classifier=is_transient_or_missing)
+
+FIELD_MANAGER = "cgdevx"
+# plural resource names not derived by appending "s" to the lower case kind
+_PLURALS = {"Ingress": "ingresses", "NetworkPolicy": "networkpolicies", "StorageClass": "storageclasses",
+            "PodSecurityPolicy": "podsecuritypolicies", "Endpoints": "endpoints"}
+
+
+class _RefreshingApiClient(client.ApiClient):
+    """
+    API client retrying a request once with a fresh token when the API server rejects the current one.
+    """
+
+    def __init__(self, configuration: client.Configuration, credential_provider: TokenCredentialProvider):
+        super().__init__(configuration)
+        self._credential_provider = credential_provider
+
+    def call_api(self, *args, **kwargs):
+        try:
+            return super().call_api(*args, **kwargs)
+        except ApiException as e:
+            if e.status != 401:
+                raise e
+            logger.info("K8s API token rejected, retrying with a fresh token")
+            self._credential_provider.invalidate()
+            return super().call_api(*args, **kwargs)
 
 
 def write_ca_cert(ca_cert_data):
@@ -27,8 +62,134 @@ class KubeClient:
         if "api_key" in kwargs:
             self._configuration.api_key['authorization'] = kwargs["api_key"]
             self._configuration.api_key_prefix['authorization'] = 'Bearer'
+        # token is read from the provider before every request, so it is refreshed without re-creating the client
+        self._credential_provider: TokenCredentialProvider = kwargs.get("credential_provider")
+        if self._credential_provider is not None:
+            self._configuration.api_key_prefix['authorization'] = 'Bearer'
+            self._configuration.refresh_api_key_hook = self._refresh_api_key
         if "endpoint" in kwargs:
             self._configuration.host = kwargs["endpoint"]
+        # max number of simultaneous connections to API server, every running watch holds one
+        self._configuration.connection_pool_maxsize = kwargs.get("pool_size", 16)
+        # TCP keep-alive idle time in seconds, 0 to disable
+        self._keep_alive = kwargs.get("keep_alive", 30)
+
+        self._lock = threading.Lock()
+        self._api_clients: dict[str, client.ApiClient] = {}
+        self._apis: dict[tuple, object] = {}
+
+    def _refresh_api_key(self, configuration: client.Configuration):
+        configuration.api_key['authorization'] = self._credential_provider.token()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes pooled connections.
+        """
+        with self._lock:
+            for api_client in self._api_clients.values():
+                api_client.close()
+                api_client.rest_client.pool_manager.clear()
+            self._api_clients.clear()
+            self._apis.clear()
+
+    def _socket_options(self) -> list:
+        options = list(HTTPConnection.default_socket_options)
+        if self._keep_alive:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self._keep_alive))
+            elif hasattr(socket, "TCP_KEEPALIVE"):
+                # macOS
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, self._keep_alive))
+            if hasattr(socket, "TCP_KEEPINTVL"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, self._keep_alive))
+        return options
+
+    def _get_api_client(self, content_type: str = None) -> client.ApiClient:
+        """
+        Returns shared connection-pooled API client, created on first use.
+
+        :param content_type: Overrides Content-Type header, a separate client is kept for every override
+        """
+        key = content_type or ""
+        with self._lock:
+            if key not in self._api_clients:
+                api_client = client.ApiClient(self._configuration) if self._credential_provider is None \
+                    else _RefreshingApiClient(self._configuration, self._credential_provider)
+                api_client.rest_client.pool_manager.connection_pool_kw["socket_options"] = self._socket_options()
+                if content_type:
+                    api_client.set_default_header('Content-Type',
+                                                  api_client.select_header_content_type([content_type]))
+                self._api_clients[key] = api_client
+            return self._api_clients[key]
+
+    def _api(self, api_cls, content_type: str = None):
+        """
+        Returns cached API group accessor (e.g. CoreV1Api) bound to the shared API client.
+        """
+        key = (api_cls, content_type)
+        api = self._apis.get(key)
+        if api is None:
+            api = api_cls(self._get_api_client(content_type))
+            self._apis[key] = api
+        return api
+
+    @trace()
+    def ensure(self, objects: list[dict], field_manager: str = FIELD_MANAGER) -> list[dict]:
+        """
+        Creates or updates objects with server-side apply, a single request per object.
+
+        Namespaces are applied first, all other objects are independent and applied concurrently.
+        Fields owned by other managers are taken over (force apply).
+
+        :param objects: Object manifests with apiVersion, kind and metadata
+        :param field_manager: Field manager name recorded for applied fields
+        :return: Applied objects as returned by the API server, in the order of manifests
+        """
+        results: list = [None] * len(objects)
+        waves = [[i for i, o in enumerate(objects) if o["kind"] == "Namespace"],
+                 [i for i, o in enumerate(objects) if o["kind"] != "Namespace"]]
+        for wave in waves:
+            if not wave:
+                continue
+            with ThreadPoolExecutor(max_workers=min(len(wave), self._configuration.connection_pool_maxsize)) as pool:
+                futures = {i: pool.submit(self._apply, objects[i], field_manager) for i in wave}
+                # surface the first failure only after all objects are applied
+                errors = [f.exception() for f in futures.values()]
+            for error in errors:
+                if error is not None:
+                    raise error
+            for i, future in futures.items():
+                results[i] = future.result()
+        return results
+
+    def _apply(self, obj: dict, field_manager: str) -> dict:
+        """
+        Applies a single object with server-side apply.
+        """
+        api_version, kind = obj["apiVersion"], obj["kind"]
+        name, namespace = obj["metadata"]["name"], obj["metadata"].get("namespace")
+        plural = _PLURALS.get(kind, f"{kind.lower()}s")
+        # core group objects live under /api, all others under /apis
+        path = f"/api/{api_version}" if "/" not in api_version else f"/apis/{api_version}"
+        if namespace:
+            path += f"/namespaces/{namespace}"
+        path += f"/{plural}/{name}"
+
+        api_client = self._get_api_client("application/apply-patch+yaml")
+        return api_client.call_api(path, "PATCH",
+                                   query_params=[("fieldManager", field_manager), ("force", "true")],
+                                   header_params={"Accept": "application/json"},
+                                   body=obj,
+                                   response_type="object",
+                                   auth_settings=["BearerToken"],
+                                   _return_http_data_only=True)
 
     @trace()
     def create_namespace(self, name: str):
@@ -37,14 +198,15 @@ class KubeClient:
         """
         name = name.lower()
 
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
         body = client.V1Namespace(metadata=client.V1ObjectMeta(name=name))
         try:
             res = api_v1_instance.read_namespace(name)
             return res
         except ApiException as e:
             # namespace doesn't exist
-            pass
+            if e.status != 404:
+                raise e
 
         res = api_v1_instance.create_namespace(body=body)
         return res
@@ -57,14 +219,15 @@ class KubeClient:
 
         sa_name = sa_name.lower()
 
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
         body = client.V1ServiceAccount(metadata=client.V1ObjectMeta(name=sa_name, namespace=namespace))
         try:
             res = api_v1_instance.read_namespaced_service_account(name=sa_name, namespace=namespace)
             return res
         except ApiException as e:
             # service account doesn't exist
-            pass
+            if e.status != 404:
+                raise e
         res = api_v1_instance.create_namespaced_service_account(namespace=namespace, body=body)
         return res
 
@@ -75,7 +238,7 @@ class KubeClient:
         """
         name = name.lower()
 
-        rbac_v1_instance = client.RbacAuthorizationV1Api(client.ApiClient(self._configuration))
+        rbac_v1_instance = self._api(client.RbacAuthorizationV1Api)
 
         body = client.V1ClusterRole(metadata=client.V1ObjectMeta(name=name, namespace=namespace),
                                     rules=[client.V1PolicyRule(verbs=["*"], api_groups=["*"], resources=["*"])])
@@ -84,7 +247,8 @@ class KubeClient:
             return res
         except ApiException as e:
             # role doesn't exist
-            pass
+            if e.status != 404:
+                raise e
 
         res = rbac_v1_instance.create_cluster_role(body=body)
         return res
@@ -96,7 +260,7 @@ class KubeClient:
         """
         name = name.lower()
 
-        rbac_v1_instance = client.RbacAuthorizationV1Api(client.ApiClient(self._configuration))
+        rbac_v1_instance = self._api(client.RbacAuthorizationV1Api)
         body = client.V1ClusterRoleBinding(
             metadata=client.V1ObjectMeta(name=name, namespace=namespace),
             role_ref=client.V1RoleRef(name=role_name, api_group="rbac.authorization.k8s.io", kind="ClusterRole"),
@@ -107,7 +271,8 @@ class KubeClient:
             return res
         except ApiException as e:
             # cluster role binding doesn't exist
-            pass
+            if e.status != 404:
+                raise e
 
         res = rbac_v1_instance.create_cluster_role_binding(body=body)
         return res
@@ -118,7 +283,7 @@ class KubeClient:
         Creates a custom object.
         """
         try:
-            custom_v1_instance = client.CustomObjectsApi(client.ApiClient(self._configuration))
+            custom_v1_instance = self._api(client.CustomObjectsApi)
 
             res = custom_v1_instance.create_namespaced_custom_object(group=group, version=version,
                                                                      namespace=namespace,
@@ -135,11 +300,8 @@ class KubeClient:
         Patch custom object.
         """
         try:
-            api_client = client.ApiClient(self._configuration)
             # need to explicitly set headers
-            api_client.set_default_header('Content-Type',
-                                          api_client.select_header_content_type(['application/json-patch+json']))
-            custom_v1_instance = client.CustomObjectsApi(api_client)
+            custom_v1_instance = self._api(client.CustomObjectsApi, 'application/json-patch+json')
             res = custom_v1_instance.patch_namespaced_custom_object(group=group, version=version,
                                                                     namespace=namespace,
                                                                     name=name,
@@ -155,7 +317,7 @@ class KubeClient:
         Remove custom object.
         """
         try:
-            custom_v1_instance = client.CustomObjectsApi(client.ApiClient(self._configuration))
+            custom_v1_instance = self._api(client.CustomObjectsApi)
             res = custom_v1_instance.delete_namespaced_custom_object(group=group, version=version,
                                                                      namespace=namespace,
                                                                      name=name,
@@ -169,7 +331,7 @@ class KubeClient:
         """
         Creates Job.
         """
-        batch_v1_instance = client.BatchV1Api(client.ApiClient(self._configuration))
+        batch_v1_instance = self._api(client.BatchV1Api)
 
         try:
             res = batch_v1_instance.read_namespaced_job(name=job_name, namespace=namespace)
@@ -196,12 +358,12 @@ class KubeClient:
         return res
 
     @trace()
-    @exponential_backoff()
+    @retry_until_created
     def get_deployment(self, namespace: str, deployment_name: str):
         """
         Reads a Deployment.
         """
-        apps_v1_instance = client.AppsV1Api(client.ApiClient(self._configuration))
+        apps_v1_instance = self._api(client.AppsV1Api)
 
         try:
             res = apps_v1_instance.read_namespaced_deployment(name=deployment_name, namespace=namespace)
@@ -210,12 +372,12 @@ class KubeClient:
             raise e
 
     @trace()
-    @exponential_backoff()
+    @retry_until_created
     def get_pod(self, namespace: str, pod_name: str):
         """
         Reads a Deployment.
         """
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
 
         try:
             res = api_v1_instance.read_namespaced_pod(name=pod_name, namespace=namespace)
@@ -224,12 +386,12 @@ class KubeClient:
             raise e
 
     @trace()
-    @exponential_backoff()
+    @retry_until_created
     def get_stateful_set_objects(self, namespace: str, name: str):
         """
         Reads a StatefulSet.
         """
-        apps_v1_instance = client.AppsV1Api(client.ApiClient(self._configuration))
+        apps_v1_instance = self._api(client.AppsV1Api)
 
         try:
             res = apps_v1_instance.read_namespaced_stateful_set(name=name, namespace=namespace)
@@ -238,12 +400,12 @@ class KubeClient:
             raise e
 
     @trace()
-    @exponential_backoff()
+    @retry_until_created
     def get_ingress(self, namespace: str, name: str):
         """
         Reads an Ingress.
         """
-        network_v1_instance = client.NetworkingV1Api(client.ApiClient(self._configuration))
+        network_v1_instance = self._api(client.NetworkingV1Api)
 
         try:
             res = network_v1_instance.read_namespaced_ingress(name=name, namespace=namespace)
@@ -252,7 +414,7 @@ class KubeClient:
             raise e
 
     @trace()
-    @exponential_backoff()
+    @retry_until_created
     def get_certificate(self, namespace: str, name: str):
         """
         Reads a cert-manager certificate.
@@ -263,7 +425,7 @@ class KubeClient:
         """
         Reads a custom object.
         """
-        custom_v1_instance = client.CustomObjectsApi(client.ApiClient(self._configuration))
+        custom_v1_instance = self._api(client.CustomObjectsApi)
 
         try:
             res = custom_v1_instance.get_namespaced_custom_object(name=name, namespace=namespace, group=group,
@@ -272,12 +434,72 @@ class KubeClient:
         except ApiException as e:
             raise e
 
+    @trace()
+    def find_custom_object(self, namespace: str, name: str, group: str, version: str, plurals: str) -> Optional[dict]:
+        """
+        Reads a custom object, returns None if it doesn't exist.
+        """
+        try:
+            return self._get_custom_object(namespace, name, group, version, plurals)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise e
+
+    def watch_custom_objects(self, namespace: str, group: str, version: str, plurals: str,
+                             timeout: int = 300) -> Iterator[tuple[str, dict]]:
+        """
+        Lists custom objects and then watches their changes until timeout.
+
+        Every object existing at (re)list time is yielded as ADDED, so consumers should handle repeated events.
+        The list is repeated when the watch ends before timeout or its resource version expires.
+
+        :return: Iterator of event type (ADDED, MODIFIED, DELETED) and object
+        """
+        custom_v1_instance = self._api(client.CustomObjectsApi)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = int(deadline - time.monotonic())
+            if remaining <= 0:
+                return
+            listed = custom_v1_instance.list_namespaced_custom_object(group=group, version=version,
+                                                                      namespace=namespace, plural=plurals)
+            for item in listed["items"]:
+                yield "ADDED", item
+
+            w = watch.Watch()
+            try:
+                for event in w.stream(func=custom_v1_instance.list_namespaced_custom_object,
+                                      group=group,
+                                      version=version,
+                                      namespace=namespace,
+                                      plural=plurals,
+                                      resource_version=listed["metadata"]["resourceVersion"],
+                                      timeout_seconds=remaining):
+                    yield event["type"], event["object"]
+            except ApiException as e:
+                # resource version is too old, list again
+                if e.status != 410:
+                    raise e
+            finally:
+                w.stop()
+
+    @trace()
+    def list_load_balancer_services(self) -> set[str]:
+        """
+        Lists Services of LoadBalancer type in all namespaces.
+
+        :return: Services as "namespace/name"
+        """
+        services = self._api(client.CoreV1Api).list_service_for_all_namespaces()
+        return {f"{s.metadata.namespace}/{s.metadata.name}" for s in services.items if s.spec.type == "LoadBalancer"}
+
     @trace()
     def remove_service_account(self, namespace: str, sa_name: str):
         """
         Removes a service account.
         """
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
         try:
             api_v1_instance.delete_namespaced_service_account(name=sa_name, namespace=namespace)
             return True
@@ -290,7 +512,7 @@ class KubeClient:
         """
         Removes a cluster role.
         """
-        rbac_v1_instance = client.RbacAuthorizationV1Api(client.ApiClient(self._configuration))
+        rbac_v1_instance = self._api(client.RbacAuthorizationV1Api)
         try:
             rbac_v1_instance.delete_cluster_role(name=r_name)
             return True
@@ -303,7 +525,7 @@ class KubeClient:
         """
         Removes a cluster role binding.
         """
-        rbac_v1_instance = client.RbacAuthorizationV1Api(client.ApiClient(self._configuration))
+        rbac_v1_instance = self._api(client.RbacAuthorizationV1Api)
         try:
             rbac_v1_instance.delete_cluster_role_binding(name=rb_name)
             return True
@@ -317,7 +539,7 @@ class KubeClient:
         name = deployment.metadata.name
         namespace = deployment.metadata.namespace
 
-        apps_v1_instance = client.AppsV1Api(client.ApiClient(self._configuration))
+        apps_v1_instance = self._api(client.AppsV1Api)
         w = watch.Watch()
 
         try:
@@ -341,7 +563,7 @@ class KubeClient:
         job_name = job.metadata.name
         namespace = job.metadata.namespace
 
-        batch_v1_instance = client.BatchV1Api(client.ApiClient(self._configuration))
+        batch_v1_instance = self._api(client.BatchV1Api)
         w = watch.Watch()
 
         try:
@@ -365,7 +587,7 @@ class KubeClient:
         name = pod.metadata.name
         namespace = pod.metadata.namespace
 
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
         w = watch.Watch()
 
         try:
@@ -394,7 +616,7 @@ class KubeClient:
         name = stateful_set.metadata.name
         namespace = stateful_set.metadata.namespace
 
-        apps_v1_instance = client.AppsV1Api(client.ApiClient(self._configuration))
+        apps_v1_instance = self._api(client.AppsV1Api)
         w = watch.Watch()
         try:
             for event in w.stream(func=apps_v1_instance.list_namespaced_stateful_set,
@@ -417,7 +639,7 @@ class KubeClient:
         name = ingress.metadata.name
         namespace = ingress.metadata.namespace
 
-        network_v1_instance = client.NetworkingV1Api(client.ApiClient(self._configuration))
+        network_v1_instance = self._api(client.NetworkingV1Api)
 
         w = watch.Watch()
         try:
@@ -445,7 +667,7 @@ class KubeClient:
         object_name = cust_object["metadata"]["name"]
         namespace = cust_object["metadata"]["namespace"]
 
-        custom_v1_instance = client.CustomObjectsApi(client.ApiClient(self._configuration))
+        custom_v1_instance = self._api(client.CustomObjectsApi)
         w = watch.Watch()
 
         try:
@@ -466,6 +688,192 @@ class KubeClient:
         except ApiException as e:
             raise e
 
+    @trace()
+    def wait_for_all(self, resources: list, timeout: int = 300) -> list[str]:
+        """
+        Waits for readiness of multiple resources at once.
+
+        Resources are grouped by namespace and kind, each group is observed over a single list-watch stream,
+        and all streams are watched concurrently, so the wait takes as long as the slowest resource.
+        Supports Deployments, StatefulSets, Ingresses, Pods, Jobs and custom objects with a Ready condition
+        (e.g. cert-manager Certificates).
+
+        :param resources: Resource objects as returned by the corresponding get_* methods
+        :param timeout: Overall wait timeout in seconds
+        :return: Names of the resources that are not ready after timeout, empty list when all are ready
+        """
+        groups = {}
+        for resource in resources:
+            namespace, name = self._get_object_namespace_and_name(resource)
+            watch_func, watch_kwargs, is_ready = self._get_readiness_watch(resource)
+            key = (namespace, watch_func.__name__, tuple(sorted(watch_kwargs.items())))
+            group = groups.setdefault(key, {"func": watch_func, "kwargs": watch_kwargs, "is_ready": is_ready,
+                                            "names": set()})
+            group["names"].add(name)
+
+        deadline = time.monotonic() + timeout
+
+        def wait_group(namespace: str, group: dict) -> set[str]:
+            pending = set(group["names"])
+            while pending:
+                remaining = int(deadline - time.monotonic())
+                if remaining <= 0:
+                    break
+                w = watch.Watch()
+                for event in w.stream(func=group["func"],
+                                      namespace=namespace,
+                                      timeout_seconds=remaining,
+                                      **group["kwargs"]):
+                    _, name = self._get_object_namespace_and_name(event["object"])
+                    if name not in pending:
+                        continue
+                    # event.type: ADDED, MODIFIED, DELETED
+                    if event["type"] == "DELETED":
+                        w.stop()
+                        raise Exception(f"{namespace}/{name} deleted before it started")
+                    if group["is_ready"](event["object"]):
+                        pending.discard(name)
+                        if not pending:
+                            w.stop()
+                            break
+            return {f"{namespace}/{name}" for name in pending}
+
+        stragglers = []
+        with ThreadPoolExecutor(max_workers=max(len(groups), 1)) as pool:
+            futures = [pool.submit(wait_group, key[0], group) for key, group in groups.items()]
+            for future in futures:
+                stragglers.extend(future.result())
+
+        if stragglers:
+            logger.warning(f"Resources not ready after {timeout} seconds: {', '.join(sorted(stragglers))}")
+        return sorted(stragglers)
+
+    @trace()
+    def wait_for_deletion(self, refs: list[dict], timeout: int = 300,
+                          on_deleted: Optional[Callable[[str], None]] = None) -> list[str]:
+        """
+        Waits till multiple objects are deleted.
+
+        Objects are grouped by namespace and kind, each group is listed once and then observed over a single watch
+        stream started from the list resource version, all streams are watched concurrently.
+        Supports Services, PersistentVolumeClaims and namespaced custom objects.
+
+        :param refs: Object references with group, version, kind, namespace and name keys, as in ArgoCD
+        Application status resources
+        :param timeout: Overall wait timeout in seconds
+        :param on_deleted: Called with "kind namespace/name" of every deleted object, from watching threads
+        :return: References of objects that still exist after timeout, empty list when all are deleted
+        """
+        groups = {}
+        for ref in refs:
+            key = (ref["namespace"], ref.get("group", ""), ref["version"], ref["kind"])
+            groups.setdefault(key, set()).add(ref["name"])
+
+        deadline = time.monotonic() + timeout
+        callback_lock = threading.Lock()
+
+        def deleted(kind: str, namespace: str, name: str):
+            if on_deleted is not None:
+                with callback_lock:
+                    on_deleted(f"{kind} {namespace}/{name}")
+
+        def wait_group(namespace: str, group: str, version: str, kind: str, names: set[str]) -> set[str]:
+            list_func, list_kwargs = self._get_list_func(group, version, kind)
+            pending = set(names)
+            while pending:
+                remaining = int(deadline - time.monotonic())
+                if remaining <= 0:
+                    break
+                # list first, objects deleted before the watch started are never reported by it
+                listed = list_func(namespace=namespace, **list_kwargs)
+                if isinstance(listed, dict):
+                    existing = {i["metadata"]["name"] for i in listed["items"]}
+                    resource_version = listed["metadata"]["resourceVersion"]
+                else:
+                    existing = {i.metadata.name for i in listed.items}
+                    resource_version = listed.metadata.resource_version
+                for name in pending - existing:
+                    pending.discard(name)
+                    deleted(kind, namespace, name)
+                if not pending:
+                    break
+
+                w = watch.Watch()
+                try:
+                    for event in w.stream(func=list_func,
+                                          namespace=namespace,
+                                          resource_version=resource_version,
+                                          timeout_seconds=remaining,
+                                          **list_kwargs):
+                        _, name = self._get_object_namespace_and_name(event["object"])
+                        if event["type"] == "DELETED" and name in pending:
+                            pending.discard(name)
+                            deleted(kind, namespace, name)
+                            if not pending:
+                                w.stop()
+                                break
+                except ApiException as e:
+                    # resource version is too old, list again
+                    if e.status != 410:
+                        raise e
+            return {f"{kind} {namespace}/{name}" for name in pending}
+
+        stragglers = []
+        with ThreadPoolExecutor(max_workers=max(len(groups), 1)) as pool:
+            futures = [pool.submit(wait_group, *key, names) for key, names in groups.items()]
+            for future in futures:
+                stragglers.extend(future.result())
+
+        if stragglers:
+            logger.warning(f"Objects not deleted after {timeout} seconds: {', '.join(sorted(stragglers))}")
+        return sorted(stragglers)
+
+    def _get_list_func(self, group: str, version: str, kind: str):
+        """
+        Returns namespaced list function and its additional arguments for the object kind.
+        """
+        if not group and kind == "Service":
+            return self._api(client.CoreV1Api).list_namespaced_service, {}
+        if not group and kind == "PersistentVolumeClaim":
+            return self._api(client.CoreV1Api).list_namespaced_persistent_volume_claim, {}
+        if group:
+            return self._api(client.CustomObjectsApi).list_namespaced_custom_object, \
+                {"group": group, "version": version, "plural": f"{kind.lower()}s"}
+        raise ValueError(f"Unsupported object kind {kind}")
+
+    @staticmethod
+    def _get_object_namespace_and_name(obj) -> tuple[str, str]:
+        if isinstance(obj, dict):
+            return obj["metadata"]["namespace"], obj["metadata"]["name"]
+        return obj.metadata.namespace, obj.metadata.name
+
+    def _get_readiness_watch(self, resource):
+        """
+        Returns list function, its additional arguments and readiness predicate for the resource kind.
+        """
+        if isinstance(resource, client.V1Deployment):
+            return self._api(client.AppsV1Api).list_namespaced_deployment, {}, \
+                lambda o: o.status.ready_replicas == o.spec.replicas
+        if isinstance(resource, client.V1StatefulSet):
+            return self._api(client.AppsV1Api).list_namespaced_stateful_set, {}, \
+                lambda o: o.status.available_replicas == o.spec.replicas
+        if isinstance(resource, client.V1Ingress):
+            return self._api(client.NetworkingV1Api).list_namespaced_ingress, {}, \
+                lambda o: bool(o.status.load_balancer.ingress)
+        if isinstance(resource, client.V1Pod):
+            return self._api(client.CoreV1Api).list_namespaced_pod, {}, \
+                lambda o: o.status.phase == "Running"
+        if isinstance(resource, client.V1Job):
+            return self._api(client.BatchV1Api).list_namespaced_job, {}, \
+                lambda o: bool(o.status.succeeded)
+        if isinstance(resource, dict):
+            group, version = resource["apiVersion"].split("/")
+            plural = f'{resource["kind"].lower()}s'
+            return self._api(client.CustomObjectsApi).list_namespaced_custom_object, \
+                {"group": group, "version": version, "plural": plural}, \
+                lambda o: (o.get("status", {}).get("conditions") or [{}])[0].get("reason") == "Ready"
+        raise ValueError(f"Unsupported resource type {type(resource).__name__}")
+
     @trace()
     def create_plain_secret(self, namespace: str, name: str, data: dict, annotations: dict = None,
                             labels: dict = None):
@@ -474,7 +882,7 @@ class KubeClient:
         """
         name = name.lower()
 
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
 
         body = client.V1Secret(metadata=client.V1ObjectMeta(name=name, namespace=namespace,
                                                             annotations=annotations,
@@ -484,8 +892,9 @@ class KubeClient:
             res = api_v1_instance.read_namespaced_secret(name=name, namespace=namespace)
             return res
         except ApiException as e:
-            # service account doesn't exist
-            pass
+            # secret doesn't exist
+            if e.status != 404:
+                raise e
 
         res = api_v1_instance.create_namespaced_secret(namespace=namespace, body=body)
         return res
@@ -495,7 +904,7 @@ class KubeClient:
         """
         Creates secret.
         """
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
         body = client.V1Secret(metadata=client.V1ObjectMeta(name=name, namespace=namespace,
                                                             annotations=annotations,
                                                             labels=labels),
@@ -504,8 +913,9 @@ class KubeClient:
             res = api_v1_instance.read_namespaced_secret(name=name, namespace=namespace)
             return res
         except ApiException as e:
-            # service account doesn't exist
-            pass
+            # secret doesn't exist
+            if e.status != 404:
+                raise e
 
         res = api_v1_instance.create_namespaced_secret(namespace=namespace, body=body)
         return res
@@ -517,7 +927,7 @@ class KubeClient:
         """
         name = name.lower()
 
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
 
         body = client.V1ConfigMap(metadata=client.V1ObjectMeta(name=name, namespace=namespace,
                                                                annotations=annotations,
@@ -529,18 +939,19 @@ class KubeClient:
             return res
         except ApiException as e:
             # config map doesn't exist
-            pass
+            if e.status != 404:
+                raise e
 
         res = api_v1_instance.create_namespaced_config_map(namespace=namespace, body=body)
         return res
 
-    @exponential_backoff()
+    @retry_until_created
     @trace()
     def get_secret(self, namespace: str, name: str):
         """
         Get secret.
         """
-        api_v1_instance = client.CoreV1Api(client.ApiClient(self._configuration))
+        api_v1_instance = self._api(client.CoreV1Api)
 
         try:
             res = api_v1_instance.read_namespaced_secret(name=name, namespace=namespace)
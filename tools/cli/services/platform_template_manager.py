@@ -8,11 +8,12 @@ import requests
 from ghrepo import GHRepo
 from git import Repo, RemoteProgress, GitError, Actor
 
-from common.const.common_path import LOCAL_TF_FOLDER, LOCAL_GITOPS_FOLDER
+from common.const.common_path import LOCAL_TF_FOLDER, LOCAL_GITOPS_FOLDER, LOCAL_PARAMETRISATION_MANIFEST
 from common.const.const import GITOPS_REPOSITORY_URL, GITOPS_REPOSITORY_BRANCH
 from common.enums.git_providers import GitProviders
 from common.state_store import StateStore
 from common.tracing_decorator import trace
+from services.template_parametriser import TemplateParametriser, ParametrisationManifest
 
 
 class GitOpsTemplateManager:
@@ -144,21 +145,10 @@ class GitOpsTemplateManager:
 
     @staticmethod
     def __file_replace(state: StateStore, folder):
-        try:
-            for root, dirs, files in os.walk(folder):
-                for name in files:
-                    if name.endswith(".tf") or name.endswith(".yaml") or name.endswith(".yml") or name.endswith(".md"):
-                        file_path = os.path.join(root, name)
-                        with open(file_path, "r") as file:
-                            data = file.read()
-                            for k, v in state.fragments.items():
-                                data = data.replace(k, v)
-                            for k, v in state.parameters.items():
-                                data = data.replace(k, v)
-                        with open(file_path, "w") as file:
-                            file.write(data)
-        except Exception as e:
-            raise Exception(f"Error while parametrizing file: {file_path}", e)
+        # fragments could contain parameter placeholders, so are applied first
+        # manifest allows re-runs to skip files that are already parametrised
+        TemplateParametriser(state.fragments, state.parameters).render_folder(
+            folder, ParametrisationManifest(LOCAL_PARAMETRISATION_MANIFEST))
 
 
 class ProgressPrinter(RemoteProgress):
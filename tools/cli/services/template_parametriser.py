@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from common.logging_config import logger
+
+PARAMETRISABLE_FILE_EXTENSIONS = (".tf", ".yaml", ".yml", ".md")
+
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class ParametrisationManifest:
+    """
+    Records the result of the last parametrisation of every file.
+
+    Every entry holds the template (source) hash, placeholders the file consumed with the hash of their values,
+    the hash, size and modification time of the written file, and the fingerprint of the placeholder set used.
+    A file that still matches its entry and has no new placeholders to resolve is skipped without being read.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self._path = Path(path)
+        self._entries: Dict[str, dict] = {}
+        if self._path.exists():
+            try:
+                with open(self._path, "r") as file:
+                    self._entries = json.load(file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read parametrisation manifest {self._path}, ignoring it: {e}")
+
+    def _key(self, file_path: Union[str, Path]) -> str:
+        return os.path.relpath(file_path, self._path.parent)
+
+    def get(self, file_path: Union[str, Path]) -> Optional[dict]:
+        return self._entries.get(self._key(file_path))
+
+    def set(self, file_path: Union[str, Path], entry: dict):
+        self._entries[self._key(file_path)] = entry
+
+    def save(self):
+        os.makedirs(self._path.parent, exist_ok=True)
+        tmp_path = self._path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(self._entries, file)
+        os.replace(tmp_path, self._path)
+
+
+class TemplateParametriser:
+    """Single-pass placeholder replacement engine for template files."""
+
+    def __init__(self, *replacements: Dict[str, str], max_workers: int = 8):
+        """
+        Compiles placeholders into a single matcher.
+
+        Replacement maps are applied in the given order with the same result as calling str.replace for every
+        placeholder one after another, e.g. a fragment containing parameter placeholders is resolved when fragments
+        are followed by parameters.
+
+        :param replacements: Placeholder to value maps, in order of application.
+        :param max_workers: Max number of files processed in parallel.
+        """
+        self._values = self._resolve_values(replacements)
+        self._max_workers = max_workers
+        self._fingerprint = _sha256("\0".join(sorted(self._values)))
+        if self._values:
+            # longest first, so placeholder containing another placeholder wins
+            alternation = "|".join(re.escape(k) for k in sorted(self._values, key=len, reverse=True))
+            self._pattern = re.compile(alternation)
+        else:
+            self._pattern = None
+
+    @staticmethod
+    def _resolve_values(replacements) -> Dict[str, str]:
+        """
+        Applies placeholders that would have been replaced after the given one to its value.
+        """
+        ordered = [(k, v) for r in replacements for k, v in r.items()]
+        values = {}
+        for i, (key, value) in enumerate(ordered):
+            if key in values:
+                # placeholder already replaced by an earlier map
+                continue
+            for later_key, later_value in ordered[i + 1:]:
+                value = value.replace(later_key, later_value)
+            values[key] = value
+        return values
+
+    def _values_hash(self, keys) -> str:
+        return _sha256("\0".join(f"{k}={self._values.get(k)}" for k in sorted(keys)))
+
+    def render(self, text: str) -> str:
+        """
+        Replaces all placeholders in text.
+
+        :param text: Template text.
+        :return: Parametrised text.
+        """
+        return self._render(text)[0]
+
+    def _render(self, text: str) -> Tuple[str, set]:
+        consumed = set()
+        if self._pattern is None:
+            return text, consumed
+
+        def replace(match):
+            consumed.add(match.group(0))
+            return self._values[match.group(0)]
+
+        return self._pattern.sub(replace, text), consumed
+
+    def render_file(self, file_path: Union[str, Path]) -> bool:
+        """
+        Replaces placeholders in a file, the file is written only when its content changes.
+
+        :param file_path: Path to the file.
+        :return: True if the file was changed.
+        """
+        return self._process_file(file_path, None)[0]
+
+    def _process_file(self, file_path: Union[str, Path], entry: Optional[dict]) -> Tuple[bool, Optional[dict]]:
+        """
+        Parametrises a file unless its manifest entry shows it's up-to-date.
+
+        :return: Change flag and the new manifest entry.
+        """
+        try:
+            st = os.stat(file_path)
+            if entry is not None and entry["fingerprint"] == self._fingerprint \
+                    and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                return False, entry
+
+            with open(file_path, "r") as file:
+                data = file.read()
+            data_hash = _sha256(data)
+
+            if entry is not None and data_hash == entry["output"]:
+                # file is the output of previous run, consumed placeholders are gone and could not be re-applied
+                if entry["values"] != self._values_hash(entry["consumed"]):
+                    logger.warning(f"Parameters used in '{file_path}' have changed since it was parametrised, "
+                                   f"template should be re-created to apply them")
+                if entry["fingerprint"] == self._fingerprint:
+                    return False, dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                consumed_before = entry["consumed"]
+                source_hash = entry["source"]
+            else:
+                consumed_before = []
+                source_hash = data_hash
+
+            result, consumed = self._render(data)
+            consumed.update(consumed_before)
+            changed = result != data
+            if changed:
+                with open(file_path, "w") as file:
+                    file.write(result)
+                st = os.stat(file_path)
+        except Exception as e:
+            raise Exception(f"Error while parametrizing file: {file_path}", e)
+
+        if changed:
+            logger.debug(f"File '{file_path}' parameterized successfully.")
+        return changed, {
+            "source": source_hash,
+            "consumed": sorted(consumed),
+            "values": self._values_hash(consumed),
+            "output": _sha256(result),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "fingerprint": self._fingerprint,
+        }
+
+    def render_folder(self, folder: Union[str, Path],
+                      manifest: Optional[ParametrisationManifest] = None) -> List[str]:
+        """
+        Replaces placeholders in all eligible files within the folder, processing files in parallel.
+
+        :param folder: Directory containing files to process.
+        :param manifest: Optional manifest used to skip files that are already parametrised with the same placeholders.
+        :return: List of changed files.
+        """
+        file_paths = [os.path.join(root, name)
+                      for root, dirs, files in os.walk(folder)
+                      for name in files if name.endswith(PARAMETRISABLE_FILE_EXTENSIONS)]
+        entries = [manifest.get(path) if manifest is not None else None for path in file_paths]
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            results = list(pool.map(self._process_file, file_paths, entries))
+
+        changed = []
+        for path, (is_changed, entry) in zip(file_paths, results):
+            if is_changed:
+                changed.append(path)
+            if manifest is not None:
+                manifest.set(path, entry)
+        if manifest is not None:
+            manifest.save()
+
+        logger.debug(f"Parametrised {len(changed)} of {len(file_paths)} files in '{folder}'")
+        return changed
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from common.logging_config import logger
+from common.tracing_decorator import trace
+from services.tf_wrapper import TfWrapper
+
+
+class TfModuleOrchestrator:
+    """
+    Initialises Terraform modules concurrently.
+
+    All Terraform processes share the plugin cache, so each provider is downloaded only once. The plugin cache
+    is not safe for concurrent use, so only module downloads (terraform get) run in parallel, while inits that
+    install providers are serialised by TfWrapper. The first init warms the cache for the following ones.
+    """
+
+    def __init__(self, modules: Dict[str, Union[str, Path]], max_workers: int = 5):
+        """
+        :param modules: Module name to Terraform module directory map.
+        :param max_workers: Max number of modules downloaded in parallel.
+        """
+        self._modules = modules
+        self._max_workers = max_workers
+
+    def _init_module(self, name: str, env: Optional[Dict[str, str]]):
+        tf_wrapper = TfWrapper(self._modules[name], env=env)
+        logger.info(f"Downloading Terraform modules of {name}")
+        tf_wrapper.get()
+        logger.info(f"Initialising Terraform module {name}")
+        tf_wrapper.init()
+
+    @trace()
+    def init_all(self, env: Optional[Dict[str, str]] = None):
+        """
+        Runs terraform init for all modules.
+
+        :param env: Environment variables required by Terraform backends.
+        """
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="tf-init") as pool:
+            futures = [pool.submit(self._init_module, name, env) for name in self._modules]
+            # surface the first failure only after all inits are finished
+            errors = [f.exception() for f in futures]
+
+        for error in errors:
+            if error is not None:
+                raise error
@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from common.logging_config import logger
+
+
+class TerraformOutputCache:
+    """
+    Keeps Terraform module outputs in memory for the life of the process.
+
+    Entries are dropped by explicit invalidation after apply or destroy. For modules with a local state file
+    the entry is additionally checked against the lineage and serial of that file, remote backends are not
+    queried, so state changes made outside the CLI require a refresh.
+    Outputs include sensitive values and are never written to disk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+
+    @staticmethod
+    def _key(module_dir: Union[str, Path]) -> str:
+        return os.path.realpath(module_dir)
+
+    @staticmethod
+    def local_state_identity(module_dir: Union[str, Path]) -> Optional[Tuple[str, int]]:
+        """
+        Reads lineage and serial of a local state file.
+
+        :param module_dir: Terraform module directory.
+        :return: Lineage and serial, or None when the module has no local state.
+        """
+        try:
+            with open(os.path.join(module_dir, "terraform.tfstate"), "r") as file:
+                state = json.load(file)
+            return state["lineage"], state["serial"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, module_dir: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        :param module_dir: Terraform module directory.
+        :return: Cached outputs, or None if there is no valid entry.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(module_dir))
+        if entry is None:
+            return None
+
+        if self.local_state_identity(module_dir) != entry["identity"]:
+            logger.debug(f"Terraform state of {module_dir} changed, cached outputs are stale")
+            return None
+        return dict(entry["outputs"])
+
+    def set(self, module_dir: Union[str, Path], outputs: Dict[str, Any]):
+        identity = self.local_state_identity(module_dir)
+        with self._lock:
+            self._entries[self._key(module_dir)] = {"identity": identity, "outputs": outputs}
+
+    def invalidate(self, module_dir: Union[str, Path]):
+        with self._lock:
+            self._entries.pop(self._key(module_dir), None)
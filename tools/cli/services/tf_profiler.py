@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+from common.logging_config import logger
+
+
+class TerraformProfiler:
+    """
+    Builds a per-module report of Terraform resource operation timings.
+
+    Terraform UI events do not carry resource dependencies, so the critical path is inferred from timings:
+    every operation is chained to the latest operation that finished before it started, and the chain ending
+    with the last finished operation is reported.
+    """
+
+    def __init__(self, report_path: Union[str, Path], top: int = 20):
+        """
+        :param report_path: JSON report file, modules from an existing report are kept unless re-profiled.
+        :param top: Number of slowest resources reported.
+        """
+        self._report_path = Path(report_path)
+        self._top = top
+        self._lock = threading.Lock()
+        self._modules: Dict[str, Dict[str, Any]] = {}
+        if self._report_path.exists():
+            try:
+                with open(self._report_path, "r") as file:
+                    self._modules = json.load(file).get("modules", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read Terraform profile {self._report_path}, ignoring it: {e}")
+
+    @staticmethod
+    def critical_path(timings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Infers the longest chain of sequential resource operations.
+
+        :param timings: Resource operation timings.
+        :return: Operations on the critical path in execution order.
+        """
+        ops = sorted((t for t in timings if t["start"] is not None and t["end"] is not None),
+                     key=lambda t: t["end"])
+        if not ops:
+            return []
+
+        predecessor = {}
+        for i, op in enumerate(ops):
+            candidates = [j for j in range(i) if ops[j]["end"] <= op["start"]]
+            predecessor[i] = candidates[-1] if candidates else None
+
+        path = []
+        i = len(ops) - 1
+        while i is not None:
+            path.append(ops[i])
+            i = predecessor[i]
+        return list(reversed(path))
+
+    def record(self, module: str, operation: str, timings: List[Dict[str, Any]]):
+        """
+        Adds module timings to the report and writes it.
+
+        :param module: Terraform module name, e.g. vcs or hosting_provider.
+        :param operation: Terraform command, apply or destroy.
+        :param timings: Resource operation timings.
+        """
+        starts = [t["start"] for t in timings if t["start"] is not None]
+        ends = [t["end"] for t in timings if t["end"] is not None]
+        if timings and not (starts and ends):
+            logger.warning(f"Terraform {operation} events of {module} carry no usable timestamps, "
+                           f"wall time and critical path are not reported")
+        path = self.critical_path(timings)
+        slowest = sorted(timings, key=lambda t: t["elapsed"] or 0, reverse=True)
+
+        with self._lock:
+            self._modules[module] = {
+                "operation": operation,
+                "recorded": time.time(),
+                "wall_time": round(max(ends) - min(starts), 3) if starts and ends else 0,
+                "resource_time": sum(t["elapsed"] or 0 for t in timings),
+                "resources": len(timings),
+                "slowest": slowest[:self._top],
+                "critical_path": [{"address": t["address"], "action": t["action"], "elapsed": t["elapsed"]}
+                                  for t in path],
+                "critical_path_time": round(path[-1]["end"] - path[0]["start"], 3) if path else 0,
+            }
+            self._save()
+
+    def _save(self):
+        slowest = sorted(
+            (dict(t, module=name) for name, m in self._modules.items() for t in m["slowest"]),
+            key=lambda t: t["elapsed"] or 0, reverse=True
+        )
+        os.makedirs(self._report_path.parent, exist_ok=True)
+        tmp_path = self._report_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump({"slowest": slowest[:self._top], "modules": self._modules}, file, indent=2)
+        os.replace(tmp_path, self._report_path)
+        logger.info(f"Terraform profile written to {self._report_path}")
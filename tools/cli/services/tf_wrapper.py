@@ -1,13 +1,20 @@
 import json
 import os
+import queue
 import subprocess
 import tempfile
-from typing import Tuple, Dict, Any, Optional, List, Generator
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple, Dict, Any, Optional, List, Callable, Union
 
 from alive_progress import alive_bar
 
-from common.const.common_path import LOCAL_TF_TOOL
+from common.const.common_path import LOCAL_TF_TOOL, LOCAL_TF_PLUGIN_CACHE_FOLDER
 from common.logging_config import logger
+from services.tf_output_cache import TerraformOutputCache
+from services.tf_profiler import TerraformProfiler
 
 
 class TerraformExecutionError(Exception):
@@ -18,12 +25,42 @@ class TerraformExecutionError(Exception):
         self.stderr = stderr
 
 
+# outputs are shared by all wrappers, so any apply or destroy invalidates them
+_output_cache = TerraformOutputCache()
+
+# the plugin cache is not safe for concurrent use, so processes that could install providers are serialised
+_plugin_cache_lock = threading.Lock()
+
+# line event callback, receives stream name ("stdout" or "stderr") and the line
+LineCallback = Callable[[str, str], None]
+# machine-readable UI event callback, receives a decoded Terraform -json event
+EventCallback = Callable[[dict], None]
+
+
 class TfWrapper:
-    def __init__(self, working_dir: str = None):
+    def __init__(self, working_dir: str = None, on_line: Optional[LineCallback] = None,
+                 spool_file: Optional[Union[str, Path]] = None, max_output_lines: int = 2000,
+                 profiler: Optional[TerraformProfiler] = None, env: Optional[Dict[str, str]] = None,
+                 show_progress: bool = True):
+        """
+        :param working_dir: Terraform module directory.
+        :param on_line: Optional callback invoked for every output line of Terraform commands.
+        :param spool_file: Optional file the full output of Terraform commands is appended to.
+        :param max_output_lines: Number of last output lines per stream kept in memory for results and errors.
+        :param profiler: Optional profiler recording resource timings of apply and destroy.
+        :param env: Optional environment variables for Terraform processes, empty values are skipped.
+        :param show_progress: Flag to show apply and destroy progress bar, disable it for concurrently running modules.
+        """
         self.terraform_bin_path = LOCAL_TF_TOOL if os.path.exists(LOCAL_TF_TOOL) else 'terraform'
         self.working_dir = working_dir
-        self.tf_command_manager = TerraformCommandManager(self.terraform_bin_path, self.working_dir)
+        self.tf_command_manager = TerraformCommandManager(self.terraform_bin_path, self.working_dir, env)
         self.tf_progress_manager = TerraformProgressBar()
+        self.resource_timings: List[Dict[str, Any]] = []
+        self._on_line = on_line
+        self._spool_file = spool_file
+        self._max_output_lines = max_output_lines
+        self._profiler = profiler
+        self._show_progress = show_progress
 
     def version(self, *args, **kwargs) -> Dict[str, Any]:
         """
@@ -37,7 +74,7 @@ class TfWrapper:
             'version', None, '-json', *args, **kwargs
         )
         logger.info(f"Executing Terraform version with command: {command}")
-        return_code, stdout, stderr = self.run_terraform_command(command)
+        return_code, stdout, stderr = self.run_terraform_command(command, full_output=True)
         if return_code != 0:
             raise TerraformExecutionError(return_code, stdout, stderr)
         return json.loads(stdout)
@@ -55,6 +92,39 @@ class TfWrapper:
             'init', variables, *args, **kwargs, input=False
         )
         logger.info(f"Executing Terraform init with command: {command}")
+        with _plugin_cache_lock:
+            return_code, stdout, stderr = self.run_terraform_command(command)
+        if return_code != 0:
+            raise TerraformExecutionError(return_code, stdout, stderr)
+        return True
+
+    def is_initialised(self) -> bool:
+        """
+        :return: True if the working directory was initialised by Terraform init.
+        """
+        return os.path.isdir(os.path.join(self.working_dir, ".terraform"))
+
+    def ensure_init(self) -> bool:
+        """
+        Executes the Terraform init command unless the working directory is already initialised,
+        e.g. when a resumed run continues on another machine or with a removed .terraform directory.
+
+        :return: True if init was executed, False if the working directory was already initialised.
+        """
+        if self.is_initialised():
+            return False
+        return self.init()
+
+    def get(self, *args, **kwargs) -> bool:
+        """
+        Executes the Terraform get command, which downloads modules only and does not touch the plugin cache.
+
+        :param args: Additional positional arguments for the command.
+        :param kwargs: Additional named arguments for the command.
+        :return: True if the command was successful, otherwise raises an exception.
+        """
+        command = self.tf_command_manager.prepare_terraform_command('get', None, *args, **kwargs)
+        logger.info(f"Executing Terraform get with command: {command}")
         return_code, stdout, stderr = self.run_terraform_command(command)
         if return_code != 0:
             raise TerraformExecutionError(return_code, stdout, stderr)
@@ -70,29 +140,41 @@ class TfWrapper:
         :return: True if the command was successful, otherwise raises an exception.
         """
         command = self.tf_command_manager.prepare_terraform_command(
-            'apply', variables, '-auto-approve', *args, **kwargs, input=False
+            'apply', variables, '-auto-approve', '-json', *args, **kwargs, input=False
         )
         logger.info(f"Executing Terraform apply with command: {command}")
-        return_code, stdout, stderr = self.run_terraform_command(command, track_progress=True)
+        _output_cache.invalidate(self.working_dir)
+        return_code, stdout, stderr = self._run_with_events('apply', command)
         if return_code != 0:
             logger.error(f"Terraform apply failed with return code {return_code}: {stderr}")
             raise TerraformExecutionError(return_code, stdout, stderr)
         logger.info("Terraform apply executed successfully.")
         return True
 
-    def output(self, *args, **kwargs) -> Dict[str, Any]:
+    def output(self, *args, refresh: bool = False, **kwargs) -> Dict[str, Any]:
         """
         Executes the Terraform output command and returns the output.
 
+        All outputs of a module are cached in memory and returned without running Terraform until the module is
+        applied or destroyed.
+
         :param args: Additional positional arguments for the command.
+        :param refresh: Flag to bypass the cache, e.g. when the state was changed outside the CLI.
         :param kwargs: Additional named arguments for the command.
         :return: A dictionary containing the output values.
         """
+        cacheable = not args and not kwargs
+        if cacheable and not refresh:
+            cached = _output_cache.get(self.working_dir)
+            if cached is not None:
+                logger.info(f"Using cached Terraform outputs of {self.working_dir}")
+                return cached
+
         command = self.tf_command_manager.prepare_terraform_command(
             'output', None, '-json', *args, **kwargs
         )
         logger.info(f"Executing Terraform output with command: {command}")
-        return_code, stdout, stderr = self.run_terraform_command(command)
+        return_code, stdout, stderr = self.run_terraform_command(command, full_output=True)
         if return_code != 0:
             raise TerraformExecutionError(return_code, stdout, stderr)
 
@@ -103,6 +185,8 @@ class TfWrapper:
             return {}
 
         result = self._prepare_output(json_output)
+        if cacheable:
+            _output_cache.set(self.working_dir, result)
         return result
 
     @staticmethod
@@ -129,126 +213,258 @@ class TfWrapper:
         :return: True if the command was successful, otherwise raises an exception.
         """
         command = self.tf_command_manager.prepare_terraform_command(
-            'destroy', variables, '-auto-approve', *args, **kwargs, input=False
+            'destroy', variables, '-auto-approve', '-json', *args, **kwargs, input=False
         )
         logger.info(f"Executing Terraform destroy with command: {command}")
-        return_code, stdout, stderr = self.run_terraform_command(command, track_progress=True)
+        _output_cache.invalidate(self.working_dir)
+        return_code, stdout, stderr = self._run_with_events('destroy', command)
         if return_code != 0:
             raise TerraformExecutionError(return_code, stdout, stderr)
         return True
 
+    def _run_with_events(self, operation: str, command: list[str]) -> Tuple[int, str, str]:
+        """
+        Executes a Terraform command producing machine-readable (-json) UI output, tracking progress and
+        per-resource timings from its events.
+
+        :param operation: Terraform command name.
+        :param command: The Terraform command and arguments as a list.
+        :return: Tuple containing the return code of the command, stdout, and error diagnostics followed by stderr.
+        """
+        timings = TerraformResourceTimings()
+        events = TerraformEventStream(timings.on_event)
+        return_code, stdout, stderr = self.run_terraform_command(command, track_progress=self._show_progress,
+                                                                 events=events)
+        self.resource_timings = timings.table()
+        for entry in self.resource_timings[:5]:
+            logger.debug(f"Terraform resource {entry['address']} {entry['action']} took {entry['elapsed']}s")
+        if self._profiler is not None:
+            self._profiler.record(Path(self.working_dir).name, operation, self.resource_timings)
+        return return_code, stdout, ''.join(f"{e}\n" for e in events.errors) + stderr
+
     def run_terraform_command(
             self,
             command: list[str],
             track_progress: bool = False,
+            full_output: bool = False,
+            events: Optional["TerraformEventStream"] = None,
     ) -> Tuple[int, str, str]:
         """
-        Executes a Terraform command with the option to track its progress. It can use either
-        an internal or an external process.
+        Executes a Terraform command with the option to track its progress.
 
-        :param command: The Terraform command and arguments as a list.
+        Both stdout and stderr are drained concurrently, output lines are passed to the event stream and line
+        callback as they arrive, while only the last lines of each stream are kept in memory.
+
+        :param command: The Terraform command and arguments as a list, progress tracking requires -json UI output.
         :param track_progress: Flag to indicate whether to track progress.
+        :param full_output: Flag to keep the whole output in memory, e.g. for commands producing JSON.
+        :param events: Optional stream decoding machine-readable UI output.
         :return: Tuple containing the return code of the command, stdout, and stderr.
         """
-        process = self.tf_command_manager.execute_terraform_command(command)
-
         if track_progress:
-            self.tf_progress_manager.track_progress(process)
-            stdout = self.tf_progress_manager.get_stdout()
-        else:
-            stdout = list(self.tf_command_manager.generate_output(process))
+            events = events or TerraformEventStream()
+            events.add_listener(self.tf_progress_manager.on_event)
 
-        return_code, stderr = self.tf_command_manager.get_command_result(process)
-        self.tf_command_manager.generate_output()
-        return return_code, ''.join(stdout), stderr
+        callbacks = []
+        if events is not None:
+            callbacks.append(events.on_line)
+        if self._on_line is not None:
+            callbacks.append(self._on_line)
 
+        output = TerraformOutputBuffer(None if full_output else self._max_output_lines, self._spool_file)
+        try:
+            return_code = self.tf_command_manager.run_command(command, output, callbacks)
+        finally:
+            output.close()
+            if track_progress:
+                self.tf_progress_manager.close()
 
-class TerraformProgressBar:
-    TF_PROGRESS_BAR_TITTLE = "Terraform Progress"
+        return return_code, output.stdout, output.stderr
 
-    def __init__(self):
-        self.saved_output = []
 
-    @staticmethod
-    def parse_plan_output(line: str) -> Tuple[int, int, int]:
+class TerraformOutputBuffer:
+    """Bounded in-memory tail of command output with an optional on-disk spool of the full output."""
+
+    def __init__(self, max_lines: Optional[int] = 2000, spool_file: Optional[Union[str, Path]] = None):
+        self._lines = {"stdout": deque(maxlen=max_lines), "stderr": deque(maxlen=max_lines)}
+        self._spool = None
+        if spool_file is not None:
+            os.makedirs(os.path.dirname(spool_file), exist_ok=True)
+            self._spool = open(spool_file, "a")
+
+    def append(self, stream: str, line: str):
+        self._lines[stream].append(line)
+        if self._spool is not None:
+            self._spool.write(line if stream == "stdout" else f"[stderr] {line}")
+
+    @property
+    def stdout(self) -> str:
+        return ''.join(self._lines["stdout"])
+
+    @property
+    def stderr(self) -> str:
+        return ''.join(self._lines["stderr"])
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+class TerraformEventStream:
+    """Decodes Terraform machine-readable UI output and dispatches its events."""
+
+    def __init__(self, *listeners: EventCallback):
+        self._listeners = list(listeners)
+        self.errors: List[str] = []
+
+    def add_listener(self, listener: EventCallback):
+        self._listeners.append(listener)
+
+    def on_line(self, stream: str, line: str):
         """
-        Parses a single line of Terraform output to extract the plan summary.
+        Decodes a single stdout line, lines that are not JSON events are ignored.
 
+        :param stream: Output stream name.
         :param line: A single line of output from the Terraform process.
-        :return: A tuple containing the counts of add, change, and destroy operations if the plan summary is found.
         """
-        if "Plan:" in line:
-            logger.debug("Plan summary found in output")
+        if stream != "stdout":
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
 
-            try:
-                # Extract the counts of add, change, and destroy operations
-                parts = line.split(',')
-                add_count = int(parts[0].split()[1])
-                change_count = int(parts[1].split()[0])
-                destroy_count = int(parts[2].split()[0])
-                logger.debug(f"Plan counts - Add: {add_count}, Change: {change_count}, Destroy: {destroy_count}")
-            except (IndexError, ValueError) as e:
-                logger.error(f"Error parsing plan output: {e}")
-                return 0, 0, 0
+        if event.get("type") == "diagnostic" and event.get("@level") == "error":
+            detail = event.get("diagnostic", {}).get("detail")
+            self.errors.append(f"{event.get('@message')}: {detail}" if detail else event.get("@message"))
+        for listener in self._listeners:
+            listener(event)
 
-            return add_count, change_count, destroy_count
 
-        return 0, 0, 0
+class TerraformResourceTimings:
+    """Collects start and completion of every resource operation from Terraform UI events."""
 
-    def _monitor_progress(self, process: subprocess.Popen, total_operations: int):
-        """
-        Updates the progress bar based on the output of the Terraform process.
+    def __init__(self):
+        self._resources: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    @staticmethod
+    def _timestamp(event: dict) -> Optional[float]:
+        try:
+            timestamp = event["@timestamp"]
+            # fromisoformat does not accept the Z suffix Terraform emits before Python 3.11
+            if timestamp.endswith("Z"):
+                timestamp = timestamp[:-1] + "+00:00"
+            return datetime.fromisoformat(timestamp).timestamp()
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
 
-        :param process: The running Terraform process.
-        :param total_operations: Total number of operations to complete.
+    def on_event(self, event: dict):
+        event_type = event.get("type")
+        if event_type not in ("apply_start", "apply_complete", "apply_errored"):
+            return
+        hook = event.get("hook", {})
+        resource = hook.get("resource", {})
+        key = (resource.get("addr"), hook.get("action"))
+        entry = self._resources.setdefault(key, {
+            "address": resource.get("addr"),
+            "module": resource.get("module", ""),
+            "action": hook.get("action"),
+            "start": None,
+            "end": None,
+            "elapsed": None,
+            "status": "running",
+        })
+
+        if event_type == "apply_start":
+            entry["start"] = self._timestamp(event)
+        else:
+            entry["end"] = self._timestamp(event)
+            entry["elapsed"] = hook.get("elapsed_seconds")
+            entry["status"] = "complete" if event_type == "apply_complete" else "errored"
+            if entry["elapsed"] is None and entry["start"] is not None and entry["end"] is not None:
+                entry["elapsed"] = round(entry["end"] - entry["start"])
+
+    def table(self) -> List[Dict[str, Any]]:
+        """
+        :return: Resource operations, slowest first.
         """
-        completion_keywords = ["Creation complete", "Modifications complete", "Destruction complete"]
+        return sorted(self._resources.values(), key=lambda e: e["elapsed"] or 0, reverse=True)
 
-        with alive_bar(total=total_operations, title=self.TF_PROGRESS_BAR_TITTLE) as bar:
-            for line in iter(process.stdout.readline, ""):
-                self.saved_output.append(line)
-                logger.debug(f"Reading line: {line.strip()}")
 
-                if any(keyword in line for keyword in completion_keywords):
-                    bar()
+class TerraformProgressBar:
+    TF_PROGRESS_BAR_TITTLE = "Terraform Progress"
+    TRACKED_ACTIONS = ("create", "update", "delete")
 
-    def track_progress(self, process: subprocess.Popen):
-        """
-        Tracks the progress of a running Terraform process and saves its output.
+    def __init__(self):
+        self._bar_context = None
+        self._bar = None
 
-        :param process: The running Terraform process.
+    @staticmethod
+    def parse_change_summary(event: dict) -> Tuple[int, int, int]:
         """
-        total_operations = 0
+        Extracts the plan summary from a Terraform change_summary event.
 
-        # Parse the plan output to determine the total number of operations
-        for line in iter(process.stdout.readline, ''):
-            self.saved_output.append(line)
-            logger.debug(f"Reading line during progress tracking: {line.strip()}")
+        :param event: Terraform UI event.
+        :return: A tuple containing the counts of add, change, and destroy operations if the plan summary is found.
+        """
+        if event.get("type") != "change_summary":
+            return 0, 0, 0
+        changes = event.get("changes", {})
+        if changes.get("operation", "plan") != "plan":
+            return 0, 0, 0
 
-            add, change, destroy = self.parse_plan_output(line)
-            total_operations += add + change + destroy
+        logger.debug(f"Plan counts - Add: {changes.get('add')}, Change: {changes.get('change')}, "
+                     f"Destroy: {changes.get('remove')}")
+        return changes.get("add", 0), changes.get("change", 0), changes.get("remove", 0)
 
-            if total_operations > 0:
-                break
+    def on_event(self, event: dict):
+        """
+        Updates the progress bar based on a Terraform UI event.
 
-        if total_operations > 0:
-            self._monitor_progress(process, total_operations)
+        The progress bar is shown once the plan summary defines the total number of operations,
+        every completed resource create, update or delete advances it.
 
-    def get_stdout(self) -> List[str]:
+        :param event: Terraform UI event.
         """
-        Returns the saved stdout lines.
+        if self._bar is None:
+            total = sum(self.parse_change_summary(event))
+            if total > 0:
+                self._bar_context = alive_bar(total=total, title=self.TF_PROGRESS_BAR_TITTLE)
+                self._bar = self._bar_context.__enter__()
+        elif event.get("type") == "apply_complete" \
+                and event.get("hook", {}).get("action") in self.TRACKED_ACTIONS:
+            self._bar()
 
-        :return: List of saved stdout lines.
+    def close(self):
         """
-        return self.saved_output
+        Closes the progress bar.
+        """
+        if self._bar_context is not None:
+            self._bar_context.__exit__(None, None, None)
+        self._bar_context = None
+        self._bar = None
 
 
 class TerraformCommandManager:
-    def __init__(self, terraform_bin_path: str, working_dir: str):
+    def __init__(self, terraform_bin_path: str, working_dir: str, env: Optional[Dict[str, str]] = None):
         self.terraform_bin_path = terraform_bin_path
         self.working_dir = working_dir
+        self.env = {k: v for k, v in (env or {}).items() if v}
         self.process = None
 
+    def _process_env(self) -> Dict[str, str]:
+        """
+        Builds Terraform process environment, providers are shared between modules through the plugin cache.
+        """
+        env = {**os.environ, **self.env}
+        if "TF_PLUGIN_CACHE_DIR" not in env:
+            os.makedirs(LOCAL_TF_PLUGIN_CACHE_FOLDER, exist_ok=True)
+            env["TF_PLUGIN_CACHE_DIR"] = str(LOCAL_TF_PLUGIN_CACHE_FOLDER)
+        return env
+
     def execute_terraform_command(self, command: list[str]):
         """
         Runs a Terraform command and initializes a process for further reading its output.
@@ -262,57 +478,54 @@ class TerraformCommandManager:
             text=True,
             bufsize=1,
             universal_newlines=True,
-            cwd=self.working_dir
+            cwd=self.working_dir,
+            env=self._process_env()
         )
         return self.process
 
-    def generate_output(self, process: Optional[subprocess.Popen] = None) -> Generator[str, None, None]:
-        """
-        A generator for line-by-line reading of the stdout of a specified or currently running Terraform process.
-
-        This method can work with an external process passed as an argument or use the internal process
-        if no external process is provided.
-
-        :param process: Optional; An external subprocess.Popen object to read output from.
-                        If not provided, the internal process is used.
-        :yield: Each line of output from the Terraform process as a string.
-        """
-        # Choose the target process (external or internal)
-        target_process = process or self.process
-
-        # Iterate through each line of the process's stdout and yield it
-        if target_process is not None:
-            for line in iter(target_process.stdout.readline, ""):
-                yield line
-
-    def get_command_result(self, process: Optional[subprocess.Popen] = None) -> Optional[Tuple[int, str]]:
-        """
-        Retrieves the result of a Terraform command execution, including the return code and stderr.
-
-        This method can extract the result from an external process passed as an argument or use the internal process
-        if no external process is provided.
+    @staticmethod
+    def _drain(pipe, stream: str, lines: queue.Queue):
+        for line in iter(pipe.readline, ""):
+            lines.put((stream, line))
+        pipe.close()
+        lines.put((stream, None))
 
-        :param process: Optional; An external subprocess.Popen object to get results from.
-                        If not provided, the internal process is used.
-        :return: An optional tuple containing the return code and stderr output of the Terraform process.
+    def run_command(self, command: list[str], output: "TerraformOutputBuffer",
+                    callbacks: Optional[List[LineCallback]] = None) -> int:
         """
-        # Choose the target process (external or internal)
-        target_process = process or self.process
+        Runs a Terraform command, concurrently draining its stdout and stderr so that neither pipe could fill up
+        and block the process.
 
-        # If no valid process is provided or available, return None
-        if not target_process:
-            return None
-
-        # Communicate with the process to retrieve stderr and the return code
-        _, stderr = target_process.communicate()
-        return_code = target_process.returncode
-
-        # Reset an internal process if it was used
-        if target_process == self.process:
-            self.process = None
+        Lines are stored in the output buffer and passed to the callbacks in the calling thread,
+        in the order they are read.
 
-        # Return the command results
-        return return_code, stderr
+        :param command: A list of strings representing the Terraform command and its arguments.
+        :param output: Buffer collecting the command output.
+        :param callbacks: Optional line event callbacks.
+        :return: The return code of the command.
+        """
+        process = self.execute_terraform_command(command)
+        lines = queue.Queue()
+        readers = [threading.Thread(target=self._drain, args=(process.stdout, "stdout", lines), daemon=True),
+                   threading.Thread(target=self._drain, args=(process.stderr, "stderr", lines), daemon=True)]
+        for reader in readers:
+            reader.start()
+
+        open_streams = len(readers)
+        while open_streams:
+            stream, line = lines.get()
+            if line is None:
+                open_streams -= 1
+                continue
+            output.append(stream, line)
+            for callback in callbacks or []:
+                callback(stream, line)
+
+        for reader in readers:
+            reader.join()
+        return_code = process.wait()
+        self.process = None
+        return return_code
 
     @staticmethod
     def _create_var_files(variables: Dict[str, any]) -> str:
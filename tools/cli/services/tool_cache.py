@@ -0,0 +1,147 @@
+import json
+import os
+import platform
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+from common.logging_config import logger
+
+ENTRY_METADATA_FILE = "entry.json"
+
+
+class ToolCache:
+    """
+    Content-addressed cache of tool binaries shared by all installations.
+
+    Entries are stored as <root>/<tool>/<version>/<platform>/<sha256>/, where sha256 is the checksum of the
+    downloaded release artifact. Binaries are materialised into installations as hardlinks, falling back to
+    symlinks and copies when the cache is on another file system. Least recently used entries are evicted
+    once the cache grows over the size limit; hardlinked installations keep their binaries after eviction,
+    symlinked ones lose them and the tool is installed again on the next setup.
+    """
+
+    def __init__(self, root: Union[str, Path], max_size: int = 1024 ** 3):
+        """
+        :param root: Cache folder.
+        :param max_size: Max total size of cached binaries in bytes.
+        """
+        self._root = Path(root)
+        self._max_size = max_size
+
+    @staticmethod
+    def platform() -> str:
+        return f"{platform.system()}_{platform.machine()}".lower()
+
+    def _entries(self):
+        for metadata_path in self._root.glob(f"*/*/*/*/{ENTRY_METADATA_FILE}"):
+            if metadata_path.parent.name.startswith("."):
+                continue
+            try:
+                with open(metadata_path, "r") as file:
+                    metadata = json.load(file)
+            except (OSError, ValueError):
+                continue
+            yield metadata_path.parent, metadata
+
+    def get(self, tool: str, version: str, sha256: Optional[str] = None) -> Optional[Path]:
+        """
+        Looks up a cached binary.
+
+        :param tool: Tool name.
+        :param version: Tool version.
+        :param sha256: Release artifact checksum, any entry of the version and platform matches if None.
+        :return: Path to the cached binary, or None.
+        """
+        folder = self._root / tool / version / self.platform()
+        candidates = [folder / sha256] if sha256 else \
+            sorted((e for e in folder.glob("*") if not e.name.startswith(".")), key=os.path.getmtime, reverse=True)
+        for entry in candidates:
+            try:
+                with open(entry / ENTRY_METADATA_FILE, "r") as file:
+                    metadata = json.load(file)
+                binary = entry / metadata["binary"]
+                if os.path.getsize(binary) != metadata["size"]:
+                    logger.warning(f"Cached {tool} {version} at {entry} is corrupted, ignoring it")
+                    continue
+            except (OSError, ValueError, KeyError):
+                continue
+            # entry folder mtime tracks the last use for eviction
+            os.utime(entry)
+            return binary
+        return None
+
+    def put(self, tool: str, version: str, sha256: str, binary: Union[str, Path]) -> Path:
+        """
+        Moves a binary into the cache.
+
+        :param tool: Tool name.
+        :param version: Tool version.
+        :param sha256: Release artifact checksum.
+        :param binary: Binary to move into the cache.
+        :return: Path to the cached binary.
+        """
+        entry = self._root / tool / version / self.platform() / sha256
+        binary_name = os.path.basename(binary)
+        if not entry.exists():
+            # entry is assembled aside and renamed, so concurrent installations never see a partial one
+            staging = entry.with_name(f".{sha256}.{uuid.uuid4().hex}")
+            os.makedirs(staging)
+            shutil.move(binary, staging / binary_name)
+            with open(staging / ENTRY_METADATA_FILE, "w") as file:
+                json.dump({"tool": tool, "version": version, "sha256": sha256, "binary": binary_name,
+                           "size": os.path.getsize(staging / binary_name), "created": time.time()}, file)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # another installation has cached the same artifact meanwhile
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict(keep=entry)
+        return entry / binary_name
+
+    @staticmethod
+    def materialise(binary: Union[str, Path], target: Union[str, Path]):
+        """
+        Links a cached binary into an installation.
+
+        :param binary: Cached binary.
+        :param target: Installation path.
+        """
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(target):
+            os.remove(target)
+        try:
+            os.link(binary, target)
+            return
+        except OSError:
+            pass
+        try:
+            os.symlink(binary, target)
+        except OSError:
+            shutil.copy2(binary, target)
+
+    def evict(self, keep: Optional[Path] = None):
+        """
+        Removes least recently used entries until the cache fits the size limit.
+
+        :param keep: Entry that is never evicted.
+        """
+        entries = []
+        for entry, metadata in self._entries():
+            try:
+                entries.append((os.path.getmtime(entry), metadata.get("size", 0), entry))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self._max_size:
+                break
+            if keep is not None and entry == keep:
+                continue
+            logger.info(f"Evicting {entry} from tool cache")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from common.logging_config import logger
+
+
+def _terraform_version(output: dict) -> str:
+    return output["terraform_version"]
+
+
+def _kubectl_version(output: dict) -> str:
+    return output["clientVersion"]["gitVersion"].lstrip("v")
+
+
+# tool name to version command arguments and parser of its JSON output
+VERSION_COMMANDS: Dict[str, tuple[List[str], Callable[[dict], str]]] = {
+    "terraform": (["version", "-json"], _terraform_version),
+    "kubectl": (["version", "--client", "-o", "json"], _kubectl_version),
+}
+
+
+class ToolVersionProbe:
+    """
+    Reads tool binary versions, caching them by binary path, modification time and size.
+
+    The version command is run only for binaries that have not been probed yet or changed since.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        :param path: Cache file.
+        """
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self._path, "r") as file:
+                    self._entries = json.load(file)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read tool version cache {self._path}, ignoring it: {e}")
+        return self._entries
+
+    def _save(self):
+        os.makedirs(self._path.parent, exist_ok=True)
+        tmp_path = self._path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(self._entries, file)
+        os.replace(tmp_path, self._path)
+
+    def version(self, tool: str, binary: Union[str, Path]) -> Optional[str]:
+        """
+        :param tool: Tool name, see VERSION_COMMANDS.
+        :param binary: Tool binary path.
+        :return: Tool version, or None if the binary is missing or could not report its version.
+        """
+        try:
+            st = os.stat(binary)
+        except OSError:
+            return None
+
+        key = str(binary)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                return entry["version"]
+
+        args, parse = VERSION_COMMANDS[tool]
+        try:
+            result = subprocess.run([str(binary), *args], capture_output=True, text=True, timeout=30)
+            result.check_returncode()
+            version = parse(json.loads(result.stdout))
+        except (OSError, subprocess.SubprocessError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read {tool} version of {binary}: {e}")
+            return None
+
+        with self._lock:
+            self._load()[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "version": version}
+            self._save()
+        return version
@@ -12,6 +12,7 @@ from common.const.const import WL_REPOSITORY_BRANCH, WL_REPOSITORY_URL
 from common.custom_excpetions import RepositoryNotInitializedError
 from common.logging_config import logger
 from common.tracing_decorator import trace
+from services.template_parametriser import TemplateParametriser
 from services.vcs.git_provider_manager import GitProviderManager
 
 
@@ -191,49 +192,7 @@ class WorkloadManager:
             params (Dict[str, str]): Key-value pairs for placeholder replacement.
         """
         logger.debug(f"Scanning folder '{folder}' for files to parameterize.")
-        for root, dirs, files in os.walk(folder):
-            for name in files:
-                if self._is_parametrizable_file(name):
-                    file_path = Path(root) / name
-                    # Process individual file
-                    self._replace_placeholder_in_file(file_path, params)
-
-    @staticmethod
-    def _is_parametrizable_file(file_name: str) -> bool:
-        """
-        Check if a file is eligible for parameterization based on its extension.
-
-        Args:
-            file_name (str): Name of the file to check.
-
-        Returns:
-            bool: True if the file is eligible for parameterization, False otherwise.
-        """
-        is_parametrizable = file_name.endswith((".tf", ".yaml", ".yml", ".md"))
-        if is_parametrizable:
-            logger.debug(f"File '{file_name}' is eligible for parameterization.")
-        return is_parametrizable
-
-    @staticmethod
-    def _replace_placeholder_in_file(file_path: Path, params: Dict[str, str]) -> None:
-        """
-        Process a single file, replacing placeholders with actual values.
-
-        Args:
-            file_path (Path): Path of the file to process.
-            params (Dict[str, str]): Key-value pairs for placeholder replacement.
-        """
-        with open(file_path, "r") as file:
-            data = file.read()
-
-        # Replace each placeholder in the file
-        for placeholder, value in params.items():
-            data = data.replace(placeholder, value)
-
-        with open(file_path, "w") as file:
-            file.write(data)
-
-        logger.debug(f"File '{file_path}' parameterized successfully.")
+        TemplateParametriser(params).render_folder(folder)
 
     def _remove_git_directory(self) -> None:
         """Removes the .git directory from the template repository folder if it exists."""
@@ -0,0 +1,25 @@
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# local folder paths are resolved on import, keep tests away from the real ~/.cgdevx and tool cache
+_local_folder = tempfile.mkdtemp(prefix="cgdevx-tests-")
+os.environ["CGDEVX_LOCAL_FOLDER"] = os.path.join(_local_folder, ".cgdevx")
+os.environ["CGDEVX_TOOL_CACHE_DIR"] = os.path.join(_local_folder, "tool_cache")
+
+
+@pytest.fixture
+def python_310_fromisoformat(monkeypatch):
+    """Makes Terraform wrapper parse timestamps with the fromisoformat of Python 3.10, which rejects the Z suffix."""
+    from services import tf_wrapper
+
+    class Py310Datetime(datetime):
+        @classmethod
+        def fromisoformat(cls, date_string):
+            if date_string.endswith("Z"):
+                raise ValueError(f"Invalid isoformat string: {date_string!r}")
+            return super().fromisoformat(date_string)
+
+    monkeypatch.setattr(tf_wrapper, "datetime", Py310Datetime)
@@ -0,0 +1,93 @@
+from services.k8s.delivery_service_manager import ApplicationDeletionTracker
+
+NAMESPACE = "argocd"
+
+
+def app(name, *resources):
+    return {"metadata": {"name": name}, "status": {"resources": list(resources)}}
+
+
+def child_app(name):
+    return {"group": "argoproj.io", "version": "v1alpha1", "kind": "Application", "namespace": NAMESPACE,
+            "name": name}
+
+
+def core(kind, namespace, name):
+    return {"version": "v1", "kind": kind, "namespace": namespace, "name": name}
+
+
+class FakeKubeClient:
+    def __init__(self, apps, load_balancers):
+        self.apps = {a["metadata"]["name"]: a for a in apps}
+        self.load_balancers = load_balancers
+        self.reads = []
+
+    def find_custom_object(self, namespace, name, group, version, plurals):
+        self.reads.append(name)
+        return self.apps.get(name)
+
+    def list_load_balancer_services(self):
+        return self.load_balancers
+
+    def wait_for_deletion(self, refs, timeout, on_deleted):
+        return [f'{r["kind"]} {r["namespace"]}/{r["name"]}' for r in refs]
+
+
+def tracked(tracker):
+    return {(r["kind"], r["name"]) for r in tracker.refs}
+
+
+def test_resources_of_nested_applications_are_tracked():
+    client = FakeKubeClient([
+        app("registry", child_app("harbor"), child_app("sonarqube")),
+        app("harbor", child_app("harbor-components"), core("ConfigMap", "harbor", "config")),
+        app("harbor-components",
+            core("Service", "harbor", "harbor"),
+            core("Service", "harbor", "harbor-core"),
+            core("PersistentVolumeClaim", "harbor", "data-harbor-redis-0"),
+            {"group": "apps", "version": "v1", "kind": "StatefulSet", "namespace": "harbor", "name": "redis"}),
+        app("sonarqube", core("PersistentVolumeClaim", "sonarqube", "sonarqube")),
+    ], load_balancers={"harbor/harbor"})
+
+    tracker = ApplicationDeletionTracker(client, ["registry"], NAMESPACE)
+
+    assert tracked(tracker) == {
+        ("Application", "registry"),
+        ("Application", "harbor"),
+        ("Application", "harbor-components"),
+        ("Application", "sonarqube"),
+        ("Service", "harbor"),
+        ("PersistentVolumeClaim", "data-harbor-redis-0"),
+        ("PersistentVolumeClaim", "sonarqube"),
+    }
+    assert tracker.total == 7
+
+
+def test_missing_and_shared_applications_are_read_once():
+    client = FakeKubeClient([
+        app("a", child_app("shared"), child_app("missing")),
+        app("b", child_app("shared")),
+        app("shared", child_app("a")),
+    ], load_balancers=set())
+
+    tracker = ApplicationDeletionTracker(client, ["a", "b"], NAMESPACE)
+
+    assert sorted(client.reads) == ["a", "b", "missing", "shared"]
+    assert tracked(tracker) == {("Application", "a"), ("Application", "b"), ("Application", "shared")}
+
+
+def test_applications_of_other_namespaces_are_not_followed():
+    client = FakeKubeClient([
+        app("root", {**child_app("remote"), "namespace": "other"}),
+        app("remote", core("PersistentVolumeClaim", "remote", "data")),
+    ], load_balancers=set())
+
+    tracker = ApplicationDeletionTracker(client, ["root"], NAMESPACE)
+
+    assert tracked(tracker) == {("Application", "root")}
+
+
+def test_wait_without_applications():
+    tracker = ApplicationDeletionTracker(FakeKubeClient([], set()), ["registry"], NAMESPACE)
+
+    assert tracker.wait() == []
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.dependency_manager import DependencyManager
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+CHECKSUM = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class ReleaseServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ReleaseHandler)
+        self.support_range = True
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/terraform.zip"
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        self.server.requests.append(range_header)
+        match = re.fullmatch(r"bytes=(\d+)-", range_header or "")
+        if match is None or not self.server.support_range:
+            self._send(200, PAYLOAD)
+            return
+
+        start = int(match.group(1))
+        if start >= len(PAYLOAD):
+            self._send(416, b"", {"Content-Range": f"bytes */{len(PAYLOAD)}"})
+            return
+        self._send(206, PAYLOAD[start:], {"Content-Range": f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}"})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ReleaseServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def target(tmp_path):
+    return str(tmp_path / "terraform.zip")
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def write_part(target, data: bytes):
+    with open(f"{target}.part", "wb") as file:
+        file.write(data)
+
+
+def test_fresh_download(server, target):
+    assert DependencyManager._download_file(server.url, target, CHECKSUM) == target
+
+    assert read(target) == PAYLOAD
+    assert not os.path.exists(f"{target}.part")
+    assert server.requests == [None]
+
+
+def test_resume_partial_download(server, target):
+    write_part(target, PAYLOAD[:1024 * 1024 + 7])
+
+    DependencyManager._download_file(server.url, target, CHECKSUM)
+
+    assert read(target) == PAYLOAD
+    assert server.requests == [f"bytes={1024 * 1024 + 7}-"]
+
+
+def test_server_ignoring_range_restarts_download(server, target):
+    server.support_range = False
+    write_part(target, b"stale partial content")
+
+    DependencyManager._download_file(server.url, target, CHECKSUM)
+
+    assert read(target) == PAYLOAD
+    assert server.requests == ["bytes=21-"]
+
+
+def test_complete_partial_download(server, target):
+    write_part(target, PAYLOAD)
+
+    DependencyManager._download_file(server.url, target, CHECKSUM)
+
+    assert read(target) == PAYLOAD
+    assert server.requests == [f"bytes={len(PAYLOAD)}-"]
+
+
+def test_bad_checksum_removes_partial_download(server, target):
+    write_part(target, b"corrupted" + PAYLOAD[9:1024])
+
+    with pytest.raises(Exception, match="Bad checksum"):
+        DependencyManager._download_file(server.url, target, CHECKSUM)
+
+    assert not os.path.exists(f"{target}.part")
+    assert not os.path.exists(target)
+
+    # the next attempt starts from scratch
+    DependencyManager._download_file(server.url, target, CHECKSUM)
+    assert read(target) == PAYLOAD
+    assert server.requests[-1] is None
+
+
+def test_download_without_checksum(server, target):
+    DependencyManager._download_file(server.url, target)
+
+    assert read(target) == PAYLOAD
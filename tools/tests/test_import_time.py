@@ -0,0 +1,49 @@
+"""
+CLI startup import-time checks.
+
+Commands that do not need provider SDKs are run with `python -X importtime` in a subprocess, so modules imported by
+other tests do not affect the result.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+CLI_DIR = Path(__file__).parent.parent / "cli"
+
+# total import time budget per command
+BUDGET_MS = 500
+
+# top-level packages that are allowed only when a command actually uses them
+HEAVY_MODULES = ("boto3", "botocore", "azure", "google", "googleapiclient", "kubernetes", "kr8s", "git", "hvac",
+                 "cryptography", "alive_progress", "httpx")
+
+
+def measure(args: list[str]) -> tuple[int, set[str]]:
+    """
+    :return: Total import time in microseconds and top-level names of heavy modules imported
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "__main__.py", *args],
+                          cwd=CLI_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, f"CLI call {args} failed: {proc.stderr}"
+
+    total = 0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        top_level = name.strip().split(".")[0]
+        if top_level in HEAVY_MODULES:
+            heavy.add(top_level)
+    return total, heavy
+
+
+@pytest.mark.parametrize("args", [["--help"], ["workload", "--help"]], ids=" ".join)
+def test_help_does_not_import_provider_sdks(args):
+    total, heavy = measure(args)
+
+    assert heavy == set()
+    assert total / 1000 <= BUDGET_MS
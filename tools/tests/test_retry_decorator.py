@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from common import retry_decorator
+from common.retry_decorator import RetryPolicy, exponential_backoff, is_transient, is_transient_or_missing
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"status {status}")
+        self.status = status
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry_decorator.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(retry_decorator.time, "sleep", clock.sleep)
+    # worst case delays make the deadline arithmetic deterministic
+    monkeypatch.setattr(retry_decorator.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def failing(errors, result="done"):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+def test_classifiers():
+    assert is_transient(StatusError(503))
+    assert not is_transient(StatusError(404))
+    assert is_transient(ConnectionError())
+    assert not is_transient(KeyError())
+    assert is_transient_or_missing(StatusError(404))
+
+
+def test_transient_failures_are_retried(clock):
+    func, calls = failing([StatusError(503), ConnectionError()])
+
+    assert exponential_backoff()(func)() == "done"
+    assert len(calls) == 3
+    assert clock.sleeps == [1, 2]
+
+
+def test_permanent_failure_is_raised_immediately(clock):
+    func, calls = failing([StatusError(404)])
+
+    with pytest.raises(StatusError):
+        exponential_backoff()(func)()
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_max_retries(clock):
+    func, calls = failing([ConnectionError()] * 10)
+
+    with pytest.raises(ConnectionError):
+        exponential_backoff(max_retries=3)(func)()
+    assert len(calls) == 4
+
+
+def test_deadline_bounds_unlimited_retries(clock):
+    func, calls = failing([ConnectionError()] * 1000)
+
+    with pytest.raises(ConnectionError):
+        exponential_backoff(max_retries=None, deadline=930)(func)()
+    assert clock.now <= 930
+    # delays are capped by max_delay, so the budget is spent on polling
+    assert clock.now > 930 - 30
+    assert max(clock.sleeps) == 30
+
+
+def test_unbounded_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_retries=None)
+
+
+def test_async_function(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(retry_decorator.asyncio, "sleep", fake_sleep)
+    calls = []
+
+    @exponential_backoff(base_delay=0.5)
+    async def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(429)
+        return "done"
+
+    assert asyncio.run(func()) == "done"
+    assert len(calls) == 3
+    assert len(sleeps) == 2
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+import yaml
+
+from common import state_store
+from common.const.const import STATE_CHECKPOINTS, STATE_INPUT_PARAMS, STATE_PARAMS
+from common.state_store import StateStore
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    paths = {
+        "snapshot": tmp_path / "state.yaml",
+        "journal": tmp_path / "state.journal",
+        "cache": tmp_path / "state.cache",
+    }
+    monkeypatch.setattr(state_store, "LOCAL_STATE_FILE", paths["snapshot"])
+    monkeypatch.setattr(state_store, "LOCAL_STATE_JOURNAL_FILE", paths["journal"])
+    monkeypatch.setattr(state_store, "LOCAL_STATE_CACHE_FILE", paths["cache"])
+    return paths
+
+
+def journal_records(path) -> list:
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_first_save_writes_snapshot(paths):
+    state = StateStore({"input": "value"})
+    state.parameters["<A>"] = "a"
+    state.save_checkpoint()
+
+    assert not paths["journal"].exists()
+    with open(paths["snapshot"], "r") as file:
+        snapshot = yaml.safe_load(file)
+    assert snapshot[STATE_PARAMS] == {"<A>": "a"}
+    assert snapshot[STATE_INPUT_PARAMS] == {"input": "value"}
+
+
+def test_changes_are_journaled_and_replayed(paths):
+    state = StateStore()
+    state.parameters["<A>"] = "a"
+    state.parameters["<B>"] = "b"
+    state.save_checkpoint()
+
+    state.parameters["<A>"] = "changed"
+    del state.parameters["<B>"]
+    state.internals["TOKEN"] = "secret"
+    state.set_checkpoint("preflight")
+    state.save_checkpoint()
+    state.set_checkpoint("dependencies")
+    state.save_checkpoint()
+
+    records = journal_records(paths["journal"])
+    assert len(records) == 5
+    assert {"section": STATE_CHECKPOINTS, "op": "append", "value": "dependencies"} in records
+
+    restored = StateStore()
+    assert restored.parameters == {"<A>": "changed"}
+    assert restored.internals == {"TOKEN": "secret"}
+    assert restored.has_checkpoint("preflight") and restored.has_checkpoint("dependencies")
+
+
+def test_unchanged_state_is_not_journaled(paths):
+    state = StateStore()
+    state.save_checkpoint()
+    state.save_checkpoint()
+
+    assert not paths["journal"].exists()
+
+
+def test_journal_is_compacted(paths):
+    state = StateStore()
+    state.save_checkpoint()
+
+    for i in range(StateStore.JOURNAL_COMPACTION_RECORDS - 1):
+        state.parameters[f"<P{i}>"] = i
+        state.save_checkpoint()
+    assert len(journal_records(paths["journal"])) == StateStore.JOURNAL_COMPACTION_RECORDS - 1
+
+    state.parameters["<LAST>"] = "last"
+    state.save_checkpoint()
+
+    assert not paths["journal"].exists()
+    with open(paths["snapshot"], "r") as file:
+        snapshot = yaml.safe_load(file)
+    assert len(snapshot[STATE_PARAMS]) == StateStore.JOURNAL_COMPACTION_RECORDS
+    assert StateStore().parameters["<LAST>"] == "last"
+
+
+def test_torn_record_is_dropped(paths):
+    state = StateStore()
+    state.save_checkpoint()
+    state.parameters["<A>"] = "a"
+    state.save_checkpoint()
+    with open(paths["journal"], "a") as journal:
+        journal.write('{"section": "params", "op": "set", "key": "<B>", "va')
+
+    restored = StateStore()
+    assert restored.parameters == {"<A>": "a"}
+    assert len(journal_records(paths["journal"])) == 1
+
+    # records appended after recovery are replayed
+    restored.parameters["<C>"] = "c"
+    restored.save_checkpoint()
+    assert StateStore().parameters == {"<A>": "a", "<C>": "c"}
+
+
+def test_journal_without_snapshot_is_discarded(paths):
+    state = StateStore()
+    state.save_checkpoint()
+    state.set_checkpoint("preflight")
+    state.save_checkpoint()
+    paths["snapshot"].unlink()
+    paths["cache"].unlink(missing_ok=True)
+
+    restored = StateStore()
+
+    assert not restored.has_checkpoint("preflight")
+    assert not paths["journal"].exists()
+
+
+def test_snapshot_cache_is_validated(paths):
+    state = StateStore()
+    state.parameters["<A>"] = "a"
+    state.save_checkpoint()
+    assert paths["cache"].exists()
+
+    # snapshot edited by hand invalidates the cache
+    with open(paths["snapshot"], "r") as file:
+        snapshot = yaml.safe_load(file)
+    snapshot[STATE_PARAMS]["<A>"] = "edited by hand"
+    with open(paths["snapshot"], "w") as file:
+        yaml.safe_dump(snapshot, file)
+
+    assert StateStore().parameters["<A>"] == "edited by hand"
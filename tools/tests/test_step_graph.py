@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from common.step_graph import Step, StepGraph, current_step
+
+
+class FakeState:
+    def __init__(self, checkpoints=()):
+        self.checkpoints = list(checkpoints)
+        self.saves = 0
+
+    def has_checkpoint(self, name):
+        return name in self.checkpoints
+
+    def set_checkpoint(self, name):
+        self.checkpoints.append(name)
+
+    def save_checkpoint(self):
+        self.saves += 1
+
+
+def recording_graph(state, steps, max_workers=4):
+    graph = StepGraph(state, max_workers=max_workers)
+    calls = []
+    lock = threading.Lock()
+
+    def make(name, fail):
+        def func():
+            with lock:
+                calls.append(name)
+            if fail:
+                raise RuntimeError(f"{name} failed")
+        return func
+
+    for name, inputs, outputs, kwargs in steps:
+        fail = kwargs.pop("fail", False)
+        graph.add(Step(name, make(name, fail), inputs, outputs, **kwargs))
+    return graph, calls
+
+
+LINEAR = [
+    ("a", [], ["a"], {"checkpoint": "a"}),
+    ("b", ["a"], ["b"], {}),
+    ("c", ["b"], ["c"], {"checkpoint": "c"}),
+]
+
+
+def test_steps_run_in_dependency_order():
+    graph, calls = recording_graph(FakeState(), [
+        ("c", ["b"], [], {}),
+        ("b", ["a"], ["b"], {}),
+        ("a", [], ["a"], {}),
+    ])
+    graph.run()
+    assert calls == ["a", "b", "c"]
+
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    graph = StepGraph(FakeState(), max_workers=2)
+    graph.add(Step("a", barrier.wait, outputs=["a"]))
+    graph.add(Step("b", barrier.wait, outputs=["b"]))
+    # would time out if a and b were run one after another
+    graph.run()
+
+
+def test_checkpoints_are_saved_after_step():
+    state = FakeState()
+    graph, _ = recording_graph(state, LINEAR)
+    graph.run()
+    assert state.checkpoints == ["a", "c"]
+    assert state.saves == 2
+
+
+def test_cycle_is_detected():
+    graph, calls = recording_graph(FakeState(), [
+        ("a", ["c"], ["a"], {}),
+        ("b", ["a"], ["b"], {}),
+        ("c", ["b"], ["c"], {}),
+    ])
+    with pytest.raises(ValueError, match="Cyclic dependency"):
+        graph.run()
+    assert calls == []
+
+
+def test_missing_producer_is_detected():
+    graph, _ = recording_graph(FakeState(), [("a", ["missing"], [], {})])
+    with pytest.raises(ValueError, match="not produced by any step"):
+        graph.run()
+
+
+def test_duplicate_producer_is_rejected():
+    graph = StepGraph(FakeState())
+    graph.add(Step("a", lambda: None, outputs=["x"]))
+    with pytest.raises(ValueError, match="produced by both"):
+        graph.add(Step("b", lambda: None, outputs=["x"]))
+
+
+def test_checkpointed_steps_are_skipped():
+    skipped = []
+    graph, calls = recording_graph(FakeState(["a"]), LINEAR)
+    graph.run(on_skip=skipped.append)
+    assert skipped == ["a"]
+    assert calls == ["b", "c"]
+
+
+def test_step_without_checkpoint_is_skipped_when_dependants_are_done():
+    graph, calls = recording_graph(FakeState(["a", "c"]), LINEAR)
+    graph.run()
+    assert calls == []
+
+
+def test_always_step_runs_on_resume():
+    steps = [
+        ("a", [], ["a"], {"checkpoint": "a"}),
+        ("b", ["a"], ["b"], {"always": True}),
+        ("c", ["b"], ["c"], {"checkpoint": "c"}),
+    ]
+    graph, calls = recording_graph(FakeState(["a", "c"]), steps)
+    graph.run()
+    assert calls == ["b"]
+
+
+def test_step_before_always_step_is_skipped_when_dependants_are_done():
+    steps = [
+        ("a", [], ["a"], {"checkpoint": "a"}),
+        ("b", ["a"], ["b"], {}),
+        ("c", ["b"], ["c"], {"always": True}),
+        ("d", ["c"], ["d"], {"checkpoint": "d"}),
+    ]
+    skipped = []
+    graph, calls = recording_graph(FakeState(["a", "d"]), steps)
+    graph.run(on_skip=skipped.append)
+    assert calls == ["c"]
+    assert skipped == ["a", "b", "d"]
+
+
+def test_always_step_without_completed_dependants_does_not_complete_its_dependencies():
+    steps = [
+        ("a", [], ["a"], {}),
+        ("b", ["a"], ["b"], {"always": True}),
+        ("c", ["b"], ["c"], {"checkpoint": "c"}),
+    ]
+    graph, calls = recording_graph(FakeState(), steps)
+    graph.run()
+    assert calls == ["a", "b", "c"]
+
+
+def test_current_step_is_set_while_running():
+    names = []
+    graph = StepGraph(FakeState(), max_workers=2)
+    graph.add(Step("a", lambda: names.append(current_step()), outputs=["a"]))
+    graph.add(Step("b", lambda: names.append(current_step()), inputs=["a"]))
+    graph.run()
+    assert names == ["a", "b"]
+    assert current_step() is None
+
+
+def test_failure_stops_scheduling_and_is_raised():
+    state = FakeState()
+    graph, calls = recording_graph(state, [
+        ("a", [], ["a"], {"checkpoint": "a"}),
+        ("b", ["a"], ["b"], {"checkpoint": "b", "fail": True}),
+        ("c", ["b"], [], {"checkpoint": "c"}),
+    ])
+    with pytest.raises(RuntimeError, match="b failed"):
+        graph.run()
+    assert calls == ["a", "b"]
+    assert state.checkpoints == ["a"]
+
+
+def test_running_steps_finish_after_failure():
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.3)
+
+    def failing():
+        started.wait(5)
+        raise RuntimeError("failed")
+
+    state = FakeState()
+    graph = StepGraph(state, max_workers=2)
+    graph.add(Step("slow", slow, outputs=["slow"], checkpoint="slow"))
+    graph.add(Step("failing", failing, outputs=["failing"]))
+    graph.add(Step("after", lambda: None, inputs=["slow"], checkpoint="after"))
+    with pytest.raises(RuntimeError):
+        graph.run()
+    assert state.checkpoints == ["slow"]
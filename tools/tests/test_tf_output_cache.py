@@ -0,0 +1,27 @@
+import json
+
+from services.tf_output_cache import TerraformOutputCache
+
+
+def write_state(module_dir, serial):
+    with open(module_dir / "terraform.tfstate", "w") as file:
+        json.dump({"lineage": "lineage", "serial": serial}, file)
+
+
+def test_outputs_are_cached_until_invalidated(tmp_path):
+    cache = TerraformOutputCache()
+    cache.set(tmp_path, {"cluster_name": "cc"})
+
+    assert cache.get(tmp_path) == {"cluster_name": "cc"}
+    cache.invalidate(tmp_path)
+    assert cache.get(tmp_path) is None
+
+
+def test_local_state_change_makes_outputs_stale(tmp_path):
+    write_state(tmp_path, 1)
+    cache = TerraformOutputCache()
+    cache.set(tmp_path, {"cluster_name": "cc"})
+    assert cache.get(tmp_path) == {"cluster_name": "cc"}
+
+    write_state(tmp_path, 2)
+    assert cache.get(tmp_path) is None
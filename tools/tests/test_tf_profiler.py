@@ -0,0 +1,84 @@
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from services.tf_profiler import TerraformProfiler
+from services.tf_wrapper import TerraformEventStream, TerraformResourceTimings
+
+APPLY_EVENTS = Path(__file__).parent / "data" / "terraform_apply.jsonl"
+
+
+def recorded_timings() -> list:
+    timings = TerraformResourceTimings()
+    stream = TerraformEventStream(timings.on_event)
+    with open(APPLY_EVENTS, "r") as file:
+        for line in file:
+            stream.on_line("stdout", line)
+    return timings.table()
+
+
+def op(address, start, end, elapsed=None):
+    return {"address": address, "module": "", "action": "create", "start": start, "end": end,
+            "elapsed": elapsed if elapsed is not None else end - start, "status": "complete"}
+
+
+def test_critical_path_chains_sequential_operations():
+    timings = [
+        op("a", 0, 10),
+        op("b", 0, 3),
+        op("c", 10, 12),
+        op("d", 3, 20),
+        op("e", 12, 15),
+    ]
+    path = TerraformProfiler.critical_path(timings)
+    assert [t["address"] for t in path] == ["b", "d"]
+
+
+def test_critical_path_ignores_unfinished_operations():
+    timings = [op("a", 0, 5), {**op("b", 5, 6), "end": None}]
+    assert [t["address"] for t in TerraformProfiler.critical_path(timings)] == ["a"]
+    assert TerraformProfiler.critical_path([]) == []
+
+
+@pytest.mark.parametrize("python_310", [False, True])
+def test_report_of_recorded_apply(tmp_path, request, python_310):
+    if python_310:
+        request.getfixturevalue("python_310_fromisoformat")
+    report_path = tmp_path / "tf_profile.json"
+
+    TerraformProfiler(report_path, top=2).record("hosting_provider", "apply", recorded_timings())
+
+    with open(report_path, "r") as file:
+        report = json.load(file)
+    module = report["modules"]["hosting_provider"]
+    assert module["operation"] == "apply"
+    assert module["resources"] == 5
+    assert module["resource_time"] == 12 + 1 + 3 + 555
+    assert module["wall_time"] == pytest.approx(571.1)
+    assert [t["address"] for t in module["critical_path"]] == \
+           ["aws_vpc.main", "aws_security_group.cluster", "aws_eks_cluster.this"]
+    assert module["critical_path_time"] == pytest.approx(571.1)
+    assert [t["address"] for t in report["slowest"]] == ["aws_eks_cluster.this", "aws_vpc.main"]
+    assert report["slowest"][0]["module"] == "hosting_provider"
+
+
+def test_report_keeps_other_modules(tmp_path):
+    report_path = tmp_path / "tf_profile.json"
+    TerraformProfiler(report_path).record("vcs", "apply", [op("github_repository.gitops", 0, 4)])
+
+    TerraformProfiler(report_path).record("hosting_provider", "apply", recorded_timings())
+
+    with open(report_path, "r") as file:
+        report = json.load(file)
+    assert set(report["modules"]) == {"vcs", "hosting_provider"}
+
+
+def test_report_without_timestamps_is_flagged(tmp_path, caplog):
+    timings = [{**op("a", 0, 5), "start": None, "end": None}]
+
+    with caplog.at_level(logging.WARNING):
+        TerraformProfiler(tmp_path / "tf_profile.json").record("vcs", "apply", timings)
+
+    assert "no usable timestamps" in caplog.text
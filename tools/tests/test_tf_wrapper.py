@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from services.tf_wrapper import TerraformEventStream, TerraformResourceTimings
+
+APPLY_EVENTS = Path(__file__).parent / "data" / "terraform_apply.jsonl"
+
+
+def replay(path: Path) -> TerraformResourceTimings:
+    timings = TerraformResourceTimings()
+    stream = TerraformEventStream(timings.on_event)
+    with open(path, "r") as file:
+        for line in file:
+            stream.on_line("stdout", line)
+    return timings
+
+
+def by_address(timings: TerraformResourceTimings) -> dict:
+    return {t["address"]: t for t in timings.table()}
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2024-03-12T10:15:12.345678Z",
+    "2024-03-12T10:15:12.345678+00:00",
+    "2024-03-12T12:15:12.345678+02:00",
+])
+def test_timestamp_formats(timestamp):
+    expected = datetime(2024, 3, 12, 10, 15, 12, 345678, tzinfo=timezone.utc).timestamp()
+    assert TerraformResourceTimings._timestamp({"@timestamp": timestamp}) == expected
+
+
+def test_timestamp_missing():
+    assert TerraformResourceTimings._timestamp({}) is None
+
+
+def test_apply_events_timings():
+    timings = by_address(replay(APPLY_EVENTS))
+
+    assert len(timings) == 5
+    vpc = timings["aws_vpc.main"]
+    assert vpc["status"] == "complete"
+    assert vpc["action"] == "create"
+    assert vpc["elapsed"] == 12
+    assert vpc["end"] - vpc["start"] == pytest.approx(12.245678)
+    assert timings["module.db.random_password.master"]["module"] == "module.db"
+    assert all(t["start"] is not None and t["end"] is not None for t in timings.values())
+
+
+@pytest.mark.usefixtures("python_310_fromisoformat")
+def test_apply_events_timings_on_python_310():
+    timings = by_address(replay(APPLY_EVENTS))
+
+    cluster = timings["aws_eks_cluster.this"]
+    assert cluster["start"] == datetime(2024, 3, 12, 10, 15, 15, 700000, tzinfo=timezone.utc).timestamp()
+    assert cluster["end"] - cluster["start"] == pytest.approx(555.5)
+
+
+def test_slowest_first():
+    table = replay(APPLY_EVENTS).table()
+    assert table[0]["address"] == "aws_eks_cluster.this"
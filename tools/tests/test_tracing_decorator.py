@@ -0,0 +1,51 @@
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from common import tracing_decorator
+from common.tracing_decorator import trace
+
+CLI_DIR = Path(__file__).parent.parent / "cli"
+
+
+class Deployment:
+    def __repr__(self):
+        raise AssertionError("full repr must not be built")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("0.25", 0.25),
+    ("2", 1.0),
+    ("-1", 0.0),
+    ("often", 1.0),
+    ("nan", 1.0),
+    (None, 1.0),
+])
+def test_sample_rate_setting(value, expected):
+    assert tracing_decorator._parse_sample_rate(value) == expected
+
+
+def test_invalid_sample_rate_does_not_break_import():
+    result = subprocess.run([sys.executable, "-c", "import common.tracing_decorator as t; print(t._sample_rate)"],
+                            cwd=CLI_DIR, env={"CGDEVX_TRACE_SAMPLE_RATE": "often"}, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "1.0"
+
+
+def test_arguments_of_other_types_are_logged_by_type_name(caplog):
+    @trace()
+    def deploy(name, deployment, options):
+        return deployment
+
+    with caplog.at_level(logging.DEBUG):
+        deploy("x" * 1000, Deployment(), {"path": Path("/tmp"), "replicas": 2})
+
+    called, returned = [r.getMessage() for r in caplog.records if r.getMessage().startswith("function")]
+    assert "<Deployment>" in called
+    assert repr(Path("/tmp")) in called and "'replicas': 2" in called
+    assert len(called) < 600
+    assert returned.endswith("returned <Deployment>")